@@ -0,0 +1,131 @@
+# Compare the fetch backends against a local stub HTTP server.
+#
+#   python benchmarks/bench_fetch.py -n 2000 --latency 0.02 --workers 64
+#
+# threads  - one thread + one bare requests.get per target (the old path)
+# pool     - bounded WorkerPool + shared keep-alive requests.Session
+# async    - single asyncio event loop + pooled aiohttp client
+
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import fetcher
+import rate_limiter
+from worker_pool import run_all
+
+PAGE = (b"<html><body><div id='block-geolocation'><table>"
+        + b"<tr><td>City</td><td>Brisbane</td></tr>" * 10
+        + b"</table></div></body></html>")
+
+
+class BenchServer(ThreadingHTTPServer):
+    # Room for many concurrent clients, without changing ThreadingHTTPServer
+    # for everything else in the process
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def serve(latency, port_queue, body=PAGE):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = BenchServer(("127.0.0.1", 0), Handler)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_stub_server(latency, body=PAGE):
+    # Separate process so the server does not compete with the client for the GIL
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(latency, port_queue, body), daemon=True)
+    process.start()
+    return process, port_queue.get()
+
+
+def bench_threads(urls, workers):
+    ok = []
+
+    def fetch(url):
+        try:
+            if requests.get(url, timeout=30).status_code == 200:
+                ok.append(1)
+        except requests.RequestException:
+            pass
+
+    threads = [threading.Thread(target=fetch, args=(url,)) for url in urls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(ok)
+
+
+def bench_pool(urls, workers):
+    ok = []
+
+    def fetch(url):
+        if fetcher.get(url, timeout=30).status_code == 200:
+            ok.append(1)
+
+    run_all(fetch, urls, max_workers=workers)
+    return len(ok)
+
+
+def bench_async(urls, workers):
+    jobs = ((url, url, None) for url in urls)
+    stream = fetcher.iter_async(jobs, lambda target, response: response.status_code == 200 or None,
+                                lambda target, e: None,
+                                concurrency=workers, per_host_limit=workers, timeout=30)
+    return sum(1 for _ in stream)
+
+
+BACKENDS = {"threads": bench_threads, "pool": bench_pool, "async": bench_async}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1000, help="requests per backend")
+    parser.add_argument("--latency", type=float, default=0.01, help="stub server delay per request (s)")
+    parser.add_argument("--workers", type=int, default=64, help="pool size / requests in flight")
+    parser.add_argument("--backends", default="threads,pool,async")
+    args = parser.parse_args()
+
+    # Measure raw throughput, not the polite per-host budget
+    rate_limiter.configure(enabled=False)
+
+    server, port = start_stub_server(args.latency)
+    base = f"http://127.0.0.1:{port}"
+    print(f"{'backend':<10}{'ok':>8}{'seconds':>10}{'req/s':>10}")
+    for name in args.backends.split(","):
+        urls = [f"{base}/{i}" for i in range(args.n)]
+        start = time.perf_counter()
+        ok = BACKENDS[name](urls, args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10}{ok:>8}{elapsed:>10.2f}{ok / elapsed:>10.0f}")
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Per-page parse time for every parser backend on saved fixture pages.
+#
+#   python benchmarks/bench_parse.py -n 50
+#
+# Every backend's output is checked against the reference 'bs4' backend;
+# a mismatch is reported instead of a timing.
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parsers
+import record_cache
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+PAGES = {
+    "ipinfo_ip": lambda content, backend: parsers.extract_ipinfo(content, backend),
+    "ipinfo_asn": lambda content, backend: parsers.extract_ipinfo(content, backend),
+    "weather": lambda content, backend: parsers.extract_weather(content, backend),
+    "yahoo": lambda content, backend: parsers.extract_stock(content, "https://finance.yahoo.com/quote/AAPL", backend),
+    "marketwatch": lambda content, backend: parsers.extract_stock(content, "https://www.marketwatch.com/investing/stock/aapl", backend),
+}
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, f"{name}.html"), "rb") as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=30, help="parses per page and backend")
+    parser.add_argument("--backends", default=",".join(parsers.BACKENDS))
+    args = parser.parse_args()
+    backends = args.backends.split(",")
+    record_cache.configure(None)  # time the parsers, not the memo cache
+
+    print(f"{'page':<13}" + "".join(f"{b:>12}" for b in backends) + "   (ms/page)")
+    failed = False
+    for page, extract in PAGES.items():
+        content = load(page)
+        expected = extract(content, "bs4")
+        cells = []
+        for backend in backends:
+            try:
+                if extract(content, backend) != expected:
+                    cells.append("MISMATCH")
+                    failed = True
+                    continue
+            except ImportError:
+                cells.append("n/a")
+                continue
+            start = time.perf_counter()
+            for _ in range(args.n):
+                extract(content, backend)
+            cells.append(f"{(time.perf_counter() - start) * 1000 / args.n:.2f}")
+        print(f"{page:<13}" + "".join(f"{c:>12}" for c in cells))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
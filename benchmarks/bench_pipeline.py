@@ -0,0 +1,59 @@
+# Throughput of the process-pool parse stage on a recorded-response replay.
+#
+#   python benchmarks/bench_pipeline.py -n 400 --processes 0,1,2,4
+#
+# A local stub server replays a saved ipinfo.io ASN page for every request;
+# scrape_asn_data runs against it with parsing in-thread (0) and in 1..N
+# worker processes.
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import http_cache
+import rate_limiter
+import record_cache
+import scrape_asn_data
+from bench_fetch import start_stub_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=400, help="pages to fetch and parse")
+    parser.add_argument("--processes", default="0,1,2,4", help="parse processes to try (0 = in-thread)")
+    parser.add_argument("--workers", type=int, default=32, help="fetch threads / requests in flight")
+    parser.add_argument("--backend", default="threads", choices=("threads", "async"))
+    parser.add_argument("--fixture", default=os.path.join(HERE, "fixtures", "ipinfo_asn.html"))
+    args = parser.parse_args()
+
+    # Every request returns the same page: keep both caches out of the way
+    http_cache.configure(None)
+    record_cache.configure(None)
+    rate_limiter.configure(enabled=False)
+
+    with open(args.fixture, "rb") as f:
+        body = f.read()
+    server, port = start_stub_server(0, body)
+    scrape_asn_data.AsnScraper.build_url = lambda self, asn: f"http://127.0.0.1:{port}/AS{asn}"
+
+    print(f"cpus: {os.cpu_count()}")
+    print(f"{'processes':<10}{'records':>9}{'seconds':>10}{'rec/s':>10}")
+    for processes in (int(p) for p in args.processes.split(",")):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            count = sum(1 for _ in scrape_asn_data.iter_results(
+                f"1-{args.n}", args.workers, args.backend, parse_processes=processes))
+        elapsed = time.perf_counter() - start
+        print(f"{processes:<10}{count:>9}{elapsed:>10.2f}{count / elapsed:>10.1f}")
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
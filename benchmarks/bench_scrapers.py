@@ -0,0 +1,170 @@
+# End-to-end scraper throughput on replayed responses (see replay.py).
+#
+#   python benchmarks/bench_scrapers.py -n 500 --workers 8,64 --backends threads,async
+#   python benchmarks/bench_scrapers.py --scrapers ip --latency 0.05 --jitter 0.05 --rate-429 0.02
+#   python benchmarks/bench_scrapers.py --parsers bs4,selectolax --json results.jsonl
+#
+# Every scraper's iter_results() runs against the replay server for each
+# backend / worker count / parser combination, each in a fresh process so
+# its peak RSS and CPU time are its own. Reported per run:
+#
+#   rec/s      - records per second of wall time
+#   p50 / p99  - request latency as the client saw it (see metrics)
+#   peak MB    - peak RSS of the run's process
+#   cpu s      - user + system CPU, parse worker processes included
+#
+# Caches, dead letters and the per-host rate limiter are off (--rate-limit
+# turns the limiter back on), so the numbers are the fetch / parse engine.
+#
+# stock runs in its default race mode, which is always asyncio, so it gets
+# one row per worker count / parser (backend "async") instead of one per
+# backend.
+
+import argparse
+import contextlib
+import ipaddress
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import replay
+
+SCRAPERS = ("ip", "asn", "weather", "stock")
+# Scrapers that ignore --backends, and the backend they really run on
+FIXED_BACKEND = {"stock": "async"}
+
+
+def _letters(i, width=3):
+    # 0 -> "aaa", 1 -> "aab", ... (inputs that must not contain digits)
+    out = ""
+    for _ in range(width):
+        i, rest = divmod(i, 26)
+        out = chr(ord("a") + rest) + out
+    return out
+
+
+def synthetic_input(command, n):
+    # An input with n targets, all answered by the store's prefix routes
+    if command == "ip":
+        start = ipaddress.IPv4Address("10.0.0.1")
+        return f"{start}-{start + n - 1}"
+    if command == "asn":
+        return f"1-{n}"
+    if command == "weather":
+        return ", ".join(f"bench/{_letters(i)}" for i in range(n))
+    if command == "stock":
+        return ", ".join(_letters(i, 4).upper() for i in range(n))
+    raise ValueError(f"No synthetic input for '{command}'")
+
+
+def run_one(scenario):
+    # Runs in the child process; returns the measurements
+    import metrics
+    import parsers
+    import rate_limiter
+    import scrapers
+
+    replay.offline()
+    if scenario["rate_limit"]:
+        rate_limiter.configure(enabled=True)
+    replay.install(scenario["port"])
+    parsers.set_backend(scenario["parser"])
+    module = scrapers.load(scenario["scraper"])
+    user_input = synthetic_input(scenario["scraper"], scenario["n"])
+
+    metrics.reset()
+    before = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        count = sum(1 for _ in module.iter_results(user_input, max_workers=scenario["workers"],
+                                                   backend=scenario["backend"]))
+    elapsed = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    snap = metrics.snapshot()
+    cpu = sum(a.ru_utime + a.ru_stime - b.ru_utime - b.ru_stime for a, b in zip(after, before))
+    return {
+        **{key: scenario[key] for key in ("scraper", "backend", "workers", "parser", "n")},
+        "records": count,
+        "failed": snap["failed"],
+        "seconds": round(elapsed, 3),
+        "records_per_sec": round(count / elapsed, 1) if elapsed else None,
+        "p50_ms": None if snap["fetch_p50"] is None else round(snap["fetch_p50"] * 1000, 1),
+        "p99_ms": None if snap["fetch_p99"] is None else round(snap["fetch_p99"] * 1000, 1),
+        "peak_rss_mb": round(after[0].ru_maxrss / 1024, 1),  # KiB on Linux
+        "cpu_seconds": round(cpu, 2),
+    }
+
+
+def run_scenario(scenario):
+    child = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", json.dumps(scenario)],
+                           capture_output=True, text=True)
+    if child.returncode != 0:
+        return {**scenario, "error": (child.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def _cell(value, fmt):
+    return "-" if value is None else format(value, fmt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=200, help="targets per run")
+    parser.add_argument("--scrapers", default=",".join(SCRAPERS))
+    parser.add_argument("--backends", default="threads,async")
+    parser.add_argument("--workers", default="8,32", help="concurrency settings to try")
+    parser.add_argument("--parsers", default="bs4", help="parser backends to try (see parsers)")
+    parser.add_argument("--latency", type=float, default=0.01, help="replay server delay per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this much more delay, at random (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 responses")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument("--retry-after", type=int, default=0, help="Retry-After seconds on 429s")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the per-host rate limiter on")
+    parser.add_argument("--store", default=replay.STORE, help="fixture directory")
+    parser.add_argument("--json", metavar="FILE", help="also append every result to FILE as JSON Lines")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_one(json.loads(args.child))))
+        return
+
+    server, port = replay.start_server(args.store, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                       rate_429=args.rate_429, retry_after=args.retry_after)
+    backends = args.backends.split(",")
+    grid = ((scraper, backend, workers, parser_backend)
+            for scraper in args.scrapers.split(",")
+            for backend in ([FIXED_BACKEND[scraper]] if scraper in FIXED_BACKEND else backends)
+            for workers, parser_backend in itertools.product((int(w) for w in args.workers.split(",")),
+                                                             args.parsers.split(",")))
+    print(f"{'scraper':<9}{'backend':<9}{'workers':>8}{'parser':>11}{'records':>9}{'failed':>7}"
+          f"{'rec/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'peak MB':>9}{'cpu s':>8}")
+    out = open(args.json, "a", encoding="utf-8") if args.json else None
+    try:
+        for scraper, backend, workers, parser_backend in grid:
+            result = run_scenario({"scraper": scraper, "backend": backend, "workers": workers, "parser": parser_backend,
+                                   "n": args.n, "port": port, "rate_limit": args.rate_limit})
+            if out:
+                out.write(json.dumps(result) + "\n")
+            if "error" in result:
+                print(f"{scraper:<9}{backend:<9}{workers:>8}{parser_backend:>11}  error: {result['error']}")
+                continue
+            print(f"{scraper:<9}{backend:<9}{workers:>8}{parser_backend:>11}{result['records']:>9}{result['failed']:>7}"
+                  f"{_cell(result['records_per_sec'], '.1f'):>9}{_cell(result['p50_ms'], '.1f'):>9}"
+                  f"{_cell(result['p99_ms'], '.1f'):>9}{result['peak_rss_mb']:>9.1f}{result['cpu_seconds']:>8.2f}")
+    finally:
+        if out:
+            out.close()
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
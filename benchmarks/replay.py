@@ -0,0 +1,330 @@
+# Record / replay of real scraper responses, for offline runs.
+#
+#   python benchmarks/replay.py record ip 1.1.1.1          # live, into the store
+#   python benchmarks/replay.py check                      # the four main() paths, offline
+#   python benchmarks/replay.py check --update             # accept the current output
+#   python benchmarks/replay.py serve --latency 0.05 --error-rate 0.1 --rate-429 0.05
+#
+# The store is a directory (default benchmarks/fixtures) of saved response
+# bodies plus one manifest per scraper, <command>.json:
+#
+#   inputs     - the inputs `check` runs main() with
+#   responses  - {"url", "match", "status", "headers", "body"}; match
+#                "exact" or "prefix" (the longest matching prefix wins, so
+#                a few pages can stand in for any number of targets; an
+#                exact 404 / 503 entry makes one target fail). body may be
+#                left out for an empty one.
+#   expected   - main()'s records for the inputs (volatile fields dropped)
+#   dead_letters - the targets main() dead-lettered (retries exhausted)
+#
+# check replays with instant retries (no backoff) and its own dead-letter
+# list, so failing targets cost no waiting and leave nothing behind.
+#
+# The replay server is a stub HTTP server in its own process; fetcher.route
+# sends every request there, under the original URL (see install()). It can
+# add latency, jitter, 5xx errors and 429s with Retry-After, from a seeded
+# random generator so runs are repeatable. Unknown URLs get a 404.
+
+import argparse
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import fetcher
+import http_cache
+import rate_limiter
+import record_cache
+import retry
+import scrapers
+from records import as_dict
+
+STORE = os.path.join(HERE, "fixtures")
+
+# Fields that differ between runs over the same pages
+VOLATILE = {"weather": ("timestamp",)}
+
+
+# --- fixture store ---
+
+class Store:
+    def __init__(self, path=STORE):
+        self.path = path
+
+    def manifest_path(self, command):
+        return os.path.join(self.path, f"{command}.json")
+
+    def commands(self):
+        return [command for command in scrapers.COMMANDS if os.path.exists(self.manifest_path(command))]
+
+    def load(self, command):
+        path = self.manifest_path(command)
+        if not os.path.exists(path):
+            return {"scraper": command, "inputs": [], "responses": [], "expected": []}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, command, manifest):
+        with open(self.manifest_path(command), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+    def body(self, name):
+        with open(os.path.join(self.path, name), "rb") as f:
+            return f.read()
+
+    def add_body(self, command, content):
+        # Bodies are stored once per content, whatever URLs they came from
+        name = f"{command}-{hashlib.sha1(content).hexdigest()[:12]}.html"
+        path = os.path.join(self.path, name)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(content)
+        return name
+
+    def routes(self, commands=None):
+        # ({url: response}, [(prefix, response), longest first]) with the bodies loaded
+        exact, prefixes, bodies = {}, [], {}
+        for command in commands or self.commands():
+            for response in self.load(command)["responses"]:
+                name = response.get("body")
+                if name not in bodies:
+                    bodies[name] = self.body(name) if name else b""
+                entry = (response["status"], response.get("headers") or {}, bodies[name])
+                if response.get("match") == "prefix":
+                    prefixes.append((response["url"], entry))
+                else:
+                    exact[response["url"]] = entry
+        prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+        return exact, prefixes
+
+
+def comparable(command, records):
+    # JSON-shaped records without the volatile fields, in a stable order
+    drop = VOLATILE.get(command, ())
+    rows = [{key: value for key, value in as_dict(record).items() if key not in drop} for record in records]
+    return sorted(rows, key=lambda row: json.dumps(row, sort_keys=True))
+
+
+# --- replay server ---
+
+class BenchServer(ThreadingHTTPServer):
+    # Room for many concurrent benchmark clients; set here rather than on
+    # ThreadingHTTPServer, which every other server in the process shares
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def serve(store_path, port_queue, latency=0.0, jitter=0.0, error_rate=0.0, rate_429=0.0, retry_after=0, seed=0):
+    exact, prefixes = Store(store_path).routes()
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            with rng_lock:
+                roll, extra = rng.random(), rng.uniform(0, jitter)
+            if latency or extra:
+                time.sleep(latency + extra)
+            # /<scheme>/<host><path> -> the URL the scraper asked for
+            scheme, _, rest = self.path.lstrip("/").partition("/")
+            url = f"{scheme}://{rest}"
+            if roll < rate_429:
+                return self.reply(429, {"Retry-After": str(retry_after)}, b"")
+            if roll < rate_429 + error_rate:
+                return self.reply(503, {}, b"")
+            entry = exact.get(url) or next((entry for prefix, entry in prefixes if url.startswith(prefix)), None)
+            if entry is None:
+                return self.reply(404, {}, b"")
+            self.reply(*entry)
+
+        def reply(self, status, headers, body):
+            self.send_response(status)
+            for name, value in headers.items():
+                if name.lower() not in ("content-length", "transfer-encoding", "content-encoding", "connection"):
+                    self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = BenchServer(("127.0.0.1", 0), Handler)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_server(store_path=STORE, **faults):
+    # Separate process so the server does not compete with the client for the GIL
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(store_path, port_queue), kwargs=faults, daemon=True)
+    process.start()
+    return process, port_queue.get()
+
+
+def install(port):
+    # Send every fetch to the replay server on port
+    def rewrite(url):
+        parts = urlsplit(url)
+        query = f"?{parts.query}" if parts.query else ""
+        return f"http://127.0.0.1:{port}/{parts.scheme}/{parts.netloc}{parts.path}{query}"
+
+    fetcher.route(rewrite)
+
+
+def offline():
+    # Nothing from earlier runs, nothing kept for later ones
+    http_cache.configure(None)
+    record_cache.configure(None)
+    retry.configure(None)
+    rate_limiter.configure(enabled=False)
+
+
+# --- record ---
+
+def record(command, inputs, store=None):
+    # Run main() live for each input and keep every response it got
+    store = store or Store()
+    manifest = store.load(command)
+    module = scrapers.load(command)
+    captured = []
+    lock = threading.Lock()
+
+    def keep(url, status, headers, content):
+        with lock:
+            captured.append((url, status, dict(headers), content))
+
+    http_cache.configure(None)  # a cache hit would never reach the tap
+    fetcher.tap(keep)
+    try:
+        records = []
+        for value in inputs:
+            records.extend(module.main(value))
+    finally:
+        fetcher.tap(None)
+    known = {response["url"]: response for response in manifest["responses"]}
+    for url, status, headers, content in captured:
+        known[url] = {
+            "url": url,
+            "match": "exact",
+            "status": status,
+            "headers": {"Content-Type": headers.get("Content-Type", "text/html")},
+            "body": store.add_body(command, content),
+        }
+    manifest["responses"] = list(known.values())
+    manifest["inputs"] = list(dict.fromkeys(manifest["inputs"] + list(inputs)))
+    store.save(command, manifest)
+    return len(captured), len(records)
+
+
+# --- check ---
+
+@contextlib.contextmanager
+def instant_retries(policy):
+    base_delay, policy.base_delay = policy.base_delay, 0.0
+    try:
+        yield
+    finally:
+        policy.base_delay = base_delay
+
+
+def replay(command, manifest):
+    # (comparable records, sorted dead-lettered targets) of main() over the
+    # manifest's inputs; the replay server must be installed
+    module = scrapers.load(command)
+    with tempfile.TemporaryDirectory() as tmp:
+        dead = retry.configure(os.path.join(tmp, "dead_letters.sqlite"))
+        try:
+            records = []
+            with instant_retries(module.RETRY), open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                for value in manifest["inputs"]:
+                    records.extend(module.main(value))
+            failed = sorted(json.loads(json.dumps(target)) for _, target, *_ in dead.entries())
+        finally:
+            retry.configure(None)
+    return comparable(command, records), failed
+
+
+def check(commands=None, store=None, update=False):
+    # Replay every manifest's inputs through main(); returns the failures
+    # as (command, expected, got), each a (records, dead letters) pair
+    store = store or Store()
+    commands = commands or store.commands()
+    offline()
+    server, port = start_server(store.path)
+    install(port)
+    failures = []
+    try:
+        for command in commands:
+            manifest = store.load(command)
+            got = replay(command, manifest)
+            expected = (manifest["expected"], manifest.get("dead_letters", []))
+            if update:
+                manifest["expected"], manifest["dead_letters"] = got
+                store.save(command, manifest)
+            elif got != expected:
+                failures.append((command, expected, got))
+            status = "updated" if update else "ok" if got == expected else "MISMATCH"
+            print(f"{command:<10}{len(got[0]):>6} records{len(got[1]):>4} dead  {status}")
+    finally:
+        fetcher.route(None)
+        server.terminate()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record / replay scraper responses.")
+    parser.add_argument("--store", default=STORE, help="fixture directory (default benchmarks/fixtures)")
+    commands = parser.add_subparsers(dest="action", required=True)
+    rec = commands.add_parser("record", help="run a scraper live and save its responses")
+    rec.add_argument("scraper")
+    rec.add_argument("inputs", nargs="+")
+    chk = commands.add_parser("check", help="replay the stored inputs and compare main()'s output")
+    chk.add_argument("scrapers", nargs="*")
+    chk.add_argument("--update", action="store_true", help="store the current output as expected")
+    srv = commands.add_parser("serve", help="run the replay server in the foreground")
+    srv.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    srv.add_argument("--jitter", type=float, default=0.0, help="up to this many seconds more, at random")
+    srv.add_argument("--error-rate", type=float, default=0.0, help="share of 503 responses")
+    srv.add_argument("--rate-429", type=float, default=0.0, help="share of 429 responses")
+    srv.add_argument("--retry-after", type=int, default=0, help="Retry-After seconds on 429s")
+    srv.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    store = Store(args.store)
+
+    if args.action == "record":
+        command = scrapers.get(args.scraper)["command"]
+        responses, count = record(command, args.inputs, store)
+        print(f"{command}: {responses} responses, {count} records saved to {store.manifest_path(command)}")
+    elif args.action == "check":
+        names = [scrapers.get(name)["command"] for name in args.scrapers]
+        failures = check(names, store, args.update)
+        for command, expected, got in failures:
+            print(f"\n{command}: expected\n  {expected}\ngot\n  {got}")
+        sys.exit(1 if failures else 0)
+    else:
+        port_queue = multiprocessing.Queue()
+        faults = dict(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                      rate_429=args.rate_429, retry_after=args.retry_after, seed=args.seed)
+        threading.Thread(target=lambda: print(f"replaying {store.path} on http://127.0.0.1:{port_queue.get()}/<scheme>/<url>"),
+                         daemon=True).start()
+        serve(store.path, port_queue, **faults)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import os
+import struct
+import threading
+import time
+
+import sinks
+
+# Resumable sweeps over numeric target ranges (ASNs, IPv4/IPv6 addresses).
+#
+# A Journal is one file per job id (checkpoints/<job_id>.ckpt): a small
+# header plus a bitmap with one bit per number in [start, end], so a range
+# of a million targets costs 125 KB no matter how long the target strings
+# are. A bit is set once a target is finished: its record is in the output
+# file, or it ended without one (non-200 answer, or dead-lettered, see retry).
+#
+# Every few seconds run() flushes the output file and saves the bitmap
+# together with the output's byte size (write to a temp file + rename, so
+# a crash never leaves a half-written journal). On resume the output is cut
+# back to that size, which drops records written after the last checkpoint;
+# their bits were not saved either, so they are simply fetched again.
+
+DEFAULT_DIR = "checkpoints"
+CHECKPOINT_EVERY = 5.0  # seconds
+MAX_TARGETS = 2 ** 32   # 512 MB of bitmap
+
+_MAGIC = b"SCRPJRN1"
+_HEADER = struct.Struct("<8s16s16sQQ")  # magic, start, end, output offset, done count
+
+
+class Journal:
+    def __init__(self, job_id, start, end, directory=DEFAULT_DIR):
+        if end < start:
+            raise ValueError(f"empty range {start}-{end}")
+        if end - start + 1 > MAX_TARGETS:
+            raise ValueError(f"range {start}-{end} is too large to checkpoint (max {MAX_TARGETS} targets)")
+        self.job_id = job_id
+        self.start = start
+        self.end = end
+        self.path = os.path.join(directory, f"{job_id}.ckpt")
+        self.lock = threading.Lock()
+        self.offset = 0
+        self.done = 0
+        self.bits = bytearray((end - start) // 8 + 1)
+        os.makedirs(directory, exist_ok=True)
+        self.resumed = os.path.exists(self.path)
+        if self.resumed:
+            self._load()
+
+    def __len__(self):
+        return self.end - self.start + 1
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            magic, start, end, offset, done = _HEADER.unpack(f.read(_HEADER.size))
+            bits = f.read()
+        start, end = int.from_bytes(start, "little"), int.from_bytes(end, "little")
+        if magic != _MAGIC or len(bits) != len(self.bits):
+            raise ValueError(f"{self.path} is not a valid journal")
+        if (start, end) != (self.start, self.end):
+            raise ValueError(f"job {self.job_id!r} was started for {start}-{end}, not {self.start}-{self.end}")
+        self.bits[:] = bits
+        self.offset = offset
+        self.done = done
+
+    def save(self, offset):
+        # Call only after the output file has been flushed up to offset
+        with self.lock:
+            self.offset = offset
+            header = _HEADER.pack(_MAGIC, self.start.to_bytes(16, "little"), self.end.to_bytes(16, "little"),
+                                  offset, self.done)
+            bits = bytes(self.bits)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(bits)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def is_done(self, n):
+        i = n - self.start
+        return bool(self.bits[i >> 3] & (1 << (i & 7)))
+
+    def mark(self, n):
+        i = n - self.start
+        with self.lock:
+            if not self.bits[i >> 3] & (1 << (i & 7)):
+                self.bits[i >> 3] |= 1 << (i & 7)
+                self.done += 1
+
+    def pending(self):
+        # Numbers still to do, in order. Whole bytes of finished targets are
+        # skipped at once, so resuming a mostly-done range is quick.
+        bits = self.bits
+        length = len(self)
+        for byte_index in range(len(bits)):
+            byte = bits[byte_index]
+            if byte == 0xFF:
+                continue
+            base = byte_index << 3
+            for bit in range(8):
+                i = base + bit
+                if i >= length:
+                    return
+                if not byte & (1 << bit):
+                    yield self.start + i
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def report_failures(on_response, on_error, on_failed):
+    # Wrap a scraper's handlers so on_failed(target) is called for every
+    # target that finishes without a record
+    def response(target, resp):
+        result = on_response(target, resp)
+        if result is None:
+            on_failed(target)
+        return result
+
+    def error(target, e):
+        on_failed(target)
+        return on_error(target, e)
+
+    return response, error
+
+
+def open_output(journal, filename, fields=None, types=None):
+    # A new job appends to the file as it is; a resumed one first drops
+    # whatever was written after its last checkpoint
+    if journal.resumed:
+        return sinks.open_sink(filename, journal.offset, fields, types=types)
+    return sinks.open_sink(filename, os.path.getsize(filename) if os.path.exists(filename) else 0, fields, types=types)
+
+
+def run(journal, records, sink, number_of, every=CHECKPOINT_EVERY):
+    # Write records to sink, marking each one's number in the journal, and
+    # checkpoint both every `every` seconds and at the end. Returns the
+    # number of records written in this run.
+    written = 0
+    last = time.monotonic()
+    try:
+        for record in records:
+            sink.write(record)
+            journal.mark(number_of(record))
+            written += 1
+            if time.monotonic() - last >= every:
+                journal.save(sink.checkpoint())
+                last = time.monotonic()
+    finally:
+        # Also on Ctrl-C / errors: everything written so far is kept
+        journal.save(sink.checkpoint())
+    print(f"checkpoint {journal.job_id}: {journal.done}/{len(journal)} done, {written} written this run")
+    return written
@@ -0,0 +1,302 @@
+import argparse
+import contextlib
+import os
+import re
+import sys
+import time
+
+import scrapers
+
+# Headless front end for the scrapers: no Tk, no PIL, nothing GUI-related
+# is imported, so it runs on servers and from cron. The scraper module is
+# only imported once the arguments have been parsed.
+#
+#   python cli.py ip 1.1.1.0/24 -o ips.parquet --workers 64 --dedup
+#   python cli.py stock AAPL MSFT --mode batch            # JSON Lines on stdout
+#   python cli.py weather -f cities.txt --format csv > weather.csv
+#   cat ranges.txt | python cli.py asn -f - -o asn.jsonl --job asn-sweep
+#   python cli.py stock AAPL --watch 60                    # changes only, forever
+#   python cli.py ip 1.1.1.0/24 --stats --trace trace.jsonl --profile run.folded --metrics-port 9100
+#
+# Records go to stdout (or -o FILE, format from the extension, see sinks);
+# the scrapers' progress output goes to stderr (--quiet drops it).
+#
+# As a library:
+#   import cli
+#   for record in cli.run("ip", "1.1.1.0/24", max_workers=64, dedup=True): ...
+#   cli.export("asn", ["1570-1579"], "asn.parquet")
+
+STDOUT_FORMATS = ("jsonl", "csv")
+
+# Options that only some scrapers take (the run() keyword arguments)
+SCRAPER_OPTIONS = {
+    "ip": ("parse_processes", "shard", "dedup", "enrich_asn", "job"),
+    "asn": ("parse_processes", "job"),
+    "weather": ("watch", "cycles"),
+    "stock": ("mode", "watch", "cycles"),
+}
+
+
+def read_inputs(values=(), files=()):
+    # Inputs from the command line plus one per line of each file ("-" is
+    # stdin). Blank lines and "#" comments are skipped.
+    inputs = [value.strip() for value in values if value.strip()]
+    for path in files:
+        with (contextlib.nullcontext(sys.stdin) if path == "-" else open(path, encoding="utf-8")) as stream:
+            for line in stream:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    inputs.append(line)
+    return inputs
+
+
+def prepare_inputs(scraper, inputs):
+    # Validated scraper inputs; list-style inputs are joined into one run
+    entry = scrapers.get(scraper)
+    inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+    for value in inputs:
+        if re.fullmatch(entry["validation"], value.strip()) is None:
+            raise ValueError(f"Invalid {entry['command']} input '{value}' ({entry['example']})")
+    if entry["list_input"] and inputs:
+        return [", ".join(value.strip() for value in inputs)]
+    return [value.strip() for value in inputs]
+
+
+def output_fields(scraper, enrich_asn=False):
+    # (fields, types) of the records run() yields
+    module = scrapers.load(scraper)
+    if enrich_asn:
+        import enrich
+        return enrich.joined_fields(module.FIELDS), enrich.joined_types(module.TYPES)
+    return module.FIELDS, module.TYPES
+
+
+def _shard(value):
+    # "1/4" -> (1, 4)
+    shard, shards = (int(part) for part in value.split("/"))
+    if not 0 <= shard < shards:
+        raise ValueError(f"shard must be 0..{shards - 1}, got {shard}")
+    return shard, shards
+
+
+def run(scraper, inputs=(), max_workers=None, backend="threads", dead_letters=False, parse_processes=0,
+        shard=None, dedup=False, enrich_asn=False, mode="race", watch=None, cycles=None, ranges=None):
+    # Records for the inputs, yielded as they arrive. dead_letters=True
+    # replays the targets that failed in earlier runs instead.
+    # ip: shard="i/n", dedup (see range_index), enrich_asn (see enrich)
+    # stock: mode race / batch / all
+    # weather, stock: watch=seconds re-polls and yields only changes
+    name = scrapers.get(scraper)["command"]
+    module = scrapers.load(name)
+    kwargs = {"max_workers": max_workers} if max_workers else {}
+    if name in ("ip", "asn"):
+        kwargs["parse_processes"] = parse_processes
+    if name == "ip" and dedup:
+        import range_index
+        kwargs["ranges"] = ranges if ranges is not None else range_index.RangeResolver()
+    if name == "ip" and shard:
+        kwargs["shard"], kwargs["shards"] = _shard(shard)
+
+    if watch:
+        if not hasattr(module, "iter_changes"):
+            raise ValueError(f"{name} has no watch mode")
+        kwargs.pop("parse_processes", None)
+        records = module.iter_changes(prepare_inputs(name, inputs)[0], watch, cycles=cycles, **kwargs)
+    elif dead_letters:
+        kwargs.pop("ranges", None)
+        kwargs.pop("shard", None)
+        kwargs.pop("shards", None)
+        records = module.iter_dead_letters(backend=backend, **kwargs)
+    else:
+        if name == "stock":
+            kwargs["mode"] = mode
+        records = _chain(module.iter_results(value, backend=backend, **kwargs) for value in prepare_inputs(name, inputs))
+
+    if enrich_asn:
+        import enrich
+        records = enrich.join_asn(records)
+    return records
+
+
+def _chain(iterables):
+    for records in iterables:
+        yield from records
+
+
+def export(scraper, inputs, output, job=None, **options):
+    # Write run() records into output (.csv / .jsonl / .json / .parquet /
+    # .arrow); returns the number written. job=ID makes it a checkpointed
+    # sweep (ip / asn, .csv / .jsonl output) that a rerun resumes.
+    name = scrapers.get(scraper)["command"]
+    if job:
+        return _sweep(name, inputs, output, job, **options)
+    import sinks
+    fields, types = output_fields(name, options.get("enrich_asn"))
+    with sinks.open_sink(output, fields=fields, types=types) as sink:
+        for record in run(name, inputs, **options):
+            sink.write(record)
+        return sink.count
+
+
+def _sweep(name, inputs, output, job, max_workers=None, backend="threads", parse_processes=0, shard=None,
+           dedup=False, ranges=None, **unsupported):
+    if name not in ("ip", "asn"):
+        raise ValueError("--job works for ip and asn sweeps")
+    unsupported = [key for key, value in unsupported.items() if value and key != "mode"]
+    if unsupported:
+        raise ValueError(f"--job cannot be combined with {', '.join(unsupported)}")
+    module = scrapers.load(name)
+    kwargs = {"max_workers": max_workers} if max_workers else {}
+    kwargs.update(backend=backend, parse_processes=parse_processes)
+    if name == "ip":
+        import range_index
+        if shard:
+            kwargs["shard"], kwargs["shards"] = _shard(shard)
+        if dedup:
+            kwargs["ranges"] = ranges if ranges is not None else range_index.RangeResolver()
+    spec = prepare_inputs(name, inputs)
+    if len(spec) != 1:
+        raise ValueError("--job takes exactly one input")
+    return module.sweep(spec[0], job, output, **kwargs)
+
+
+def write_stream(records, stream, fields, fmt="jsonl", flush=False):
+    # Records to an open text stream as JSON Lines or CSV; returns the count
+    import json
+    from records import as_dict
+    count = 0
+    if fmt == "csv":
+        import csv
+        writer = csv.writer(stream)
+        writer.writerow(fields)
+    for record in records:
+        if fmt == "csv":
+            writer.writerow([record.get(field) for field in fields])
+        else:
+            stream.write(json.dumps(as_dict(record), ensure_ascii=False) + "\n")
+        count += 1
+        if flush:
+            stream.flush()
+    return count
+
+
+def start_instruments(args):
+    # --trace / --profile / --metrics-port (see tracing, profiler, metrics)
+    if args.trace:
+        import tracing
+        tracing.configure(args.trace, sample=args.trace_sample)
+    if args.profile:
+        import profiler
+        profiler.start()
+    if args.metrics_port:
+        import metrics
+        metrics.serve(args.metrics_port)
+
+
+def stop_instruments(args):
+    if args.profile:
+        import profiler
+        profiler.stop(args.profile)
+    if args.trace:
+        import tracing
+        tracing.configure(None)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Run a scraper without the GUI.")
+    commands = parser.add_subparsers(dest="scraper", required=True, metavar="scraper")
+    for name in scrapers.names():
+        entry = scrapers.SCRAPER_MAP[name]
+        command = entry["command"]
+        sub = commands.add_parser(command, help=name, description=f"{name}: {entry['prompt']} {entry['example']}")
+        sub.add_argument("inputs", nargs="*", help="scraper input(s), as in the GUI")
+        sub.add_argument("-f", "--input-file", action="append", default=[], metavar="FILE",
+                         help="read inputs from FILE, one per line ('-' for stdin)")
+        sub.add_argument("-o", "--output", metavar="FILE",
+                         help="write to FILE (.csv .jsonl .json .parquet .arrow) instead of stdout")
+        sub.add_argument("--format", choices=STDOUT_FORMATS, default="jsonl", help="stdout format (default jsonl)")
+        sub.add_argument("-w", "--workers", type=int, metavar="N", help="concurrent requests")
+        sub.add_argument("--backend", choices=("threads", "async"), default="threads")
+        sub.add_argument("--parser", metavar="NAME", help="HTML parser backend (bs4, strainer, lxml, selectolax, stream)")
+        sub.add_argument("--dead-letters", action="store_true", help="replay targets that failed in earlier runs")
+        sub.add_argument("--no-rate-limit", action="store_true", help="disable per-host rate limiting")
+        sub.add_argument("--stats", action="store_true", help="print record count, timing and cache stats to stderr")
+        sub.add_argument("-q", "--quiet", action="store_true", help="drop the scrapers' progress output")
+        sub.add_argument("--trace", metavar="FILE", help="write OpenTelemetry spans to FILE (OTLP JSON Lines)")
+        sub.add_argument("--trace-sample", type=float, default=1.0, metavar="RATE",
+                         help="share of targets traced (default 1)")
+        sub.add_argument("--profile", metavar="FILE", help="sample stacks during the run into FILE (folded)")
+        sub.add_argument("--metrics-port", type=int, metavar="PORT", help="serve /metrics (Prometheus) and /metrics.json")
+        sub.add_argument("--metrics-json", metavar="FILE", help="write the final metrics snapshot to FILE")
+        options = SCRAPER_OPTIONS.get(command, ())
+        if "parse_processes" in options:
+            sub.add_argument("--parse-processes", type=int, default=0, metavar="N", help="parse in N processes")
+        if "job" in options:
+            sub.add_argument("--job", metavar="ID", help="checkpointed sweep; rerun with the same ID to resume")
+        if "shard" in options:
+            sub.add_argument("--shard", metavar="I/N", help="only the I-th of N slices of the targets")
+        if "dedup" in options:
+            sub.add_argument("--dedup", action="store_true", help="fetch one IP per ipinfo Range and /24 (geo fields are shared within the /24, filled-in records have no hostname)")
+        if "enrich_asn" in options:
+            sub.add_argument("--enrich-asn", action="store_true", help="add the AS page fields to each record")
+        if "mode" in options:
+            sub.add_argument("--mode", choices=("race", "batch", "all"), default="race")
+        if "watch" in options:
+            sub.add_argument("--watch", type=float, metavar="SECONDS", help="re-poll every SECONDS, emit only changes")
+            sub.add_argument("--cycles", type=int, metavar="N", help="stop watching after N rounds")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    name = args.scraper
+    options = {key: getattr(args, key) for key in SCRAPER_OPTIONS.get(name, ()) if getattr(args, key, None)}
+    options.update(max_workers=args.workers, backend=args.backend, dead_letters=args.dead_letters)
+    out = sys.stdout
+    chatter = open(os.devnull, "w") if args.quiet else sys.stderr
+    start = time.monotonic()
+    try:
+        inputs = read_inputs(args.inputs, args.input_file)
+        if not inputs and not args.dead_letters:
+            raise ValueError("no input (give inputs, -f FILE or --dead-letters)")
+        with contextlib.redirect_stdout(chatter):
+            if args.no_rate_limit:
+                import rate_limiter
+                rate_limiter.configure(enabled=False)
+            if args.parser:
+                import parsers
+                parsers.set_backend(args.parser)
+            import http_cache
+            import metrics
+            metrics.reset()
+            start_instruments(args)
+            if args.output and args.output != "-":
+                count = export(name, inputs, args.output, **options)
+            else:
+                if options.pop("job", None):
+                    raise ValueError("--job needs -o FILE")
+                fields, _ = output_fields(name, options.get("enrich_asn"))
+                # watch mode never ends, so each change is passed on at once
+                count = write_stream(run(name, inputs, **options), out, fields, args.format, flush=bool(options.get("watch")))
+    except KeyboardInterrupt:
+        return 130
+    except (ValueError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        out.flush()
+        stop_instruments(args)
+        if args.quiet:
+            chatter.close()
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+    if args.stats:
+        elapsed = time.monotonic() - start
+        print(f"{count} records in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.1f}/s) | {http_cache.stats_line()}", file=sys.stderr)
+        print(metrics.summary_line(), file=sys.stderr)
+        print(metrics.stages_line(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,658 @@
+import argparse
+import contextlib
+import hmac
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import scrapers
+from records import as_dict
+
+# Distributed sweeps: one coordinator, any number of worker processes on
+# any number of hosts, so a sweep is not capped by one machine's IPs and
+# rate budget.
+#
+#   python distributed.py coordinator ip 10.0.0.0/8 --job ten -o ten.parquet --host 0.0.0.0
+#   python distributed.py worker http://coordinator:8765 --workers 64 --backend async    # on each host
+#   python distributed.py status http://coordinator:8765
+#   python distributed.py local asn 1-5000 -o asn.csv --processes 4                      # one machine
+#
+# The coordinator cuts the job's input into work units with the scraper's
+# partition() (IP ranges, ASN ranges, symbol / city lists, see
+# scraper_base), each a smaller input of about --unit-size targets. A
+# worker leases a unit, runs it through the normal scraper path (cli.run,
+# so every scraper option and backend works) and streams the records back
+# in batches while it goes.
+#
+# Leases expire (--lease seconds, on the coordinator's clock; workers renew
+# them while they work), so a unit whose worker crashed or lost the network
+# goes back in the queue. Every lease carries a new token for its unit and
+# the coordinator only takes batches, renewals and the completion under the
+# current token. Records are staged per lease and published in the same
+# transaction that marks the unit done, so each unit's records end up in
+# the results exactly once, however many workers touched it; a retried
+# batch is recognised by its sequence numbers. A unit that keeps losing its
+# lease or failing is given up after MAX_ATTEMPTS and reported by status.
+#
+# State (jobs, units, staged and published records) is one SQLite file on
+# the coordinator, so a coordinator restart resumes the job. Workers on the
+# same machine can use that file directly instead of going through HTTP
+# (that is what `local` does). The HTTP API has no encryption: keep it on
+# a trusted network, and use --token (or SWEEP_TOKEN) so only your workers
+# can talk to it.
+
+DEFAULT_PATH = "sweep.sqlite"
+DEFAULT_PORT = 8765
+DEFAULT_UNIT_SIZE = 256   # targets per unit (ip_targets.SHARD_BLOCK)
+DEFAULT_LEASE = 60.0      # seconds
+MAX_ATTEMPTS = 5          # leases per unit before it is given up
+BATCH_SIZE = 200          # records per upload
+FLUSH_EVERY = 2.0         # seconds; a partial batch is sent after this long
+POLL_INTERVAL = 2.0       # seconds an idle worker waits before asking again
+
+# Per-job scraper options, the same for every unit (see cli.run)
+JOB_OPTIONS = ("dedup", "enrich_asn", "mode")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    " job_id TEXT PRIMARY KEY, scraper TEXT, input TEXT, options TEXT, unit_size INTEGER, created_at REAL)",
+    "CREATE TABLE IF NOT EXISTS units ("
+    " job_id TEXT, unit INTEGER, input TEXT, size INTEGER, state TEXT, worker TEXT, token INTEGER,"
+    " lease_expires REAL, attempts INTEGER, records INTEGER, error TEXT, PRIMARY KEY (job_id, unit))",
+    "CREATE INDEX IF NOT EXISTS units_state ON units (state, job_id, unit)",
+    "CREATE TABLE IF NOT EXISTS staged ("
+    " job_id TEXT, unit INTEGER, token INTEGER, seq INTEGER, record TEXT, PRIMARY KEY (job_id, unit, token, seq))",
+    "CREATE TABLE IF NOT EXISTS results ("
+    " job_id TEXT, unit INTEGER, seq INTEGER, record TEXT, PRIMARY KEY (job_id, unit, seq))",
+)
+
+
+def _scraper(name):
+    # The Scraper instance behind a scraper name (built-in or plugin)
+    loaded = scrapers.load(name)
+    return getattr(loaded, "SCRAPER", loaded)
+
+
+class WorkQueue:
+    # The coordinator's state; also usable directly by local workers
+    def __init__(self, path=DEFAULT_PATH, lease_seconds=DEFAULT_LEASE, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self._db = None
+        self._pid = None
+
+    def _conn(self):
+        # One connection per process (local workers are forked)
+        if self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+            self._pid = os.getpid()
+        return self._db
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self.lock:
+            db = self._conn()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    # --- coordinator side ---
+
+    def submit(self, job_id, scraper, user_input, unit_size=DEFAULT_UNIT_SIZE, options=None):
+        # Cut the input into units; submitting the same job again is a no-op
+        # (resume), submitting another one under its id is an error
+        command = scrapers.get(scraper)["command"]
+        options = json.dumps({key: value for key, value in (options or {}).items() if value}, sort_keys=True)
+        with self._transaction() as db:
+            row = db.execute("SELECT scraper, input, options, unit_size FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is not None:
+                if tuple(row) != (command, user_input, options, unit_size):
+                    raise ValueError(f"job {job_id!r} was submitted as {row[0]} {row[1]!r} {row[2]} "
+                                     f"(unit size {row[3]}), not {command} {user_input!r} {options} (unit size {unit_size})")
+                return db.execute("SELECT COUNT(*) FROM units WHERE job_id = ?", (job_id,)).fetchone()[0]
+            units = [(job_id, n, unit_input, size)
+                     for n, (unit_input, size) in enumerate(_scraper(command).partition(user_input, unit_size))]
+            if not units:
+                raise ValueError(f"{command}: no targets in {user_input!r}")
+            db.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?)",
+                       (job_id, command, user_input, options, unit_size, time.time()))
+            db.executemany("INSERT INTO units (job_id, unit, input, size, state, token, attempts, records)"
+                           " VALUES (?, ?, ?, ?, 'pending', 0, 0, 0)", units)
+            return len(units)
+
+    def job(self, job_id):
+        with self.lock:
+            row = self._conn().execute("SELECT scraper, input, options FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"unknown job {job_id!r}")
+        return {"job_id": job_id, "scraper": row[0], "input": row[1], "options": json.loads(row[2])}
+
+    def status(self, job_id=None):
+        # Per job: units by state, targets covered, records published, failed units
+        with self.lock:
+            db = self._conn()
+            jobs = db.execute("SELECT job_id, scraper, input FROM jobs WHERE ? IS NULL OR job_id = ? ORDER BY created_at",
+                              (job_id, job_id)).fetchall()
+            out = []
+            for job, scraper, user_input in jobs:
+                states = dict(db.execute("SELECT state, COUNT(*) FROM units WHERE job_id = ? GROUP BY state", (job,)).fetchall())
+                targets, done_targets, records = db.execute(
+                    "SELECT SUM(size), SUM(CASE WHEN state = 'done' THEN size ELSE 0 END), SUM(records)"
+                    " FROM units WHERE job_id = ?", (job,)).fetchone()
+                failed = db.execute("SELECT unit, input, error FROM units WHERE job_id = ? AND state = 'failed' ORDER BY unit",
+                                    (job,)).fetchall()
+                out.append({"job_id": job, "scraper": scraper, "input": user_input, "units": states,
+                            "targets": targets, "targets_done": done_targets, "records": records,
+                            "failed": [{"unit": unit, "input": unit_input, "error": error} for unit, unit_input, error in failed]})
+        return out
+
+    def finished(self, job_id=None):
+        # True once no unit is pending or leased
+        with self.lock:
+            row = self._conn().execute("SELECT COUNT(*) FROM units WHERE state IN ('pending', 'leased')"
+                                       " AND (? IS NULL OR job_id = ?)", (job_id, job_id)).fetchone()
+        return row[0] == 0
+
+    def results(self, job_id, chunk=1000):
+        # Published records in unit order, read a chunk at a time
+        after = (-1, -1)
+        while True:
+            with self.lock:
+                rows = self._conn().execute(
+                    "SELECT unit, seq, record FROM results WHERE job_id = ? AND (unit, seq) > (?, ?)"
+                    " ORDER BY unit, seq LIMIT ?", (job_id, *after, chunk)).fetchall()
+            if not rows:
+                return
+            for unit, seq, record in rows:
+                yield json.loads(record)
+            after = rows[-1][:2]
+
+    def export(self, job_id, output):
+        # Write the job's published records to output (any sinks format),
+        # replacing it as a whole; returns the number written
+        import cli
+        import sinks
+        job = self.job(job_id)
+        fields, types = cli.output_fields(job["scraper"], job["options"].get("enrich_asn"))
+        root, ext = os.path.splitext(output)
+        partial = f"{root}.partial{ext}"
+        if os.path.exists(partial):
+            os.remove(partial)
+        with sinks.open_sink(partial, fields=fields, types=types) as sink:
+            for record in self.results(job_id):
+                sink.write(record)
+            count = sink.count
+        os.replace(partial, output)
+        return count
+
+    # --- worker side (also served over HTTP, see serve / RemoteQueue) ---
+
+    def lease(self, worker, job_id=None):
+        # The next unit to work on, or None if there is none right now
+        now = time.time()
+        with self._transaction() as db:
+            while True:
+                row = db.execute(
+                    "SELECT u.job_id, u.unit, u.input, u.attempts, j.scraper, j.options"
+                    " FROM units u JOIN jobs j ON j.job_id = u.job_id"
+                    " WHERE (u.state = 'pending' OR (u.state = 'leased' AND u.lease_expires < ?))"
+                    " AND (? IS NULL OR u.job_id = ?) ORDER BY j.created_at, u.unit LIMIT 1",
+                    (now, job_id, job_id)).fetchone()
+                if row is None:
+                    return None
+                job, unit, unit_input, attempts, scraper, options = row
+                if attempts >= self.max_attempts:
+                    db.execute("UPDATE units SET state = 'failed', error = COALESCE(error, 'lease expired')"
+                               " WHERE job_id = ? AND unit = ?", (job, unit))
+                    db.execute("DELETE FROM staged WHERE job_id = ? AND unit = ?", (job, unit))
+                    continue
+                db.execute("UPDATE units SET state = 'leased', worker = ?, token = token + 1, lease_expires = ?,"
+                           " attempts = attempts + 1 WHERE job_id = ? AND unit = ?",
+                           (worker, now + self.lease_seconds, job, unit))
+                # Whatever an earlier holder staged is never published
+                db.execute("DELETE FROM staged WHERE job_id = ? AND unit = ?", (job, unit))
+                token = db.execute("SELECT token FROM units WHERE job_id = ? AND unit = ?", (job, unit)).fetchone()[0]
+                return {"job_id": job, "unit": unit, "token": token, "scraper": scraper, "input": unit_input,
+                        "options": json.loads(options), "lease_seconds": self.lease_seconds}
+
+    def _holds(self, db, job_id, unit, token):
+        # Extends the lease if token is still the current one
+        cursor = db.execute("UPDATE units SET lease_expires = ? WHERE job_id = ? AND unit = ? AND state = 'leased'"
+                            " AND token = ?", (time.time() + self.lease_seconds, job_id, unit, token))
+        return cursor.rowcount == 1
+
+    def renew(self, job_id, unit, token):
+        with self._transaction() as db:
+            return self._holds(db, job_id, unit, token)
+
+    def push(self, job_id, unit, token, records, start=0):
+        # Stage records start.. of this lease; False if the lease is gone
+        with self._transaction() as db:
+            if not self._holds(db, job_id, unit, token):
+                return False
+            self._stage(db, job_id, unit, token, records, start)
+            return True
+
+    def complete(self, job_id, unit, token, records=(), start=0):
+        # Publish the lease's records and mark the unit done, all at once.
+        # Repeating a completion that went through returns True again.
+        with self._transaction() as db:
+            row = db.execute("SELECT state, token FROM units WHERE job_id = ? AND unit = ?", (job_id, unit)).fetchone()
+            if row == ("done", token):
+                return True
+            if row != ("leased", token):
+                return False
+            self._stage(db, job_id, unit, token, records, start)
+            count = db.execute("INSERT INTO results SELECT job_id, unit, seq, record FROM staged"
+                               " WHERE job_id = ? AND unit = ? AND token = ?", (job_id, unit, token)).rowcount
+            db.execute("DELETE FROM staged WHERE job_id = ? AND unit = ?", (job_id, unit))
+            db.execute("UPDATE units SET state = 'done', records = ?, lease_expires = NULL, error = NULL"
+                       " WHERE job_id = ? AND unit = ?", (count, job_id, unit))
+            return True
+
+    def release(self, job_id, unit, token, error=None):
+        # Hand a unit back after a failure; it counts as an attempt
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE units SET state = 'pending', lease_expires = NULL, error = ?"
+                                " WHERE job_id = ? AND unit = ? AND state = 'leased' AND token = ?",
+                                (error, job_id, unit, token))
+            if cursor.rowcount:
+                db.execute("DELETE FROM staged WHERE job_id = ? AND unit = ?", (job_id, unit))
+            return cursor.rowcount == 1
+
+    def _stage(self, db, job_id, unit, token, records, start):
+        # INSERT OR IGNORE: a batch sent twice (a retried upload) counts once
+        db.executemany("INSERT OR IGNORE INTO staged VALUES (?, ?, ?, ?, ?)",
+                       ((job_id, unit, token, start + i, json.dumps(record, ensure_ascii=False, default=str))
+                        for i, record in enumerate(records)))
+
+    def close(self):
+        with self.lock:
+            if self._db is not None and self._pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+
+# --- HTTP front ---
+
+# WorkQueue methods a remote worker may call
+REMOTE_METHODS = ("lease", "renew", "push", "complete", "release", "finished", "status")
+
+
+def serve(queue, port=DEFAULT_PORT, host="127.0.0.1", token=None):
+    # POST /api/<method> with the keyword arguments as JSON, answer
+    # {"result": ...}; GET /status for people. Runs on a background thread;
+    # returns the server (shutdown() stops it).
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/status":
+                return self.reply(404, {"error": "not found"})
+            if self.allowed():
+                self.reply(200, {"result": queue.status()})
+
+        def do_POST(self):
+            method = self.path.rstrip("/").rsplit("/", 1)[-1]
+            if not self.path.startswith("/api/") or method not in REMOTE_METHODS:
+                return self.reply(404, {"error": "not found"})
+            if not self.allowed():
+                return
+            try:
+                kwargs = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                self.reply(200, {"result": getattr(queue, method)(**kwargs)})
+            except (TypeError, ValueError) as e:
+                self.reply(400, {"error": str(e)})
+            except Exception as e:
+                self.reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def allowed(self):
+            if token is None or hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {token}"):
+                return True
+            self.reply(403, {"error": "bad token"})
+            return False
+
+        def reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class RemoteQueue:
+    # The worker side of WorkQueue, over the coordinator's HTTP API. Calls
+    # are retried through network errors; renew / push / complete / release
+    # are safe to repeat (a repeated lease just expires unused).
+    def __init__(self, url, token=None, timeout=30, attempts=5):
+        import requests
+
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.attempts = attempts
+        self.session = requests.Session()
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _call(self, method, **kwargs):
+        import requests
+
+        for attempt in range(1, self.attempts + 1):
+            try:
+                response = self.session.post(f"{self.url}/api/{method}", json=kwargs, timeout=self.timeout)
+                if response.status_code != 200:
+                    raise ValueError(f"coordinator: {method}: {response.status_code} {response.text.strip()}")
+                return response.json()["result"]
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.attempts:
+                    raise
+                time.sleep(min(30, 2 ** attempt))
+
+    def lease(self, worker, job_id=None):
+        return self._call("lease", worker=worker, job_id=job_id)
+
+    def renew(self, job_id, unit, token):
+        return self._call("renew", job_id=job_id, unit=unit, token=token)
+
+    def push(self, job_id, unit, token, records, start=0):
+        return self._call("push", job_id=job_id, unit=unit, token=token, records=records, start=start)
+
+    def complete(self, job_id, unit, token, records=(), start=0):
+        return self._call("complete", job_id=job_id, unit=unit, token=token, records=list(records), start=start)
+
+    def release(self, job_id, unit, token, error=None):
+        return self._call("release", job_id=job_id, unit=unit, token=token, error=error)
+
+    def finished(self, job_id=None):
+        return self._call("finished", job_id=job_id)
+
+    def status(self, job_id=None):
+        return self._call("status", job_id=job_id)
+
+    def close(self):
+        self.session.close()
+
+
+def connect(where, token=None):
+    # A coordinator URL or a local state file
+    if where.startswith(("http://", "https://")):
+        return RemoteQueue(where, token)
+    return WorkQueue(where)
+
+
+# --- worker ---
+
+def work(queue, job_id=None, worker_id=None, max_workers=None, backend="threads", parse_processes=0,
+         poll=POLL_INTERVAL):
+    # Lease and run units until the job (every job, without job_id) has
+    # none left; returns the number of units this worker completed
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    completed = 0
+    while True:
+        unit = queue.lease(worker_id, job_id)
+        if unit is None:
+            if queue.finished(job_id):
+                return completed
+            time.sleep(poll)  # the rest is leased; one of those may still expire
+            continue
+        if run_unit(queue, unit, max_workers, backend, parse_processes):
+            completed += 1
+
+
+def run_unit(queue, unit, max_workers=None, backend="threads", parse_processes=0):
+    # One leased unit: scrape, stream the records back, complete. False if
+    # the lease was lost or the unit failed (it is then someone else's).
+    import cli
+
+    key = (unit["job_id"], unit["unit"], unit["token"])
+    lost = threading.Event()
+    stop = threading.Event()
+
+    def heartbeat():
+        # Keeps the lease while the unit runs, also when no record comes for a while
+        while not stop.wait(unit["lease_seconds"] / 3):
+            try:
+                if not queue.renew(*key):
+                    lost.set()
+                    return
+            except Exception as e:
+                print(f"[WARN] lease renewal for unit {unit['unit']}: {e}", file=sys.stderr)
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    label = f"{unit['job_id']} unit {unit['unit']} ({unit['input'][:60]})"
+    records = None
+    try:
+        records = cli.run(unit["scraper"], [unit["input"]], max_workers=max_workers, backend=backend,
+                          parse_processes=parse_processes, **unit["options"])
+        batch, sent, last = [], 0, time.monotonic()
+        for record in records:
+            batch.append(as_dict(record))
+            if len(batch) >= BATCH_SIZE or time.monotonic() - last >= FLUSH_EVERY:
+                if not queue.push(*key, batch, sent):
+                    lost.set()
+                sent, batch, last = sent + len(batch), [], time.monotonic()
+            if lost.is_set():
+                print(f"{label}: lease lost, dropped", file=sys.stderr)
+                return False
+        if not queue.complete(*key, batch, sent):
+            print(f"{label}: lease lost before completion, dropped", file=sys.stderr)
+            return False
+        print(f"{label}: {sent + len(batch)} records", file=sys.stderr)
+        return True
+    except Exception as e:
+        print(f"{label}: failed: {e}", file=sys.stderr)
+        with contextlib.suppress(Exception):
+            queue.release(*key, f"{type(e).__name__}: {e}")
+        return False
+    finally:
+        stop.set()
+        if hasattr(records, "close"):
+            records.close()
+
+
+def setup(parser=None, rate_limit=True):
+    # Process-wide scraper settings for a worker
+    if not rate_limit:
+        import rate_limiter
+        rate_limiter.configure(enabled=False)
+    if parser:
+        import parsers
+        parsers.set_backend(parser)
+
+
+def _worker_process(where, token, job_id, options, settings, quiet):
+    # Entry point of the worker processes `local` starts
+    setup(**settings)
+    queue = connect(where, token)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if quiet else sys.stderr):
+        work(queue, job_id, **options)
+
+
+# --- front ends ---
+
+def status_line(status):
+    states = status["units"]
+    done = states.get("done", 0)
+    total = sum(states.values())
+    return (f"{status['job_id']}: {done}/{total} units, {status['targets_done'] or 0}/{status['targets']} targets, "
+            f"{status['records'] or 0} records, {states.get('leased', 0)} leased, {states.get('failed', 0)} failed")
+
+
+def wait(queue, job_id, every=5.0, out=sys.stderr):
+    # Block until the job is finished, printing progress every `every` seconds
+    while not queue.finished(job_id):
+        time.sleep(every)
+        print(status_line(queue.status(job_id)[0]), file=out)
+    return queue.status(job_id)[0]
+
+
+def local(scraper, user_input, output, processes=4, job_id="local", path=DEFAULT_PATH, unit_size=DEFAULT_UNIT_SIZE,
+          lease_seconds=DEFAULT_LEASE, options=None, worker_options=None, settings=None, http=False, quiet=True):
+    # The whole thing on one machine: state file, `processes` worker
+    # processes (through the HTTP front with http=True), output at the end.
+    # worker_options go to work(), settings to setup().
+    queue = WorkQueue(path, lease_seconds)
+    queue.submit(job_id, scraper, user_input, unit_size, options)
+    server, where = None, path
+    if http:
+        server = serve(queue, 0)
+        where = f"http://127.0.0.1:{server.server_address[1]}"
+    workers = [multiprocessing.Process(target=_worker_process,
+                                       args=(where, None, job_id, worker_options or {}, settings or {}, quiet))
+               for _ in range(processes)]
+    for process in workers:
+        process.start()
+    try:
+        status = wait(queue, job_id)
+    finally:
+        for process in workers:
+            process.join(timeout=lease_seconds)
+            if process.is_alive():
+                process.terminate()
+        if server:
+            server.shutdown()
+    count = queue.export(job_id, output) if output else None
+    return status, count
+
+
+def _job_options(args):
+    return {key: getattr(args, key) for key in JOB_OPTIONS if getattr(args, key, None)}
+
+
+def _worker_options(args):
+    options = {"backend": args.backend, "parse_processes": args.parse_processes}
+    if args.workers:
+        options["max_workers"] = args.workers
+    return options
+
+
+def _settings(args):
+    return {"parser": args.parser, "rate_limit": not args.no_rate_limit}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="distributed.py", description="Distributed sweeps: coordinator and workers.")
+    actions = parser.add_subparsers(dest="action", required=True)
+
+    def scraper_job(sub):
+        sub.add_argument("scraper", help="scraper command (ip, asn, weather, stock, ...)")
+        sub.add_argument("input", help="the whole sweep's input, as for cli.py")
+        sub.add_argument("--job", help="job id; rerun with the same id to resume")
+        sub.add_argument("--db", default=DEFAULT_PATH, help=f"coordinator state file (default {DEFAULT_PATH})")
+        sub.add_argument("--unit-size", type=int, default=DEFAULT_UNIT_SIZE, metavar="N", help="targets per work unit")
+        sub.add_argument("--lease", type=float, default=DEFAULT_LEASE, metavar="SECONDS", help="lease length")
+        sub.add_argument("-o", "--output", metavar="FILE", help="write the merged records to FILE at the end")
+        sub.add_argument("--dedup", action="store_true", help="ip: fetch one IP per ipinfo Range and /24 (per unit)")
+        sub.add_argument("--enrich-asn", action="store_true", help="ip: add the AS page fields")
+        sub.add_argument("--mode", choices=("race", "batch", "all"), help="stock: quote source mode")
+
+    def scraper_run(sub):
+        sub.add_argument("-w", "--workers", type=int, metavar="N", help="concurrent requests per worker")
+        sub.add_argument("--backend", choices=("threads", "async"), default="threads")
+        sub.add_argument("--parse-processes", type=int, default=0, metavar="N", help="ip / asn: parse in N processes")
+        sub.add_argument("--parser", metavar="NAME", help="HTML parser backend")
+        sub.add_argument("--no-rate-limit", action="store_true", help="disable per-host rate limiting")
+
+    sub = actions.add_parser("coordinator", help="submit a job and serve it to workers")
+    scraper_job(sub)
+    sub.add_argument("--host", default="127.0.0.1", help="address to listen on (0.0.0.0 for other hosts)")
+    sub.add_argument("--port", type=int, default=DEFAULT_PORT)
+    sub.add_argument("--token", default=os.environ.get("SWEEP_TOKEN"), help="shared secret workers must send")
+
+    sub = actions.add_parser("worker", help="lease and run units from a coordinator (URL) or state file")
+    sub.add_argument("where", help="coordinator URL or local state file")
+    sub.add_argument("--job", help="only this job")
+    sub.add_argument("--token", default=os.environ.get("SWEEP_TOKEN"))
+    sub.add_argument("-q", "--quiet", action="store_true", help="drop the scrapers' progress output")
+    scraper_run(sub)
+
+    sub = actions.add_parser("local", help="coordinator plus worker processes on this machine")
+    scraper_job(sub)
+    scraper_run(sub)
+    sub.add_argument("--processes", type=int, default=4, metavar="N", help="worker processes")
+    sub.add_argument("--http", action="store_true", help="workers go through the HTTP front, as remote ones would")
+
+    sub = actions.add_parser("status", help="progress of the jobs")
+    sub.add_argument("where", nargs="?", default=DEFAULT_PATH, help="coordinator URL or state file")
+    sub.add_argument("--job")
+    sub.add_argument("--token", default=os.environ.get("SWEEP_TOKEN"))
+    sub.add_argument("--json", action="store_true")
+
+    sub = actions.add_parser("export", help="write a job's merged records to a file")
+    sub.add_argument("job")
+    sub.add_argument("output")
+    sub.add_argument("--db", default=DEFAULT_PATH)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.action == "coordinator":
+            queue = WorkQueue(args.db, args.lease)
+            job_id = args.job or f"{args.scraper}-{int(time.time())}"
+            units = queue.submit(job_id, args.scraper, args.input, args.unit_size, _job_options(args))
+            server = serve(queue, args.port, args.host, args.token)
+            print(f"{job_id}: {units} units, serving on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+            status = wait(queue, job_id)
+            time.sleep(3 * POLL_INTERVAL)  # idle workers ask once more and learn it is over
+            server.shutdown()
+        elif args.action == "worker":
+            setup(**_settings(args))
+            queue = connect(args.where, args.token)
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if args.quiet else sys.stderr):
+                completed = work(queue, args.job, **_worker_options(args))
+            print(f"{completed} units completed", file=sys.stderr)
+            return 0
+        elif args.action == "local":
+            status, _ = local(args.scraper, args.input, None, args.processes, args.job or "local", args.db,
+                              args.unit_size, args.lease, _job_options(args), _worker_options(args), _settings(args),
+                              args.http)
+            queue = WorkQueue(args.db)
+            job_id = args.job or "local"
+        elif args.action == "status":
+            statuses = connect(args.where, args.token).status(args.job)
+            for status in statuses:
+                print(json.dumps(status) if args.json else status_line(status))
+            return 0
+        else:
+            print(f"{WorkQueue(args.db).export(args.job, args.output)} records written to {args.output}", file=sys.stderr)
+            return 0
+    except KeyboardInterrupt:
+        return 130
+    except (ValueError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(status_line(status), file=sys.stderr)
+    for failed in status["failed"]:
+        print(f"  unit {failed['unit']} ({failed['input']}) failed: {failed['error']}", file=sys.stderr)
+    if args.output:
+        print(f"{queue.export(job_id, args.output)} records written to {args.output}", file=sys.stderr)
+    return 0 if not status["failed"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import retry
+import scrape_asn_data
+from records import as_dict
+
+# ASN enrichment for IP sweeps.
+#
+# IP records name their ASN (IpRecord.asn); scrape_asn_data has the full
+# AS page for it. join_asn() streams IP records through, fetches every
+# distinct ASN once (scrape_asn_data.handle_single_asn, on a few threads
+# of its own) and yields each IP record as a dict with the AS fields added
+# under an "asn_" prefix. Records whose ASN is already known pass straight through;
+# the rest wait only for their own ASN's fetch.
+#
+# Lookups go through the ASN scraper's RetryPolicy (retry.call): transient
+# failures are retried with backoff, and an ASN that still fails is
+# dead-lettered under "asn" like in an ASN sweep. Its records are passed on
+# without AS fields. The failure is remembered for the rest of the join (so
+# each distinct ASN still costs one lookup) but not in the index, so a later
+# join asks again.
+
+PREFIX = "asn_"
+DEFAULT_WORKERS = 4
+
+class AsnIndex:
+    # ASN number -> AS fields, stored as one tuple per ASN against a shared
+    # column list (sweeps touch thousands of ASNs with the same fields)
+    def __init__(self):
+        self.columns = []
+        self.rows = {}
+
+    def __contains__(self, asn):
+        return asn in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, asn, record):
+        fields = {key: value for key, value in record.items() if key != "asn"}
+        for key in fields:
+            if key not in self.columns:
+                self.columns.append(key)
+        self.rows[asn] = tuple(fields.get(key) for key in self.columns)
+
+    def fields(self, asn):
+        row = self.rows.get(asn)
+        if row is None:
+            return {}
+        return {PREFIX + key: value for key, value in zip(self.columns, row)}
+
+
+def joined_fields(fields):
+    # Output columns for enriched records: the IP fields, then the AS ones
+    return tuple(fields) + tuple(PREFIX + field for field in scrape_asn_data.FIELDS if field != "asn")
+
+
+def joined_types(types):
+    # Column types to go with joined_fields (see sinks)
+    return {**types, **{PREFIX + field: kind for field, kind in scrape_asn_data.TYPES.items() if field != "asn"}}
+
+
+def _fetch(asn):
+    return retry.call(scrape_asn_data.handle_single_asn, str(asn), scrape_asn_data.RETRY,
+                      scrape_asn_data.handle_error)
+
+
+def join_asn(records, index=None, max_workers=DEFAULT_WORKERS, field="asn"):
+    # Yields the IP records with their ASN's fields added. index can be
+    # shared between calls so ASNs seen in earlier sweeps are not refetched.
+    index = AsnIndex() if index is None else index
+    pending = {}   # future -> asn
+    waiting = {}   # asn -> records waiting for it
+    failed = set() # ASNs that gave up in this join
+
+    def finished(futures):
+        for future in futures:
+            asn = pending.pop(future)
+            fetched = future.result()
+            if fetched is not None:
+                index.add(asn, fetched)
+            else:
+                failed.add(asn)
+            for record in waiting.pop(asn):
+                yield {**record, **index.fields(asn)}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for record in records:
+            record = as_dict(record)
+            asn = record.get(field)
+            if asn is None or asn in index or asn in failed:
+                yield {**record, **index.fields(asn)}
+            elif asn in waiting:
+                waiting[asn].append(record)
+            else:
+                waiting[asn] = [record]
+                pending[pool.submit(_fetch, asn)] = asn
+            done = [future for future in pending if future.done()]
+            yield from finished(done)
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            yield from finished(done)
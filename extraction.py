@@ -0,0 +1,587 @@
+import re
+from html.parser import HTMLParser
+
+# Declarative page extraction, shared by every scraper.
+#
+# A page is described once as a Spec: named rules over simple CSS
+# selectors, plus optional transforms. compile(spec, backend) turns it into
+# a plain function content -> result for one parser backend; selectors are
+# translated (bs4 find arguments, precompiled XPath, lexbor CSS) once and
+# the function is cached, so per page only the lookups themselves run.
+#
+#   Text(path, mode="text", default="N/A", transform=None)
+#       text of the element at `path`; mode "raw" is bs4's .text,
+#       "text" is .text.strip(), "strings" is get_text(strip=True)
+#   Link(path="a")
+#       "text (href)" of the first link, its text if it has no href,
+#       None without a link
+#   First(rule, rule, ...)
+#       first rule that is not None
+#   Rows(path, row="tr", cells=None, columns=(), count=None, min_count=None,
+#        start=0, stop=None, transform=None, default=None)
+#       one tuple per row of the element at `path` (default if missing).
+#       With cells, columns[i] reads the i-th `cells` element of the row and
+#       rows without exactly `count` / at least `min_count` of them are
+#       skipped; without, each column rule runs inside the row and rows
+#       where one comes back None are skipped. transform(*values) replaces
+#       the tuple. start / stop slice the rows.
+#
+# A path is a selector, or a tuple of selectors each looked up (first
+# match, document order) inside the previous one; () is the element
+# itself. Selectors are compound only - tag, #id, .class, [attr] and
+# [attr="value"] (an exact match, also for class) - no combinators.
+#
+#   Spec({"price": Text('fin-streamer[data-field="regularMarketPrice"]', "raw")})
+#
+# Backends (see parsers): bs4 (html.parser, the reference), strainer (bs4
+# building only the subtrees the spec starts from), lxml, selectolax, and
+# stream (stdlib HTMLParser keeping only those subtrees and stopping as
+# soon as every one of them has been read).
+
+
+class Spec:
+    def __init__(self, rules, finish=None):
+        self.rules = dict(rules)
+        self.finish = finish  # result dict -> final result
+
+
+class Text:
+    def __init__(self, path, mode="text", default="N/A", transform=None):
+        self.path = _path(path)
+        self.mode = mode
+        self.default = default
+        self.transform = transform
+
+
+class Link:
+    def __init__(self, path="a"):
+        self.path = _path(path)
+
+
+class First:
+    def __init__(self, *rules):
+        self.rules = rules
+
+
+class Rows:
+    def __init__(self, path, row="tr", cells=None, columns=(), count=None, min_count=None,
+                 start=0, stop=None, transform=None, default=None):
+        self.path = _path(path)
+        self.row = row
+        self.cells = cells
+        self.columns = columns
+        self.count = count
+        self.min_count = min_count
+        self.start = start
+        self.stop = stop
+        self.transform = transform
+        self.default = default
+
+
+def _path(path):
+    return (path,) if isinstance(path, str) else tuple(path)
+
+
+# --- selectors ---
+
+_SELECTOR = re.compile(r"""
+    (?P<tag>^[A-Za-z][\w-]*)
+  | \#(?P<id>[\w-]+)
+  | \.(?P<cls>[\w-]+)
+  | \[(?P<attr>[\w-]+)(?:=(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[\w-]+)))?\]
+""", re.X)
+
+
+class Selector:
+    def __init__(self, text):
+        self.text = text
+        self.tag = None
+        self.classes = []
+        self.attrs = {}     # name -> exact value, or None for presence
+        pos = 0
+        while pos < len(text):
+            match = _SELECTOR.match(text, pos)
+            if match is None:
+                raise ValueError(f"Unsupported selector '{text}'")
+            if match["tag"]:
+                self.tag = match["tag"].lower()
+            elif match["id"]:
+                self.attrs["id"] = match["id"]
+            elif match["cls"]:
+                self.classes.append(match["cls"])
+            else:
+                value = next((v for v in (match["dq"], match["sq"], match["bare"]) if v is not None), None)
+                self.attrs[match["attr"].lower()] = value
+            pos = match.end()
+
+    def matches(self, tag, attrs):
+        # attrs: dict as HTMLParser reports it (valueless attributes -> None)
+        if self.tag and tag != self.tag:
+            return False
+        for name, value in self.attrs.items():
+            if name not in attrs:
+                return False
+            if value is not None:
+                actual = attrs[name] or ""
+                if name == "class":
+                    actual = " ".join(actual.split())  # as bs4 compares it
+                if actual != value:
+                    return False
+        if self.classes:
+            tokens = (attrs.get("class") or "").split()
+            return all(name in tokens for name in self.classes)
+        return True
+
+
+def _roots(spec):
+    # The selectors every rule starts from (first step of each path)
+    roots = []
+
+    def visit(rule):
+        if isinstance(rule, First):
+            for inner in rule.rules:
+                visit(inner)
+        elif rule.path:
+            roots.append(rule.path[0])
+
+    for rule in spec.rules.values():
+        visit(rule)
+    return list(dict.fromkeys(roots))
+
+
+# --- backends: how to find elements and read text ---
+
+class _Bs4:
+    strained = False
+
+    def __init__(self, spec):
+        self.only = None
+        if self.strained:
+            self.only = _root_filter([Selector(text) for text in _roots(spec)])
+
+    def root(self, content):
+        from bs4 import BeautifulSoup
+        return BeautifulSoup(content, "html.parser", parse_only=self.only)
+
+    def compile(self, text):
+        selector = Selector(text)
+        attrs = {name: True if value is None else value for name, value in selector.attrs.items()}
+        if len(selector.classes) == 1 and "class" not in attrs:
+            attrs["class"] = selector.classes[0]
+        elif selector.classes:
+            # several classes: bs4 can only check one, so match by hand
+            def match(tag):
+                values = {key: " ".join(value) if isinstance(value, list) else value for key, value in tag.attrs.items()}
+                return selector.matches(tag.name, values)
+            return match, {}
+        return selector.tag or True, attrs
+
+    def first(self, node, compiled):
+        name, attrs = compiled
+        return node.find(name, attrs)
+
+    def all(self, node, compiled):
+        name, attrs = compiled
+        return node.find_all(name, attrs)
+
+    def text(self, node):
+        return node.text
+
+    def strings(self, node):
+        return node.get_text(strip=True)
+
+    def attr(self, node, name):
+        return node.get(name)
+
+
+class _Strainer(_Bs4):
+    strained = True
+
+
+def _root_filter(wanted):
+    # parse_only for bs4: build only the elements a root selector matches
+    # (bs4 keeps everything inside them)
+    try:
+        from bs4.filter import ElementFilter
+    except ImportError:  # bs4 < 4.13: a SoupStrainer calls fn(name, attrs)
+        from bs4 import SoupStrainer
+
+        def keep(name, attrs):
+            attrs = {key: " ".join(value) if isinstance(value, list) else value for key, value in attrs.items()}
+            return any(selector.matches(name, attrs) for selector in wanted)
+
+        return SoupStrainer(keep)
+
+    class RootFilter(ElementFilter):
+        def allow_tag_creation(self, nsprefix, name, attrs):
+            return any(selector.matches(name, attrs or {}) for selector in wanted)
+
+        def allow_string_creation(self, string):
+            return False
+
+    return RootFilter()
+
+
+class _Lxml:
+    def __init__(self, spec):
+        from lxml import etree
+        self.XPath = etree.XPath
+        self.texts = etree.XPath(".//text()")
+
+    def root(self, content):
+        import lxml.html
+        # The document, so the top element itself can match too
+        return lxml.html.fromstring(content).getroottree()
+
+    def compile(self, text):
+        selector = Selector(text)
+        step = selector.tag or "*"
+        for name, value in selector.attrs.items():
+            step += f"[@{name}]" if value is None else f"[@{name}='{value}']"
+        for name in selector.classes:
+            step += f"[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]"
+        return self.XPath(f"(.//{step})[1]"), self.XPath(f".//{step}")
+
+    def first(self, node, compiled):
+        found = compiled[0](node)
+        return found[0] if found else None
+
+    def all(self, node, compiled):
+        return compiled[1](node)
+
+    def text(self, node):
+        return "".join(self.texts(node))
+
+    def strings(self, node):
+        return "".join(s.strip() for s in self.texts(node) if s.strip())
+
+    def attr(self, node, name):
+        return node.get(name)
+
+
+class _Selectolax:
+    def __init__(self, spec):
+        pass
+
+    def root(self, content):
+        from selectolax.lexbor import LexborHTMLParser
+        return LexborHTMLParser(content)
+
+    def compile(self, text):
+        Selector(text)  # same selector subset as the other backends
+        return text
+
+    def first(self, node, compiled):
+        return node.css_first(compiled)
+
+    def all(self, node, compiled):
+        return node.css(compiled)
+
+    def text(self, node):
+        return node.text(deep=True)
+
+    def strings(self, node):
+        return node.text(deep=True, separator="", strip=True)
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+
+# --- stream backend: a tree of only the subtrees the spec starts from ---
+
+# Elements html.parser / bs4 never treat as open
+VOID_ELEMENTS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen",
+    "link", "menuitem", "meta", "param", "source", "track", "wbr",
+))
+
+
+class _Node:
+    __slots__ = ("tag", "attrs", "children")
+
+    def __init__(self, tag, attrs):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+
+    def iter(self):
+        # descendants in document order
+        stack = [child for child in reversed(self.children) if child.__class__ is _Node]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(child for child in reversed(node.children) if child.__class__ is _Node)
+
+    def strings(self):
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.__class__ is str:
+                yield node
+            else:
+                stack.extend(reversed(node.children))
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _Collector(HTMLParser):
+    # Mirrors bs4's html.parser tree building (an end tag closes back to
+    # the most recent open element of that name, stray end tags are
+    # ignored, void elements never stay open), but only builds nodes inside
+    # the first match of each root selector and stops once all of them
+    # have been read.
+    def __init__(self, roots):
+        super().__init__(convert_charrefs=True)
+        self.pending = list(roots)
+        self.tags = {selector.tag for selector in roots}
+        self.tree = _Node(None, {})
+        self.stack = []      # (tag, node or None) for every open element
+        self.current = None  # innermost open node being built
+
+    def handle_starttag(self, tag, attrs):
+        if self.current is None and tag not in self.tags and None not in self.tags:
+            # outside every wanted subtree and no root selector for this tag
+            if tag not in VOID_ELEMENTS:
+                self.stack.append((tag, None))
+            return
+        attrs = dict(attrs)
+        node = None
+        if self.current is not None:
+            node = _Node(tag, attrs)
+            self.current.children.append(node)
+        for selector in self.pending:
+            if selector.matches(tag, attrs):
+                if node is None:
+                    node = _Node(tag, attrs)
+                    self.tree.children.append(node)
+                self.pending = [other for other in self.pending if not other.matches(tag, attrs)]
+                self.tags = {other.tag for other in self.pending}
+                break
+        if tag in VOID_ELEMENTS:
+            self._check_done()
+            return
+        self.stack.append((tag, node))
+        if node is not None:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                del self.stack[i:]
+                self.current = next((node for _, node in reversed(self.stack) if node is not None), None)
+                self._check_done()
+                return
+
+    def handle_data(self, data):
+        node = self.current
+        if node is not None:
+            children = node.children
+            if children and children[-1].__class__ is str:
+                children[-1] += data
+            else:
+                children.append(data)
+
+    def _check_done(self):
+        if not self.pending and self.current is None:
+            raise _StopParsing
+
+
+class _Stream:
+    def __init__(self, spec):
+        self.roots = [Selector(text) for text in _roots(spec)]
+
+    def root(self, content):
+        collector = _Collector(self.roots)
+        try:
+            collector.feed(decode(content))
+            collector.close()
+        except _StopParsing:
+            pass
+        return collector.tree
+
+    def compile(self, text):
+        return Selector(text)
+
+    def first(self, node, selector):
+        return next((found for found in node.iter() if selector.matches(found.tag, found.attrs)), None)
+
+    def all(self, node, selector):
+        return [found for found in node.iter() if selector.matches(found.tag, found.attrs)]
+
+    def text(self, node):
+        return "".join(node.strings())
+
+    def strings(self, node):
+        return "".join(s.strip() for s in node.strings() if s.strip())
+
+    def attr(self, node, name):
+        return node.attrs.get(name)
+
+
+BACKENDS = {
+    "bs4": _Bs4,
+    "strainer": _Strainer,
+    "lxml": _Lxml,
+    "selectolax": _Selectolax,
+    "stream": _Stream,
+}
+
+
+# --- compiling ---
+
+_compiled = {}
+
+
+def compile(spec, backend):
+    # content -> result for one backend, built once per (spec, backend)
+    key = (spec, backend)
+    extract = _compiled.get(key)
+    if extract is None:
+        extract = _compiled[key] = _compile(spec, BACKENDS[backend](spec))
+    return extract
+
+
+def _compile(spec, engine):
+    rules = [(name, _rule(rule, engine)) for name, rule in spec.rules.items()]
+    root, finish = engine.root, spec.finish
+
+    def extract(content):
+        doc = root(content)
+        result = {name: rule(doc) for name, rule in rules}
+        return finish(result) if finish else result
+
+    return extract
+
+
+def _locate(path, engine):
+    # node -> element at path (None if any step is missing)
+    steps = [engine.compile(text) for text in path]
+    first = engine.first
+    if not steps:
+        return lambda node: node
+    if len(steps) == 1:
+        step = steps[0]
+        return lambda node: first(node, step)
+
+    def locate(node):
+        for step in steps:
+            node = first(node, step)
+            if node is None:
+                return None
+        return node
+
+    return locate
+
+
+def _rule(rule, engine):
+    if isinstance(rule, Text):
+        return _text_rule(rule, engine)
+    if isinstance(rule, Link):
+        return _link_rule(rule, engine)
+    if isinstance(rule, First):
+        return _first_rule(rule, engine)
+    if isinstance(rule, Rows):
+        return _rows_rule(rule, engine)
+    raise TypeError(f"Unknown extraction rule {rule!r}")
+
+
+def _text_rule(rule, engine):
+    locate = _locate(rule.path, engine)
+    default, transform = rule.default, rule.transform
+    if rule.mode == "raw":
+        read = engine.text
+    elif rule.mode == "text":
+        text = engine.text
+        read = lambda node: text(node).strip()
+    elif rule.mode == "strings":
+        read = engine.strings
+    else:
+        raise ValueError(f"Unknown text mode '{rule.mode}'")
+
+    def extract(node):
+        node = locate(node)
+        if node is None:
+            return default
+        value = read(node)
+        return transform(value) if transform else value
+
+    return extract
+
+
+def _link_rule(rule, engine):
+    locate, strings, attr = _locate(rule.path, engine), engine.strings, engine.attr
+
+    def extract(node):
+        link = locate(node)
+        if link is None:
+            return None
+        text, href = strings(link), attr(link, "href")
+        return f"{text} ({href})" if href else text
+
+    return extract
+
+
+def _first_rule(rule, engine):
+    rules = [_rule(inner, engine) for inner in rule.rules]
+
+    def extract(node):
+        for inner in rules:
+            value = inner(node)
+            if value is not None:
+                return value
+        return None
+
+    return extract
+
+
+def _rows_rule(rule, engine):
+    locate = _locate(rule.path, engine)
+    find_all = engine.all
+    row = engine.compile(rule.row)
+    cells = engine.compile(rule.cells) if rule.cells else None
+    columns = [_rule(column, engine) for column in rule.columns]
+    count, min_count = rule.count, rule.min_count
+    start, stop = rule.start, rule.stop
+    transform, default = rule.transform, rule.default
+
+    def extract(node):
+        table = locate(node)
+        if table is None:
+            return default
+        out = []
+        for tr in find_all(table, row)[start:stop]:
+            if cells is not None:
+                found = find_all(tr, cells)
+                if (count is not None and len(found) != count) or (min_count is not None and len(found) < min_count):
+                    continue
+                values = tuple(column(cell) for column, cell in zip(columns, found))
+            else:
+                values = tuple(column(tr) for column in columns)
+                if None in values:
+                    continue
+            out.append(transform(*values) if transform else values)
+        return out
+
+    return extract
+
+
+_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([A-Za-z0-9_-]+)""", re.I)
+
+
+def decode(content):
+    # The stream parser needs text; honor a <meta charset> like bs4 does
+    if isinstance(content, str):
+        return content
+    match = _CHARSET.search(content[:2048])
+    encoding = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return content.decode(encoding, errors="replace")
+    except LookupError:
+        return content.decode("utf-8", errors="replace")
@@ -0,0 +1,462 @@
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import http_cache
+import metrics
+import rate_limiter
+import tracing
+
+# Shared fetch layer for all scrapers.
+#
+# get()       - blocking fetch for the worker-pool path. Uses one shared
+#               requests.Session so connections to the same host are kept
+#               alive and reused instead of doing a TCP+TLS handshake per target.
+# fetch_stream() / iter_async()
+#             - asyncio path. One event loop, one pooled client with a
+#               per-host keep-alive connection limit (optionally HTTP/2), so
+#               tens of thousands of targets can be in flight on one thread.
+#               Records are yielded as each request completes. The
+#               on_response callbacks (parsing) run on a few threads of
+#               their own, so a slow page never stalls the loop's I/O.
+#
+# Both return response objects with .status_code, .content, .text and
+# .headers, so the scrapers' parsing code does not care which one is used.
+#
+# Passing ttl (seconds) routes the request through the on-disk response
+# cache (see http_cache): fresh copies are served without a request and
+# stale ones are revalidated with ETag / Last-Modified. ttl=0 always asks
+# the site but still revalidates (a 304 is served from the cache), which is
+# what polling wants.
+#
+# Every request that actually goes to the network first waits for its
+# host's limiter (see rate_limiter), so all scrapers share one per-host
+# budget and back off together when a site pushes back. Its latency and
+# the number open are reported to metrics; fetch_stream reports each
+# target's outcome there too. So are the steps of a request (rate_limit,
+# connect, tls / dns, wait, download, see metrics), timed from urllib3's
+# connection classes and aiohttp's request tracing, and each fetch is a
+# tracing span when tracing is on.
+#
+# For record / replay (see benchmarks/replay.py): route(rewrite) sends
+# every request to rewrite(url) instead of url (a local stub server), and
+# tap(callback) hands every network response to
+# callback(url, status, headers, content). Both see the scraper's own URL;
+# the response cache keeps using it too.
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_POOL_SIZE = 64       # keep-alive connections kept per host
+DEFAULT_PER_HOST_LIMIT = 64  # concurrent requests per host (async path)
+DEFAULT_PARSE_THREADS = min(4, os.cpu_count() or 1)  # on_response threads (async path)
+
+_DONE = object()
+
+_session = None
+_session_lock = threading.Lock()
+
+_route = None
+_tap = None
+
+
+def route(rewrite=None):
+    # rewrite(url) -> the URL actually requested; None restores direct fetching
+    global _route
+    _route = rewrite
+
+
+def tap(callback=None):
+    # callback(url, status, headers, content) after every network response
+    global _tap
+    _tap = callback
+
+
+class _TimedConnection:
+    # New connections report their set-up time (DNS + TCP) as "connect"
+    def _new_conn(self):
+        with metrics.timer("connect", **{"server.address": self.host}):
+            sock = super()._new_conn()
+        self.connected_at = time.perf_counter()
+        return sock
+
+
+class _TimedHTTPConnection(_TimedConnection, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnection, HTTPSConnection):
+    def connect(self):
+        # _new_conn() first, then the handshake
+        super().connect()
+        metrics.interval("tls", self.connected_at, time.perf_counter(), **{"server.address": self.host})
+
+
+class _TimedHTTPPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPPool, "https": _TimedHTTPSPool}
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = _TimedAdapter(pool_connections=16, pool_maxsize=DEFAULT_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def get(url, headers=None, timeout=DEFAULT_TIMEOUT, ttl=None):
+    with tracing.span("fetch", tracing.CLIENT, **{"url.full": url}) as span:
+        response = _get(url, headers, timeout, ttl)
+        span.set("http.response.status_code", response.status_code)
+        span.set("cache_hit", getattr(response, "from_cache", False))
+        return response
+
+
+def _get(url, headers, timeout, ttl):
+    cache, entry = _lookup(url, ttl)
+    if entry and entry.is_fresh(ttl):
+        cache.record("hits")
+        return FetchResponse.from_entry(entry)
+    target = _route(url) if _route else url
+    limiter = rate_limiter.for_url(target)
+    if limiter:
+        with metrics.timer("rate_limit"):
+            limiter.acquire()
+    status, response_headers, started = None, None, time.perf_counter()
+    metrics.request_started()
+    try:
+        response = get_session().get(target, headers=_conditional(headers, entry), timeout=timeout)
+        status, response_headers = response.status_code, response.headers
+    finally:
+        ended = time.perf_counter()
+        metrics.request_finished(ended - started)
+        if limiter:
+            limiter.release(status, ended - started, response_headers)
+    # requests stops its clock once the headers are in; the rest is the body
+    headers_at = min(ended, started + response.elapsed.total_seconds())
+    metrics.interval("wait", started, headers_at)
+    metrics.interval("download", headers_at, ended)
+    if _tap:
+        _tap(url, response.status_code, response.headers, response.content)
+    cached = _store(cache, entry, url, response.status_code, response.headers,
+                    response.content, response.encoding)
+    return cached or response
+
+
+def _lookup(url, ttl):
+    cache = http_cache.get_cache() if ttl is not None else None
+    return cache, (cache.get(url) if cache else None)
+
+
+def _conditional(headers, entry):
+    if not entry:
+        return headers
+    headers = dict(headers or {})
+    headers.update(entry.validators())
+    return headers
+
+
+def _store(cache, entry, url, status, headers, content, encoding):
+    # Returns the cached copy on a 304, otherwise None
+    if cache is None:
+        return None
+    if entry and status == 304:
+        cache.refresh(url)
+        cache.record("revalidated")
+        return FetchResponse.from_entry(entry)
+    cache.record("misses")
+    if status == 200:
+        cache.put(url, status, headers, content, encoding)
+    return None
+
+
+class FetchResponse:
+    # Minimal response object for the async path and cache hits (same
+    # attributes the scrapers read from requests.Response)
+    def __init__(self, url, status_code, headers, content, encoding=None, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding or "utf-8"
+        self.from_cache = from_cache
+
+    @classmethod
+    def from_entry(cls, entry):
+        return cls(entry.url, entry.status, entry.headers, entry.body, entry.encoding, from_cache=True)
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+
+class AsyncFetcher:
+    # HTTP/1.1 uses aiohttp: one keep-alive pool per host, capped at
+    # per_host_limit connections. http2=True switches to httpx (needs the
+    # "h2" package), which multiplexes requests over one connection per host.
+    def __init__(self, per_host_limit=DEFAULT_PER_HOST_LIMIT, http2=False, timeout=DEFAULT_TIMEOUT):
+        self.http2 = http2
+        if http2:
+            import httpx
+
+            self.host_limits = {}
+            self.per_host_limit = per_host_limit
+            self.client = httpx.AsyncClient(http2=True, timeout=timeout)
+        else:
+            import aiohttp
+
+            self.client = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0, limit_per_host=per_host_limit),
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                trace_configs=[_connection_trace(aiohttp)],
+            )
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        limit = self.host_limits.get(host)
+        if limit is None:
+            limit = self.host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return limit
+
+    async def get(self, url, headers=None, ttl=None):
+        with tracing.span("fetch", tracing.CLIENT, **{"url.full": url}) as span:
+            response = await self._get(url, headers, ttl)
+            span.set("http.response.status_code", response.status_code)
+            span.set("cache_hit", response.from_cache)
+            return response
+
+    async def _get(self, url, headers, ttl):
+        cache, entry = _lookup(url, ttl)
+        if entry and entry.is_fresh(ttl):
+            cache.record("hits")
+            return FetchResponse.from_entry(entry)
+        headers = _conditional(headers, entry)
+        target = _route(url) if _route else url
+        limiter = rate_limiter.for_url(target)
+        if limiter:
+            with metrics.timer("rate_limit"):
+                await limiter.acquire_async()
+        status, response, started = None, None, time.perf_counter()
+        cancelled = False
+        metrics.request_started()
+        try:
+            if self.http2:
+                async with self._host_limit(target):
+                    response = await self.client.get(target, headers=headers)
+                status, content, encoding = response.status_code, response.content, response.encoding
+            else:
+                async with self.client.get(target, headers=headers) as response:
+                    headers_at = time.perf_counter()
+                    metrics.interval("wait", started, headers_at)
+                    content = await response.read()
+                    status, encoding = response.status, response.charset
+                    metrics.interval("download", headers_at, time.perf_counter())
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            ended = time.perf_counter()
+            metrics.request_finished(ended - started)
+            if limiter and cancelled:
+                limiter.cancel()  # we gave up on it; says nothing about the host
+            elif limiter:
+                limiter.release(status, ended - started, response.headers if response is not None else None)
+        if _tap:
+            _tap(url, status, response.headers, content)
+        cached = _store(cache, entry, url, status, response.headers, content, encoding)
+        return cached or FetchResponse(url, status, response.headers, content, encoding)
+
+    async def aclose(self):
+        if self.http2:
+            await self.client.aclose()
+        else:
+            await self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+
+def _connection_trace(aiohttp):
+    # aiohttp request tracing -> the dns / connect stages. Its connection
+    # set-up covers DNS, TCP and TLS in one step.
+    async def dns_start(session, ctx, params):
+        ctx.dns_started = time.perf_counter()
+
+    async def dns_end(session, ctx, params):
+        metrics.interval("dns", ctx.dns_started, time.perf_counter(), **{"server.address": params.host})
+
+    async def connect_start(session, ctx, params):
+        ctx.connect_started = time.perf_counter()
+
+    async def connect_end(session, ctx, params):
+        metrics.interval("connect", ctx.connect_started, time.perf_counter())
+
+    config = aiohttp.TraceConfig()
+    config.on_dns_resolvehost_start.append(dns_start)
+    config.on_dns_resolvehost_end.append(dns_end)
+    config.on_connection_create_start.append(connect_start)
+    config.on_connection_create_end.append(connect_end)
+    return config
+
+
+async def fetch_stream(jobs, on_response, on_error=None, concurrency=1000,
+                       per_host_limit=DEFAULT_PER_HOST_LIMIT, http2=False, timeout=DEFAULT_TIMEOUT, ttl=None,
+                       retry=None, parse_threads=DEFAULT_PARSE_THREADS):
+    # Async generator. jobs yields (target, url, headers); for every completed
+    # request on_response(target, response) is called (on_error(target, exc)
+    # for failures) and any non-None return value is yielded as it completes.
+    # At most `concurrency` requests are in flight, so a lazy job generator
+    # is never fully materialized.
+    # retry (a retry.RetryPolicy) retries failed targets after a backoff and
+    # sends the ones that keep failing to its dead-letter list. A target
+    # waiting for its retry does not count against `concurrency`.
+    # on_response runs on a pool of parse_threads threads (in the task's
+    # context, so its spans nest under the target's), never on the loop.
+    in_flight = asyncio.Semaphore(concurrency)
+    done = asyncio.Queue(maxsize=max(1, concurrency))
+    tasks = set()
+    loop = asyncio.get_running_loop()
+    parse_pool = ThreadPoolExecutor(max(1, parse_threads), thread_name_prefix="parse")
+
+    async with AsyncFetcher(per_host_limit, http2=http2, timeout=timeout) as fetcher:
+
+        async def run(target, url, headers):
+            holding = True
+            attempt = 1
+            try:
+                while True:
+                    try:
+                        with tracing.span("scrape", target=target, attempt=attempt):
+                            response = await fetcher.get(url, headers=headers, ttl=ttl)
+                            if retry:
+                                retry.check(response)
+                            result = await loop.run_in_executor(parse_pool, contextvars.copy_context().run,
+                                                                on_response, target, response)
+                    except Exception as e:
+                        if retry and retry.should_retry(e, attempt):
+                            delay = retry.delay(attempt, e)
+                            retry.retrying(target, e, attempt, delay)
+                            metrics.count("retried")
+                            attempt += 1
+                            # Let another target use the slot while we wait
+                            in_flight.release()
+                            holding = False
+                            await asyncio.sleep(delay)
+                            await in_flight.acquire()
+                            holding = True
+                            continue
+                        if retry:
+                            retry.give_up(target, e, attempt)
+                        if on_error:
+                            result = on_error(target, e)
+                        else:
+                            print(f"{target}, Error: {e}")
+                            result = None
+                    break
+                if metrics.finished(result) is not None:
+                    await done.put(result)
+            finally:
+                if holding:
+                    in_flight.release()
+
+        async def produce():
+            for target, url, headers in jobs:
+                await in_flight.acquire()
+                task = asyncio.create_task(run(target, url, headers))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+            await done.put(_DONE)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                result = await done.get()
+                if result is _DONE:
+                    break
+                yield result
+        finally:
+            producer.cancel()
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(producer, *tasks, return_exceptions=True)
+            parse_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_async(jobs, on_response, on_error=None, concurrency=1000, **kwargs):
+    # Plain generator over fetch_stream()
+    return sync_iter(lambda: fetch_stream(jobs, on_response, on_error, concurrency, **kwargs), concurrency)
+
+
+def sync_iter(make_stream, maxsize=1000):
+    # Plain generator over the async generator make_stream() returns. The
+    # event loop runs on a background thread and hands results over through
+    # a bounded queue.
+    out = queue.Queue(maxsize=max(1, maxsize))
+    cancelled = threading.Event()
+
+    def put(value):
+        while not cancelled.is_set():
+            try:
+                out.put(value, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    async def pump():
+        stream = make_stream()
+        try:
+            async for result in stream:
+                if cancelled.is_set():
+                    break
+                if out.full():
+                    await asyncio.to_thread(put, result)
+                else:
+                    out.put_nowait(result)
+        finally:
+            await stream.aclose()
+
+    def loop():
+        try:
+            asyncio.run(pump())
+        except Exception as e:
+            print(f"[ERROR] async fetch loop: {e}")
+        finally:
+            put(_DONE)
+
+    threading.Thread(target=loop, daemon=True).start()
+    try:
+        while True:
+            result = out.get()
+            if result is _DONE:
+                return
+            yield result
+    finally:
+        cancelled.set()
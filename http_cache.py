@@ -0,0 +1,194 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Persistent HTTP response cache shared by all scrapers (SQLite, keyed by URL).
+#
+# fetcher looks pages up here before going to the network:
+#   - fresh entry (younger than the scraper's TTL)  -> served from disk (hit)
+#   - stale entry with ETag / Last-Modified         -> conditional request;
+#                                                      a 304 refreshes it (revalidated)
+#   - nothing usable                                -> normal request (miss)
+# Only 200 responses are stored. When the file grows past max_bytes the
+# least recently used entries are evicted.
+#
+# The cache file defaults to http_cache.sqlite in the working directory;
+# set SCRAPER_CACHE to another path, or to "off" to disable it.
+
+DEFAULT_PATH = "http_cache.sqlite"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class CacheEntry:
+    def __init__(self, url, status, headers, body, encoding, etag, last_modified, stored_at):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+    def is_fresh(self, ttl):
+        return time.time() - self.stored_at < ttl
+
+    def validators(self):
+        # Headers for a conditional request, empty if we have no validator
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB,"
+            " encoding TEXT, etag TEXT, last_modified TEXT,"
+            " stored_at REAL, accessed_at REAL, size INTEGER)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.reset_stats()
+
+    # --- stats ---
+
+    def reset_stats(self):
+        self.hits = self.revalidated = self.misses = 0
+
+    def record(self, kind):
+        with self.lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+
+    def stats(self):
+        total = self.hits + self.revalidated + self.misses
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.revalidated) / total if total else 0.0,
+        }
+
+    def stats_line(self):
+        s = self.stats()
+        return (f"cache: {s['hits']} hits, {s['revalidated']} revalidated, "
+                f"{s['misses']} misses ({s['hit_rate']:.0%} hit rate)")
+
+    # --- storage ---
+
+    def get(self, url):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT url, status, headers, body, encoding, etag, last_modified, stored_at"
+                " FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        url, status, headers, body, encoding, etag, last_modified, stored_at = row
+        return CacheEntry(url, status, json.loads(headers), body, encoding, etag, last_modified, stored_at)
+
+    def put(self, url, status, headers, body, encoding=None):
+        headers = dict(headers)
+        etag = _header(headers, "ETag")
+        last_modified = _header(headers, "Last-Modified")
+        now = time.time()
+        size = len(body) + len(url)
+        with self.lock:
+            old = self.db.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, status, json.dumps(headers), body, encoding, etag, last_modified, now, now, size),
+            )
+            self.total_bytes += size - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def refresh(self, url):
+        # A 304 confirmed the stored copy is still current
+        now = time.time()
+        with self.lock:
+            self.db.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+
+    def _evict(self):
+        # Drop least recently used entries until we are at 90% of the limit
+        target = self.max_bytes * 0.9
+        rows = self.db.execute("SELECT url, size FROM responses ORDER BY accessed_at").fetchall()
+        doomed = []
+        for url, size in rows:
+            if self.total_bytes <= target:
+                break
+            doomed.append((url,))
+            self.total_bytes -= size
+        self.db.executemany("DELETE FROM responses WHERE url = ?", doomed)
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM responses")
+            self.total_bytes = 0
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def _header(headers, name):
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_path = os.environ.get("SCRAPER_CACHE", DEFAULT_PATH)
+_max_bytes = DEFAULT_MAX_BYTES
+
+
+def _enabled():
+    return bool(_path) and _path.lower() not in ("0", "off", "none")
+
+
+def get_cache():
+    # The shared cache, opened on first use (None when disabled)
+    global _cache
+    if _cache is None and _enabled():
+        with _cache_lock:
+            if _cache is None:
+                _cache = HttpCache(_path, _max_bytes)
+    return _cache
+
+
+def configure(path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+    # Point the shared cache at another file / size limit; path=None disables it
+    global _cache, _path, _max_bytes
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = None
+        _path = path
+        _max_bytes = max_bytes
+    return get_cache()
+
+
+def stats_line():
+    cache = get_cache()
+    return cache.stats_line() if cache else "cache: off"
+
+
+def reset_stats():
+    cache = get_cache()
+    if cache:
+        cache.reset_stats()
@@ -0,0 +1,150 @@
+import bisect
+import ipaddress
+import re
+
+# Target expansion for scrape_ip_data.
+#
+# A spec is a comma-separated list of
+#   192.168.172                 three octets = that /24 (legacy GUI input)
+#   1.1.1.0/24, 2606:4700::/120 CIDR blocks (network/broadcast skipped like
+#                               ipaddress.hosts(), /8s and IPv6 blocks are fine)
+#   10.0.0.1-10.0.0.50          inclusive ranges
+#   10.0.0.7, ::1               single addresses
+#
+# TargetSpace keeps only the (first, last) number of each block, merged and
+# sorted, and numbers every address 0..len-1 across them. Addresses are
+# generated lazily from those indexes, so even a /8 is never held in memory,
+# and the index doubles as the position in a checkpoint journal.
+#
+# Sharding: the index space is cut into blocks of SHARD_BLOCK addresses and
+# block k belongs to shard k % shards, so N processes / hosts given the same
+# spec and shard=0..N-1 cover it exactly once, each in runs of consecutive
+# addresses (neighbours tend to share ipinfo data and cache well).
+
+SHARD_BLOCK = 256
+
+_LEGACY_SUBNET = re.compile(r"^\d{1,3}\.\d{1,3}\.\d{1,3}$")
+
+
+def _ipv4(n):
+    # Much cheaper than str(IPv4Address(n)) on big sweeps
+    return f"{n >> 24}.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+
+
+def _ipv6(n):
+    return str(ipaddress.IPv6Address(n))
+
+
+_ADDRESS = {4: _ipv4, 6: _ipv6}
+
+
+def _segment(item):
+    # (first, last) as integers plus the IP version
+    if _LEGACY_SUBNET.match(item):
+        item += ".0/24"
+    if "/" in item:
+        network = ipaddress.ip_network(item, strict=False)
+        first, last = int(network.network_address), int(network.broadcast_address)
+        if network.version == 4 and network.prefixlen < 31:
+            first, last = first + 1, last - 1  # skip network and broadcast
+        elif network.version == 6 and network.prefixlen < 127:
+            first += 1  # skip the subnet-router anycast address
+        return first, last, network.version
+    if "-" in item:
+        low, high = (ipaddress.ip_address(part.strip()) for part in item.split("-", 1))
+        if low.version != high.version:
+            raise ValueError(f"range mixes IPv4 and IPv6: {item}")
+        if int(high) < int(low):
+            raise ValueError(f"range ends before it starts: {item}")
+        return int(low), int(high), low.version
+    address = ipaddress.ip_address(item)
+    return int(address), int(address), address.version
+
+
+def parse_spec(spec):
+    # Merged, sorted [(first, last, version)]; overlapping items count once
+    segments = [_segment(item.strip()) for item in spec.split(",") if item.strip()]
+    if not segments:
+        raise ValueError("no IP targets given")
+    merged = []
+    for first, last, version in sorted(segments, key=lambda s: (s[2], s[0])):
+        if merged and merged[-1][2] == version and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last), version)
+        else:
+            merged.append((first, last, version))
+    return merged
+
+
+class TargetSpace:
+    def __init__(self, spec):
+        self.spec = spec
+        self.segments = parse_spec(spec)
+        self.offsets = []  # index of each segment's first address
+        # (version, first) of each segment, sorted like the segments, so
+        # index() can bisect instead of scanning (sweeps call it per record)
+        self.starts = [(version, first) for first, _, version in self.segments]
+        total = 0
+        for first, last, _ in self.segments:
+            self.offsets.append(total)
+            total += last - first + 1
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def address(self, index):
+        # The index-th address as a string
+        k = bisect.bisect_right(self.offsets, index) - 1
+        first, _, version = self.segments[k]
+        return _ADDRESS[version](first + index - self.offsets[k])
+
+    def index(self, ip):
+        # Inverse of address(); ValueError if ip is not in the space
+        address = ipaddress.ip_address(ip)
+        n = int(address)
+        k = bisect.bisect_right(self.starts, (address.version, n)) - 1
+        if k >= 0:
+            first, last, version = self.segments[k]
+            if version == address.version and first <= n <= last:
+                return self.offsets[k] + n - first
+        raise ValueError(f"{ip} is not in {self.spec}")
+
+    def in_shard(self, index, shard=0, shards=1):
+        return shards == 1 or (index // SHARD_BLOCK) % shards == shard
+
+    def shard_size(self, shard=0, shards=1):
+        # Number of addresses addresses(shard, shards) yields
+        blocks = range(shard * SHARD_BLOCK, self.total, shards * SHARD_BLOCK)
+        if not blocks:
+            return 0
+        return (len(blocks) - 1) * SHARD_BLOCK + min(SHARD_BLOCK, self.total - blocks[-1])
+
+    def spec_between(self, lo, hi):
+        # Spec for the addresses with index lo..hi-1 as inclusive ranges, one
+        # per segment they touch (a work unit, see distributed)
+        parts = []
+        index = lo
+        while index < hi:
+            k = bisect.bisect_right(self.offsets, index) - 1
+            first, last, version = self.segments[k]
+            stop = min(hi, self.offsets[k] + last - first + 1)
+            make = _ADDRESS[version]
+            parts.append(f"{make(first + index - self.offsets[k])}-{make(first + stop - 1 - self.offsets[k])}")
+            index = stop
+        return ", ".join(parts)
+
+    def addresses(self, shard=0, shards=1):
+        # Lazily yield this shard's addresses, walking each segment directly
+        # instead of bisecting per address
+        if not 0 <= shard < shards:
+            raise ValueError(f"shard must be in 0..{shards - 1}")
+        for block_start in range(shard * SHARD_BLOCK, self.total, shards * SHARD_BLOCK):
+            block_end = min(block_start + SHARD_BLOCK, self.total)
+            index = block_start
+            while index < block_end:
+                k = bisect.bisect_right(self.offsets, index) - 1
+                first, last, version = self.segments[k]
+                make = _ADDRESS[version]
+                stop = min(block_end, self.offsets[k] + last - first + 1)
+                yield from map(make, range(first + index - self.offsets[k], first + stop - self.offsets[k]))
+                index = stop
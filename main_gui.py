@@ -1,13 +1,19 @@
 import customtkinter as ctk
 import tkinter as tk
+import collections
+import itertools
+import queue
 import re
 import time
 import threading
-import importlib
 import json
-import os
-import csv
 from PIL import Image # Required for CTkImage
+import http_cache
+import metrics
+from records import as_dict
+import scrapers
+from scrapers import SCRAPER_MAP
+from sinks import CsvPages, CsvSink, json_chunk, json_end
 
 # --- Configuration ---
 ctk.set_appearance_mode("dark")
@@ -44,124 +50,274 @@ def do_move(event):
 app.bind("<ButtonPress-1>", start_move)
 app.bind("<B1-Motion>", do_move)
 
-# --- Scraper Map (unchanged) ---
-SCRAPER_MAP = {
-    "IP Data": {
-        "module": "scrape_ip_data",
-        "prompt": "Enter the IP subnet:",
-        "example": "e.g., 192.168.172",
-        "validation": r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){2}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$",
-        "csv_filename": "results_ip_data.csv"
-    },
-    "Weather Data": {
-        "module": "scrape_weatherdata",
-        "prompt": "Enter cities (comma-separated):",
-        "example": "e.g., pakistan/lahore, usa/new-york",
-        "validation": r"^([a-zA-Z\-]+\/[a-zA-Z\-]+)(\s*,\s*[a-zA-Z\-]+\/[a-zA-Z\-]+)*$",
-        "csv_filename": "results_weather_data.csv"
-    },
-    "Stock Price": {
-        "module": "scrape_stock_price",
-        "prompt": "Enter stock symbols (comma-separated):",
-        "example": "e.g., AAPL, MSFT, GOOGL",
-        "validation": r"^[A-Z]+(?:,\s*[A-Z]+)*$",
-        "csv_filename": "results_stock_price.csv"
-    },
-    "ASN Data": {
-        "module": "scrape_asn_data",
-        "prompt": "Enter ASN Numbers range",
-        "example": "e.g., 1570-1579",
-        "validation": r"^[0-9]+-[0-9]+$",
-        "csv_filename": "results_asn_data.csv"
-    }
-}
+# --- Scraper Map (see scrapers.py) ---
 
 # --- Utility Functions ---
 def validate_input(scraper_type, user_input):
     pattern = SCRAPER_MAP[scraper_type]["validation"]
     return re.fullmatch(pattern, user_input.strip()) is not None
 
+# --- Results: worker thread -> queue -> Tk main loop ---
+# Tk widgets may only be touched from the main loop. The scraper thread
+# never does: it puts batches of records on a queue, and poll_events()
+# (re-armed with app.after) moves them into the ResultView a time slice at
+# a time. The output box only ever shows one page of records, highlighted
+# a few records per idle callback, so even a 100k-record sweep keeps the
+# window responsive. Memory stays flat too: the view keeps the newest
+# WINDOW records and pages older ones back from the CSV the worker writes.
+
+POLL_MS = 50          # how often the main loop checks for new records
+DASHBOARD_MS = 500    # dashboard refresh interval
+POLL_BUDGET = 0.02    # seconds of queue draining per check
+BATCH_SECONDS = 0.1   # the worker hands over records at least this often
+PAGE_SIZE = 50        # records shown per page
+WINDOW = 20 * PAGE_SIZE  # newest records kept in memory (older pages come from the CSV)
+RENDER_CHUNK = 10     # records highlighted per idle callback
+
+_JSON_TOKEN = re.compile(r'("(?:[^"\\]|\\.)*")(\s*:)?|(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)|(true|false)|(null)')
+
+def json_segments(json_str):
+    # [text, tags, text, tags, ...] for one Text.insert call: a single
+    # regex pass instead of one insert per character
+    segments = []
+    pos = 0
+    for match in _JSON_TOKEN.finditer(json_str):
+        if match.start() > pos:
+            segments += [json_str[pos:match.start()], ()]
+        string, colon, number, boolean, null = match.groups()
+        if string is not None:
+            segments += [string, "key" if colon else "value"]
+            if colon:
+                segments += [colon, ()]
+        elif number is not None:
+            segments += [number, "number"]
+        elif boolean is not None:
+            segments += [boolean, "boolean"]
+        else:
+            segments += [null, "null"]
+        pos = match.end()
+    if pos < len(json_str):
+        segments += [json_str[pos:], ()]
+    return segments
+
+def append_json(output_widget, json_str):
+    # Highlight json_str and add it to the end of the output box
+    segments = json_segments(json_str)
+    if segments:
+        output_widget.configure(state="normal")
+        output_widget.insert("end", *segments)
+        output_widget.configure(state="disabled")
+
 def highlight_json(output_widget, json_str):
     output_widget.configure(state="normal")
     output_widget.delete("1.0", "end")
-    i = 0
-    while i < len(json_str):
-        if json_str[i] == '"':
-            start = i
-            i += 1
-            while i < len(json_str) and json_str[i] != '"':
-                if json_str[i] == '\\': i += 1
-                i += 1
-            i += 1
-            word = json_str[start:i]
-            if json_str[i:i+1] == ':':
-                output_widget.insert("end", word, "key")
-            else:
-                output_widget.insert("end", word, "value")
-        elif json_str[i].isdigit() or json_str[i] == '-':
-            start = i
-            while i < len(json_str) and (json_str[i].isdigit() or json_str[i] in ".eE-+"):
-                i += 1
-            output_widget.insert("end", json_str[start:i], "number")
-        elif json_str[i:i+4].lower() == "true" or json_str[i:i+5].lower() == "false":
-            bool_val = "true" if json_str[i:i+4].lower() == "true" else "false"
-            output_widget.insert("end", bool_val, "boolean")
-            i += len(bool_val)
-        elif json_str[i:i+4].lower() == "null":
-            output_widget.insert("end", "null", "null")
-            i += 4
-        else:
-            output_widget.insert("end", json_str[i])
-            i += 1
     output_widget.configure(state="disabled")
+    append_json(output_widget, json_str)
+
+class ResultView:
+    # The current run's records, with one page of them in the box. Only the
+    # newest WINDOW records are kept in memory; older pages are read back
+    # from the run's CSV (see sinks.CsvPages) when the user turns to them.
+    def __init__(self, output_box, page_label):
+        self.output_box = output_box
+        self.page_label = page_label
+        self.recent = collections.deque(maxlen=WINDOW)
+        self.count = 0          # records of this run, in memory or not
+        self.source = None      # CsvPages over the rows this run wrote
+        self.page = 0
+        self.run = 0            # bumped by clear(); late batches of older runs are dropped
+        self.render_id = 0      # bumped to abandon a render in progress
+        self.render_pending = False
+
+    def pages(self):
+        return max(1, -(-self.count // PAGE_SIZE))
+
+    def clear(self):
+        self.recent.clear()
+        self.count = 0
+        self.source = None
+        self.page = 0
+        self.run += 1
+        self.render()
+
+    def attach(self, source):
+        self.source = source
+
+    def add(self, records):
+        shown_before = self.count < (self.page + 1) * PAGE_SIZE
+        self.recent.extend(records)
+        self.count += len(records)
+        self.update_label()
+        if shown_before:
+            self.render()  # new records landed on the visible page
+
+    def go(self, delta):
+        page = min(max(self.page + delta, 0), self.pages() - 1)
+        if page != self.page:
+            self.page = page
+            self.render()
+
+    def page_records(self, page):
+        first = page * PAGE_SIZE
+        oldest = self.count - len(self.recent)  # run index of recent[0]
+        if first >= oldest or self.source is None:
+            start = max(first - oldest, 0)
+            return list(itertools.islice(self.recent, start, start + PAGE_SIZE))
+        return self.source.page(page)
+
+    def update_label(self):
+        self.page_label.configure(text=f"Page {self.page + 1} / {self.pages()}  ({self.count} records)")
+
+    def render(self):
+        # Coalesce: at most one redraw queued, whatever arrives meanwhile
+        self.update_label()
+        if not self.render_pending:
+            self.render_pending = True
+            self.output_box.after_idle(self._start_render)
+
+    def _start_render(self):
+        self.render_pending = False
+        self.render_id += 1
+        highlight_json(self.output_box, "")
+        self._render_chunk(self.render_id, self.page_records(self.page), 0)
+
+    def _render_chunk(self, render_id, page, i):
+        if render_id != self.render_id:
+            return
+        text = "".join(json_chunk(as_dict(record), i + n == 0) for n, record in enumerate(page[i:i + RENDER_CHUNK]))
+        if i + RENDER_CHUNK >= len(page):
+            append_json(self.output_box, text + json_end(not page))
+        else:
+            append_json(self.output_box, text)
+            self.output_box.after_idle(self._render_chunk, render_id, page, i + RENDER_CHUNK)
 
-def run_scraper(scraper_type, user_input, output_box, button, exec_label, message_label):
+    def to_json(self):
+        # The whole run, from the CSV when the oldest records are only there
+        if self.source is not None and self.count > len(self.recent):
+            records = self.source
+        else:
+            records = self.recent
+        return json.dumps([as_dict(record) for record in records], indent=4)
+
+class Dashboard:
+    # Live counters for the running scrape, redrawn every DASHBOARD_MS from
+    # metrics.snapshot() on the main loop (the workers only bump counters)
+    TILES = (("done", "Done"), ("failed", "Failed"), ("in_flight", "In flight"), ("rate", "Req/s"),
+             ("fetch", "Fetch p50 / p95"), ("parse", "Parse p50 / p95"), ("cache", "Cache hits"), ("eta", "ETA"))
+
+    def __init__(self, parent):
+        self.frame = ctk.CTkFrame(parent, fg_color=CARD_BG_COLOR, corner_radius=10)
+        self.values = {}
+        self.job = None
+        for column, (key, title) in enumerate(self.TILES):
+            self.frame.columnconfigure(column, weight=1)
+            ctk.CTkLabel(self.frame, text=title, font=("Segoe UI", 11), text_color=SUB_TEXT_COLOR).grid(row=0, column=column, padx=8, pady=(8, 0))
+            self.values[key] = ctk.CTkLabel(self.frame, text="-", font=("Segoe UI", 16, "bold"), text_color=TEXT_COLOR)
+            self.values[key].grid(row=1, column=column, padx=8, pady=(0, 8))
+
+    def start(self):
+        self.stop()
+        self.refresh()
+
+    def stop(self):
+        if self.job is not None:
+            self.frame.after_cancel(self.job)
+            self.job = None
+
+    def refresh(self, again=True):
+        s = metrics.snapshot()
+        cache = http_cache.get_cache()
+        ms = lambda seconds: "-" if seconds is None else f"{seconds * 1000:.0f}ms"
+        done = f"{s['done']}" if s["total"] is None else f"{s['done']} / {s['total']}"
+        texts = {
+            "done": done,
+            "failed": str(s["failed"]),
+            "in_flight": str(s["in_flight"]),
+            "rate": f"{s['req_per_sec']:.1f}",
+            "fetch": f"{ms(s.get('fetch_p50'))} / {ms(s.get('fetch_p95'))}",
+            "parse": f"{ms(s.get('parse_p50'))} / {ms(s.get('parse_p95'))}",
+            "cache": f"{cache.stats()['hit_rate']:.0%}" if cache else "off",
+            "eta": metrics.format_duration(s["eta"]),
+        }
+        for key, text in texts.items():
+            self.values[key].configure(text=text)
+        self.job = self.frame.after(DASHBOARD_MS, self.refresh) if again else None
+
+def scrape_worker(scraper_type, user_input, events):
+    # Runs on its own thread: scrapes into the CSV and reports through
+    # `events` only (("start", CsvPages over this run's rows),
+    # ("records", [...]), ("done", text) or ("error", text)). Each batch is
+    # on disk before it is handed over, so the view can read it back.
     start_time = time.time()
     try:
-        output_box.configure(state="normal")
-        output_box.delete("1.0", "end")
-        output_box.configure(state="disabled")
-        exec_label.configure(text="")
-        message_label.configure(text="", text_color=TEXT_COLOR)
-
         try:
-            module = importlib.import_module(SCRAPER_MAP[scraper_type]["module"])
-        except ModuleNotFoundError:
-            message_label.configure(text=f"Error: Scraper module '{SCRAPER_MAP[scraper_type]['module']}.py' not found. Please ensure the scraper files are in the same directory.", text_color="red")
+            module = scrapers.load(scraper_type)
+        except ModuleNotFoundError as e:
+            events.put(("error", f"Error: Scraper module '{e.name}.py' not found. Please ensure the scraper files are in the same directory."))
             return
 
-        result = module.main(user_input.strip())
-        json_str = json.dumps(result, indent=4)
-
-        csv_filename = SCRAPER_MAP[scraper_type]["csv_filename"]
-        file_exists = os.path.exists(csv_filename)
-
-        with open(csv_filename, "a", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            if isinstance(result, list) and result and isinstance(result[0], dict):
-                if not file_exists:
-                    writer.writerow(result[0].keys())
-                for row in result:
-                    writer.writerow(row.values())
-            elif isinstance(result, dict):
-                if not file_exists:
-                    writer.writerow(result.keys())
-                writer.writerow(result.values())
-            else:
-                if not file_exists:
-                    writer.writerow(["Result"])
-                writer.writerow([str(result)])
-
-        highlight_json(output_box, json_str)
+        http_cache.reset_stats()
+        batch = []
+        last = time.monotonic()
+        filename = SCRAPER_MAP[scraper_type]["csv_filename"]
+        with CsvSink(filename, module.FIELDS) as sink:
+            events.put(("start", CsvPages(filename, sink.checkpoint(), module.FIELDS, module.TYPES, PAGE_SIZE)))
+            for record in module.iter_results(user_input.strip()):
+                sink.write(record)
+                batch.append(record)
+                if time.monotonic() - last >= BATCH_SECONDS:
+                    sink.flush()
+                    events.put(("records", batch))
+                    batch = []
+                    last = time.monotonic()
+        if batch:
+            events.put(("records", batch))
+
         duration = round(time.time() - start_time, 2)
-        exec_label.configure(text=f"✔ Completed in {duration} seconds", text_color="lightgreen")
-        message_label.configure(text="Scraping completed successfully!", text_color="green")
+        events.put(("done", f"✔ Completed in {duration} seconds  |  {http_cache.stats_line()}"))
     except Exception as e:
-        message_label.configure(text=f"Error: {str(e)}", text_color="red")
-    finally:
+        events.put(("error", f"Error: {str(e)}"))
+
+def poll_events(events, view, run, button, exec_label, message_label):
+    # Main loop side of scrape_worker; `run` is the view's run it fills
+    deadline = time.monotonic() + POLL_BUDGET
+    while time.monotonic() < deadline:
+        try:
+            kind, payload = events.get_nowait()
+        except queue.Empty:
+            break
+        if kind == "start":
+            if view.run == run:
+                view.attach(payload)
+            continue
+        if kind == "records":
+            if view.run == run:
+                view.add(payload)
+                exec_label.configure(text=f"{view.count} records so far...", text_color=TEXT_COLOR)
+            continue
+        if kind == "done":
+            exec_label.configure(text=payload, text_color="lightgreen")
+            message_label.configure(text="Scraping completed successfully!", text_color="green")
+        else:
+            message_label.configure(text=payload, text_color="red")
+        view.render()
+        dashboard.stop()
+        dashboard.refresh(again=False)
         button.configure(state="normal", text="Submit")
+        return
+    app.after(POLL_MS, poll_events, events, view, run, button, exec_label, message_label)
+
+def run_scraper(scraper_type, user_input, view, button, exec_label, message_label):
+    view.clear()
+    exec_label.configure(text="")
+    message_label.configure(text="", text_color=TEXT_COLOR)
+    events = queue.Queue()
+    metrics.reset()
+    dashboard.start()
+    threading.Thread(target=scrape_worker, args=(scraper_type, user_input, events), daemon=True).start()
+    app.after(POLL_MS, poll_events, events, view, view.run, button, exec_label, message_label)
 
-def submit(scraper_type, user_input, entry, output_box, button, exec_label, message_label):
+def submit(scraper_type, user_input, entry, view, button, exec_label, message_label):
     message_label.configure(text="", text_color=TEXT_COLOR)
     if not validate_input(scraper_type, user_input.get()):
         entry.configure(border_color="red")
@@ -169,7 +325,7 @@ def submit(scraper_type, user_input, entry, output_box, button, exec_label, mess
         return
     entry.configure(border_color="green")
     button.configure(state="disabled", text="Processing...")
-    threading.Thread(target=run_scraper, args=(scraper_type, user_input.get(), output_box, button, exec_label, message_label)).start()
+    run_scraper(scraper_type, user_input.get(), view, button, exec_label, message_label)
 
 # Hover functions for cards
 def on_enter(event, card):
@@ -274,7 +430,7 @@ title = ctk.CTkLabel(scroll_frame, text="⚡ Scraper Interface", font=("Segoe UI
 title.pack(pady=(20, 20))
 
 scraper_type = tk.StringVar(value="IP Data")
-dropdown = ctk.CTkOptionMenu(scroll_frame, values=list(SCRAPER_MAP.keys()), variable=scraper_type,
+dropdown = ctk.CTkOptionMenu(scroll_frame, values=scrapers.names(), variable=scraper_type,
                              font=("Segoe UI", 14), dropdown_font=("Segoe UI", 14),
                              button_color=BUTTON_COLOR, button_hover_color=BUTTON_HOVER_COLOR, text_color=TEXT_COLOR)
 dropdown.pack(pady=10)
@@ -293,10 +449,14 @@ input_entry = ctk.CTkEntry(scroll_frame, textvariable=input_var, width=500, font
                            border_color=DEFAULT_BORDER_COLOR, fg_color="#1e1e1e", text_color=TEXT_COLOR)
 input_entry.pack(pady=10)
 
-submit_btn = ctk.CTkButton(scroll_frame, text="Submit", command=lambda: submit(scraper_type.get(), input_var, input_entry, output_box, submit_btn, exec_label, message_label),
+submit_btn = ctk.CTkButton(scroll_frame, text="Submit", command=lambda: submit(scraper_type.get(), input_var, input_entry, result_view, submit_btn, exec_label, message_label),
                            font=("Segoe UI", 16, "bold"), height=40, fg_color=BUTTON_COLOR, hover_color=BUTTON_HOVER_COLOR, text_color=TEXT_COLOR)
 submit_btn.pack(pady=15)
 
+# Live progress / throughput / latency while a scrape runs (see Dashboard)
+dashboard = Dashboard(scroll_frame)
+dashboard.frame.pack(pady=(5, 0), fill="x", padx=40)
+
 output_box = tk.Text(scroll_frame, height=15, bg="#1e1e1e", fg=TEXT_COLOR, insertbackground=TEXT_COLOR, wrap="none",
                      font=("Consolas", 12))
 output_box.tag_config("key", foreground="#7FD7FF")
@@ -306,10 +466,24 @@ output_box.tag_config("boolean", foreground="#BA68C8")
 output_box.tag_config("null", foreground="#808080")
 output_box.pack(pady=10, fill="x", padx=40)
 
+# Pager for the output box (see ResultView)
+pager_frame = ctk.CTkFrame(scroll_frame, fg_color="transparent")
+pager_frame.pack(pady=(0, 5))
+prev_btn = ctk.CTkButton(pager_frame, text="◀ Prev", width=90, command=lambda: result_view.go(-1),
+                         font=("Segoe UI", 13), fg_color=BUTTON_COLOR, hover_color=BUTTON_HOVER_COLOR, text_color=TEXT_COLOR)
+prev_btn.pack(side="left", padx=5)
+page_label = ctk.CTkLabel(pager_frame, text="", font=("Segoe UI", 12), text_color=SUB_TEXT_COLOR)
+page_label.pack(side="left", padx=10)
+next_btn = ctk.CTkButton(pager_frame, text="Next ▶", width=90, command=lambda: result_view.go(1),
+                         font=("Segoe UI", 13), fg_color=BUTTON_COLOR, hover_color=BUTTON_HOVER_COLOR, text_color=TEXT_COLOR)
+next_btn.pack(side="left", padx=5)
+result_view = ResultView(output_box, page_label)
+result_view.update_label()
+
 exec_label = ctk.CTkLabel(scroll_frame, text="", font=("Segoe UI", 12), text_color=TEXT_COLOR)
 exec_label.pack(pady=5)
 
-copy_btn = ctk.CTkButton(scroll_frame, text="📋 Copy JSON", command=lambda: app.clipboard_append(output_box.get("1.0", "end")),
+copy_btn = ctk.CTkButton(scroll_frame, text="📋 Copy JSON", command=lambda: (app.clipboard_clear(), app.clipboard_append(result_view.to_json())),
                          font=("Segoe UI", 14), fg_color=BUTTON_COLOR, hover_color=BUTTON_HOVER_COLOR, text_color=TEXT_COLOR)
 copy_btn.pack(pady=5)
 
@@ -354,22 +528,23 @@ scraper_info = {
         "from_website": "ipinfo.io",
         "schema": {
             "ip": "1.1.1.15",
-            "City": "Brisbane",
-            "State": "Queensland",
-            "Country": "Australia",
-            "Postal": "4101",
-            "Local time": "04:51 PM, Wednesday, June 18, 2025",
-            "Timezone": "Australia/Brisbane",
-            "Coordinates": "-27.4816,153.0175",
-            "ASN": "AS13335 (/AS13335)",
-            "Hostname": "No Hostname",
-            "Range": "1.1.1.0/24 (/AS13335/1.1.1.0/24)",
-            "Company": "APNIC and Cloudflare DNS Resolver project",
-            "Hosted domains": "0",
-            "Privacy": "True",
-            "Anycast": "True",
-            "ASN type": "Hosting",
-            "Abuse contact": "helpdesk@apnic.net (mailto:helpdesk@apnic.net)"
+            "city": "Brisbane",
+            "state": "Queensland",
+            "country": "Australia",
+            "postal": "4101",
+            "local_time": "04:51 PM, Wednesday, June 18, 2025",
+            "timezone": "Australia/Brisbane",
+            "latitude": -27.4816,
+            "longitude": 153.0175,
+            "asn": 13335,
+            "hostname": None,
+            "range": "1.1.1.0/24",
+            "company": "APNIC and Cloudflare DNS Resolver project",
+            "hosted_domains": 0,
+            "privacy": True,
+            "anycast": True,
+            "asn_type": "Hosting",
+            "abuse_contact": "helpdesk@apnic.net"
         }
     },
     "Weather Data": {
@@ -377,13 +552,13 @@ scraper_info = {
         "from_website": "www.timeanddate.com",
         "schema": {
             "city": "pakistan/lahore",
-            "temperature": "36\u00a0\u00b0C",
+            "temperature_c": 36.0,
             "condition": "Passing clouds.",
-            "visibility": "6\u00a0km",
-            "pressure": "999 mbar",
-            "humidity": "44%",
-            "dew_point": "22\u00a0\u00b0C",
-            "forecast": "N/A",
+            "visibility_km": 6.0,
+            "pressure_mbar": 999.0,
+            "humidity_pct": 44.0,
+            "dew_point_c": 22.0,
+            "forecast": None,
             "timestamp": "2025-06-18 11:54:33",
             "source": "https://www.timeanddate.com/weather/pakistan/lahore"
         }
@@ -394,25 +569,25 @@ scraper_info = {
         "schema": {
             "symbol": "AAPL",
             "source": "https://finance.yahoo.com/quote/AAPL",
-            "price": "5,992.25",
-            "change": "+7.25",
-            "percent_change": "-2.64%"
+            "price": 5992.25,
+            "change": 7.25,
+            "percent_change": -2.64
         }
     },
     "ASN Data": {
         "description": "Fetches Autonomous System Number details from internet registries.",
         "from_website": "ipinfo.io",
         "schema": {
-            "asn": "AS1572",
-            "Country": "United States (/countries/us)",
-            "Website": "mail.mil (https://host.io/mail.mil)",
-            "Hosted domains": "0",
-            "Number of IPv4": "0",
-            "Number of IPv6": "0",
-            "ASN type": "Inactive",
-            "Registry": "arin",
-            "Allocated": "19 years ago on Apr 03, 2006",
-            "Updated": "16 years ago on May 26, 2009"
+            "asn": 1572,
+            "country": "United States",
+            "website": "mail.mil",
+            "hosted_domains": 0,
+            "ipv4_count": 0,
+            "ipv6_count": 0,
+            "asn_type": "Inactive",
+            "registry": "arin",
+            "allocated": "2006-04-03",
+            "updated": "2009-05-26"
         }
     }
 }
@@ -489,9 +664,7 @@ def update_prompt(*_):
     prompt_label.configure(text=SCRAPER_MAP[selected_scraper]["prompt"])
     example_label.configure(text=SCRAPER_MAP[selected_scraper]["example"])
     input_var.set("")
-    output_box.configure(state="normal")
-    output_box.delete("1.0", "end")
-    output_box.configure(state="disabled")
+    result_view.clear()
     exec_label.configure(text="")
     message_label.configure(text="", text_color=TEXT_COLOR)
     input_entry.configure(border_color=DEFAULT_BORDER_COLOR) # Reset border color on scraper type change
@@ -0,0 +1,331 @@
+import collections
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import tracing
+
+# Live run metrics, for the GUI dashboard and cli --stats.
+#
+# The fetch layer, the runners and the parsers report events here as they
+# happen; a reader calls snapshot() on its own schedule. Reporting is a
+# counter bump or a deque append under one lock, so the workers never
+# wait on whoever is displaying the numbers. Reading changes nothing, so
+# any number of readers (dashboard, --stats, /metrics) see the same rates.
+#
+#   requests   - network requests finished (cache hits are not requests)
+#   in_flight  - network requests currently open
+#   done       - targets that produced a record
+#   failed     - targets that ended without one (gave up, bad status, ...)
+#   retried    - retry attempts scheduled
+#   fetch / parse latency - p50 / p95 / p99 over the last WINDOW samples
+#
+# Besides fetch (a whole request) and parse, the hot path times its steps
+# as stages of their own, so a slow run shows where the time goes:
+#
+#   rate_limit - waiting for the host's limiter (see rate_limiter)
+#   dns        - name lookups (async path only)
+#   connect    - new connections: DNS + TCP on the threads path, DNS + TCP
+#                + TLS on the async path (aiohttp reports them as one)
+#   tls        - TLS handshakes (threads path)
+#   wait       - request sent until the response headers (connection
+#                setup included when the request opened one)
+#   download   - reading the response body
+#   write      - one sink batch (see sinks)
+#
+# The http2 (httpx) path only reports fetch. Each stage also keeps a total
+# count and sum, and every timer is a tracing span when tracing is on (see
+# tracing). The numbers can be read as a dict (snapshot), Prometheus text
+# (prometheus, or serve() for a /metrics endpoint) or a JSON file
+# (write_json).
+#
+# Parse timings from worker processes (parse_processes > 0) are not seen
+# here; pages they fail to parse are counted as failed (see parse_pool).
+
+WINDOW = 2048          # latency samples kept per stage
+RATE_WINDOW = 5.0      # seconds of history behind the req/s and ETA figures
+MARK_EVERY = 0.5       # seconds between the progress marks the rates are taken from
+PREFIX = "crawler_"    # Prometheus metric names
+
+STAGE_ORDER = ("rate_limit", "dns", "connect", "tls", "wait", "download", "fetch", "parse", "write")
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, total=None):
+        with self.lock:
+            self.started = time.monotonic()
+            self.counts = collections.Counter()
+            self.in_flight = 0
+            self.total = total
+            self.samples = {"fetch": collections.deque(maxlen=WINDOW), "parse": collections.deque(maxlen=WINDOW)}
+            self.totals = {"fetch": [0, 0.0], "parse": [0, 0.0]}  # stage -> [count, seconds]
+            # (time, requests, finished targets), taken by the reporting side at
+            # most every MARK_EVERY seconds; enough of them to cover RATE_WINDOW
+            self.marks = collections.deque([(self.started, 0, 0)], maxlen=int(RATE_WINDOW / MARK_EVERY) + 2)
+
+    # --- reporting (called from workers) ---
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counts[name] += n
+            self._mark()
+
+    def expect(self, total):
+        # Number of targets in this run (for the ETA); None if unknown
+        with self.lock:
+            self.total = total
+
+    def request_started(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def request_finished(self, seconds):
+        with self.lock:
+            self.in_flight -= 1
+            self.counts["requests"] += 1
+            self.samples["fetch"].append(seconds)
+            total = self.totals["fetch"]
+            total[0] += 1
+            total[1] += seconds
+            self._mark()
+
+    def _mark(self):
+        # caller holds the lock
+        now = time.monotonic()
+        if now - self.marks[-1][0] >= MARK_EVERY:
+            counts = self.counts
+            self.marks.append((now, counts["requests"], counts["done"] + counts["failed"]))
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            samples = self.samples.get(stage)
+            if samples is None:
+                samples = self.samples[stage] = collections.deque(maxlen=WINDOW)
+                self.totals[stage] = [0, 0.0]
+            samples.append(seconds)
+            total = self.totals[stage]
+            total[0] += 1
+            total[1] += seconds
+
+    def timer(self, stage, **attributes):
+        # Times a with-block as `stage`; attributes only go to its span
+        return _Timer(self, stage, attributes)
+
+    def interval(self, stage, started, ended, **attributes):
+        # A step timed elsewhere (time.perf_counter() readings)
+        self.observe(stage, ended - started)
+        tracing.add(stage, started, ended, **attributes)
+
+    # --- reading ---
+
+    def snapshot(self):
+        # Read-only: rates run from the newest mark at least RATE_WINDOW old
+        # (the oldest one early in a run) to now
+        now = time.monotonic()
+        with self.lock:
+            counts = dict(self.counts)
+            samples = {stage: sorted(values) for stage, values in self.samples.items()}
+            totals = {stage: tuple(total) for stage, total in self.totals.items()}
+            in_flight, total = self.in_flight, self.total
+            finished = counts.get("done", 0) + counts.get("failed", 0)
+            first = self.marks[0]
+            for mark in self.marks:
+                if now - mark[0] < RATE_WINDOW:
+                    break
+                first = mark
+            elapsed = now - self.started
+        span = now - first[0]
+        rate = (counts.get("requests", 0) - first[1]) / span if span > 0 else 0.0
+        target_rate = (finished - first[2]) / span if span > 0 else 0.0
+        eta = None
+        if total is not None and target_rate > 0:
+            eta = max(0, total - finished) / target_rate
+        snap = {
+            "elapsed": elapsed,
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "retried": counts.get("retried", 0),
+            "requests": counts.get("requests", 0),
+            "in_flight": in_flight,
+            "total": total,
+            "req_per_sec": rate,
+            "eta": eta,
+        }
+        for stage, values in samples.items():
+            snap[f"{stage}_p50"] = _percentile(values, 0.50)
+            snap[f"{stage}_p95"] = _percentile(values, 0.95)
+            snap[f"{stage}_p99"] = _percentile(values, 0.99)
+            snap[f"{stage}_count"], snap[f"{stage}_sum"] = totals[stage]
+        return snap
+
+    def stages(self, snap=None):
+        # Stage names in the snapshot, hot path order first
+        s = snap or self.snapshot()
+        found = [key[:-4] for key in s if key.endswith("_p50")]
+        return sorted(found, key=lambda stage: (STAGE_ORDER.index(stage) if stage in STAGE_ORDER else len(STAGE_ORDER), stage))
+
+    def summary_line(self, snap=None):
+        s = snap or self.snapshot()
+        progress = f"{s['done']} done, {s['failed']} failed"
+        if s["total"] is not None:
+            progress += f" of {s['total']}"
+        return (f"{progress}, {s['in_flight']} in flight | {s['req_per_sec']:.1f} req/s | "
+                f"fetch p50 {_ms(s.get('fetch_p50'))} p95 {_ms(s.get('fetch_p95'))} | "
+                f"parse p50 {_ms(s.get('parse_p50'))} p95 {_ms(s.get('parse_p95'))} | "
+                f"ETA {format_duration(s['eta'])}")
+
+    def stages_line(self, snap=None):
+        # p50 / p95 and total time per stage, e.g. for cli --stats
+        s = snap or self.snapshot()
+        return " | ".join(f"{stage} p50 {_ms(s[stage + '_p50'])} p95 {_ms(s[stage + '_p95'])} "
+                          f"total {s[stage + '_sum']:.2f}s/{s[stage + '_count']}" for stage in self.stages(s))
+
+    # --- exporting ---
+
+    def prometheus(self, snap=None):
+        # Prometheus text exposition format (version 0.0.4)
+        s = snap or self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{PREFIX}{name}{labels} {value}")
+
+        metric("requests_total", "counter", "Network requests finished.", [("", s["requests"])])
+        metric("targets_total", "counter", "Targets finished, by outcome.",
+               [('{outcome="done"}', s["done"]), ('{outcome="failed"}', s["failed"])])
+        metric("retries_total", "counter", "Retry attempts scheduled.", [("", s["retried"])])
+        metric("in_flight", "gauge", "Network requests currently open.", [("", s["in_flight"])])
+        if s["total"] is not None:
+            metric("targets_expected", "gauge", "Targets in this run.", [("", s["total"])])
+        metric("elapsed_seconds", "gauge", "Seconds since the run started.", [("", s["elapsed"])])
+        samples = []
+        for stage in self.stages(s):
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                if s[f"{stage}_{key}"] is not None:
+                    samples.append((f'{{stage="{stage}",quantile="{quantile}"}}', s[f"{stage}_{key}"]))
+        metric("stage_seconds", "summary", "Time per hot path stage (quantiles over the last samples).", samples)
+        for stage in self.stages(s):
+            lines.append(f'{PREFIX}stage_seconds_sum{{stage="{stage}"}} {s[stage + "_sum"]}')
+            lines.append(f'{PREFIX}stage_seconds_count{{stage="{stage}"}} {s[stage + "_count"]}')
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path, snap=None):
+        # Snapshot to path, replaced atomically so readers never see half a file
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snap or self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        # /metrics (Prometheus) and /metrics.json on a background thread;
+        # returns the server (shutdown() stops it)
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/metrics":
+                    body, kind = metrics.prometheus().encode(), "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body, kind = json.dumps(metrics.snapshot()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", kind)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+class _Timer:
+    def __init__(self, metrics, stage, attributes):
+        self.metrics = metrics
+        self.stage = stage
+        self.span = tracing.span(stage, **attributes)
+
+    def __enter__(self):
+        if self.span is not tracing.NOOP:
+            self.span.__enter__()
+        self.started = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started)
+        if self.span is not tracing.NOOP:
+            self.span.__exit__(exc_type, exc, tb)
+        return False
+
+
+def _percentile(values, q):
+    # values sorted; nearest-rank
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.0f}ms"
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+# One collector per process, like http_cache / rate_limiter
+_metrics = Metrics()
+
+count = _metrics.count
+expect = _metrics.expect
+observe = _metrics.observe
+timer = _metrics.timer
+interval = _metrics.interval
+request_started = _metrics.request_started
+request_finished = _metrics.request_finished
+snapshot = _metrics.snapshot
+summary_line = _metrics.summary_line
+stages_line = _metrics.stages_line
+prometheus = _metrics.prometheus
+write_json = _metrics.write_json
+serve = _metrics.serve
+reset = _metrics.reset
+
+
+def finished(result):
+    # Runner helper: a target ended with `result` (None means no record)
+    _metrics.count("done" if result is not None else "failed")
+    return result
+
+
+def _forget():
+    # A forked child starts with fresh numbers and a lock no parent thread
+    # can be holding
+    _metrics.lock = threading.Lock()
+    _metrics.reset()
+
+
+os.register_at_fork(after_in_child=_forget)
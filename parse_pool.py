@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import metrics
+import parsers
+
+# Process-pool parse stage.
+#
+# The fetch stage (worker threads or asyncio) only downloads pages and
+# hands over (target, raw bytes) pairs. Parsing runs in separate processes,
+# so it is not held to one core by the GIL. Only the response body crosses
+# the process boundary (bytes pickle as a single memcpy, no response
+# objects or parsed trees), and pages are sent in batches to keep the
+# per-task IPC overhead low.
+#
+# The workers are started from a fork server (spawn where there is none),
+# never forked from the crawler itself: by the time the first batch is
+# submitted the fetch threads are running, and a fork would copy whatever
+# lock one of them held at that moment (metrics, record_cache) into a
+# child that then waits on it forever.
+#
+# A page that fails to parse is sent back as a failure, and the parent
+# moves its target from done to failed and hands it to on_error, like a
+# parse error on a fetch thread (see scraper_base).
+
+DEFAULT_BATCH_SIZE = 8
+
+
+class ParseError(ValueError):
+    # A worker process could not parse a page (the message says why)
+    pass
+
+
+def default_processes():
+    return os.cpu_count() or 1
+
+
+def _context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _parse_batch(parse, backend, batch):
+    # Runs in a worker process; returns (records, [(target, error text)])
+    records, failures = [], []
+    for target, content in batch:
+        try:
+            records.append(parse(target, content, backend))
+        except Exception as e:
+            failures.append((target, f"{type(e).__name__}: {e}"))
+    return records, failures
+
+
+def iter_parsed(raw, parse, processes=None, batch_size=DEFAULT_BATCH_SIZE, backend=None, on_error=None, policy=None):
+    # raw yields (target, content); parse(target, content, backend) must be a
+    # module-level function (or a method of a module-level scraper, see
+    # scraper_base) so it can be sent to the worker processes.
+    # Yields the parsed records as batches finish. At most two batches per
+    # process are pending, which keeps memory bounded and lets backpressure
+    # reach the fetch stage. Pages that fail to parse go to
+    # on_error(target, ParseError) and, with a retry policy, the dead letters.
+    processes = processes or default_processes()
+    backend = backend or parsers.get_backend()
+    max_pending = processes * 2
+    pending = set()
+
+    def failed(target, error):
+        # the fetch stage already counted the target as done
+        metrics.count("done", -1)
+        metrics.count("failed")
+        e = ParseError(error)
+        if policy is not None:
+            policy.give_up(target, e, 1)
+        if on_error:
+            on_error(target, e)
+        else:
+            print(f"[ERROR] parse {target}: {error}")
+
+    with ProcessPoolExecutor(max_workers=processes, mp_context=_context()) as pool:
+
+        def drain(return_when):
+            nonlocal pending
+            done, pending = wait(pending, return_when=return_when)
+            for future in done:
+                records, failures = future.result()
+                for target, error in failures:
+                    failed(target, error)
+                yield from records
+
+        batch = []
+        for item in raw:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                pending.add(pool.submit(_parse_batch, parse, backend, batch))
+                batch = []
+                if len(pending) >= max_pending:
+                    yield from drain(FIRST_COMPLETED)
+        if batch:
+            pending.add(pool.submit(_parse_batch, parse, backend, batch))
+        while pending:
+            yield from drain(FIRST_COMPLETED)
@@ -0,0 +1,164 @@
+import os
+
+import extraction
+import metrics
+from extraction import First, Link, Rows, Spec, Text
+from record_cache import memoize
+
+# Page extractors for the scrapers, written as declarative specs (see
+# extraction) and run by one of these backends:
+#
+#   bs4        - BeautifulSoup + html.parser, full tree (the reference)
+#   strainer   - BeautifulSoup + SoupStrainer, only the needed blocks are built
+#   lxml       - lxml.html + XPath (C parser)
+#   selectolax - selectolax/lexbor + CSS selectors (C parser, fastest)
+#   stream     - stdlib HTMLParser that keeps only the needed blocks and
+#                stops as soon as they have been read (no full tree)
+#
+# Every backend returns exactly what the original BeautifulSoup code
+# produced. The backend is picked per call, or globally with set_backend()
+# / the SCRAPER_PARSER environment variable. Every backend library (bs4
+# too) is only imported when used, so importing a scraper stays cheap;
+# lxml and selectolax are optional.
+#
+# The public extract_* functions are memoized by content hash (see
+# record_cache), so a page that was parsed before is not parsed again.
+# Actual parses are timed into metrics ("parse" latency, and a span per
+# parse when tracing is on).
+
+BACKENDS = tuple(extraction.BACKENDS)
+
+_backend = os.environ.get("SCRAPER_PARSER", "bs4")
+
+
+def set_backend(name):
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend '{name}' (use one of {', '.join(BACKENDS)})")
+    _backend = name
+
+
+def get_backend():
+    return _backend
+
+
+def extract(spec, content, backend=None):
+    # Run an extraction.Spec on a page with the given (or the global) backend
+    backend = backend or _backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend '{backend}' (use one of {', '.join(BACKENDS)})")
+    with metrics.timer("parse", backend=backend):
+        return extraction.compile(spec, backend)(content)
+
+
+# =====================================================================
+# ipinfo.io (IP and ASN pages)
+#
+# Returns (geo, summary): lists of (key, value) pairs from the
+# block-geolocation and block-summary tables. Either is None when the
+# block or its table is missing. Summary cells with a link become
+# "text (href)".
+# =====================================================================
+
+IPINFO_BLOCKS = ("block-geolocation", "block-summary")
+
+IPINFO = Spec({
+    "block-geolocation": Rows(("div#block-geolocation", "table"), cells="td", count=2,
+                              columns=(Text((), "strings"), Text((), "strings"))),
+    "block-summary": Rows(("div#block-summary", "table"), cells="td", count=2,
+                          columns=(Text((), "strings"), First(Link(), Text((), "strings")))),
+}, finish=lambda result: tuple(result[block_id] for block_id in IPINFO_BLOCKS))
+
+
+@memoize
+def extract_ipinfo(content, backend=None):
+    return extract(IPINFO, content, backend)
+
+
+# =====================================================================
+# timeanddate.com weather page
+# =====================================================================
+
+WEATHER_DETAILS_CLASS = "table table--left table--inner-borders-rows"
+WEATHER_FORECAST_CLASS = "zebra tb-wt fw va-m tb-hover"
+
+
+def _weather_fields(result):
+    humidity = pressure = dew_point = visibility = "N/A"
+    for text, val in result["details"]:
+        if "humidity" in text:
+            humidity = val
+        elif "pressure" in text:
+            pressure = val
+        elif "dew point" in text:
+            dew_point = val
+        elif "visibility" in text:
+            visibility = val
+    return {
+        "temperature": result["temperature"],
+        "condition": result["condition"],
+        "visibility": visibility,
+        "pressure": pressure,
+        "humidity": humidity,
+        "dew_point": dew_point,
+        "forecast": " | ".join(result["forecast"]) or "N/A",
+    }
+
+
+WEATHER = Spec({
+    "temperature": Text("div.h2"),
+    "condition": Text("p"),
+    # (label, value) per details row, label lower-cased for keyword matching
+    "details": Rows(f'table[class="{WEATHER_DETAILS_CLASS}"]', default=[],
+                    columns=(Text("th", default=None, transform=str.lower), Text("td", default=None))),
+    # the 5 hours after the header row, "time: temperature"
+    "forecast": Rows(f'table[class="{WEATHER_FORECAST_CLASS}"]', cells="td", min_count=2, start=1, stop=6,
+                     columns=(Text(()), Text(())), transform=lambda hour, value: f"{hour}: {value}", default=[]),
+}, finish=_weather_fields)
+
+
+@memoize
+def extract_weather(content, backend=None):
+    return extract(WEATHER, content, backend)
+
+
+# =====================================================================
+# Stock quote pages (Yahoo Finance / MarketWatch)
+#
+# Returns {"price", "change", "percent_change"}; missing values are "N/A".
+# Yahoo values are raw .text, MarketWatch values are stripped (as before).
+# =====================================================================
+
+YAHOO_FIELDS = (
+    ("price", "regularMarketPrice"),
+    ("change", "regularMarketChange"),
+    ("percent_change", "regularMarketChangePercent"),
+)
+MARKETWATCH_FIELDS = (
+    ("price", "value"),
+    ("change", "change--point--q"),
+    ("percent_change", "change--percent--q"),
+)
+
+STOCK = {
+    "yahoo": Spec({field: Text(f'fin-streamer[data-field="{data_field}"]', "raw")
+                   for field, data_field in YAHOO_FIELDS}),
+    "marketwatch": Spec({field: Text(f"bg-quote.{class_name}")
+                         for field, class_name in MARKETWATCH_FIELDS}),
+}
+
+
+def _stock_site(url):
+    if "yahoo.com" in url:
+        return "yahoo"
+    if "marketwatch.com" in url:
+        return "marketwatch"
+    return None
+
+
+@memoize
+def extract_stock(content, url, backend=None):
+    site = _stock_site(url)
+    if site is None:
+        return {}
+    return extract(STOCK[site], content, backend)
@@ -0,0 +1,66 @@
+import queue
+import time
+
+from worker_pool import WorkerPool, DEFAULT_WORKERS
+
+# Continuous polling with change-only output.
+#
+# poll() re-fetches a fixed target set every `interval` seconds. Requests
+# are spread evenly over the interval (n targets -> one every interval / n
+# seconds) instead of going out in a burst once per cycle, so the load on
+# the site and on our bandwidth stays flat. The fetches run on a worker
+# pool, so one slow target does not push the rest of the schedule back.
+#
+# The last record per key is kept, and a record is yielded only when it
+# differs from that, ignoring fields that change on every fetch
+# (timestamps, which source answered). The output is a delta stream: a
+# quiet watchlist costs requests but no storage.
+
+
+def _snapshot(record, ignore):
+    return {field: value for field, value in record.items() if field not in ignore}
+
+
+def poll(fetch, targets, interval, key, ignore=(), max_workers=DEFAULT_WORKERS, cycles=None):
+    # fetch(target) -> record or None (exceptions are printed and skipped);
+    # key(record) identifies the series. cycles=None polls forever.
+    targets = list(targets)
+    if not targets:
+        return
+    slot = interval / len(targets)
+    total = None if cycles is None else cycles * len(targets)
+    results = queue.Queue()
+    last = {}
+
+    def run(target):
+        record = None
+        try:
+            record = fetch(target)
+        except Exception as e:
+            print(f"[POLL] {target}: {e}")
+        finally:
+            results.put(record)
+
+    with WorkerPool(max_workers) as pool:
+        start = time.monotonic()
+        scheduled = outstanding = 0
+        while total is None or scheduled < total or outstanding:
+            more = total is None or scheduled < total
+            due = start + scheduled * slot
+            if more and time.monotonic() >= due:
+                pool.submit(run, targets[scheduled % len(targets)])
+                scheduled += 1
+                outstanding += 1
+                continue
+            try:
+                record = results.get(timeout=max(0.0, due - time.monotonic()) if more else None)
+            except queue.Empty:
+                continue
+            outstanding -= 1
+            if record is None:
+                continue
+            snapshot = _snapshot(record, ignore)
+            k = key(record)
+            if last.get(k) != snapshot:
+                last[k] = snapshot
+                yield record
@@ -0,0 +1,105 @@
+import collections
+import os
+import sys
+import threading
+
+# Sampling profiler for whole runs (cli --profile).
+#
+#   profiler.start()                  # samples every thread, 100 times a second
+#   ...
+#   profiler.stop("profile.folded")   # flamegraph.pl / speedscope input
+#
+# A background thread wakes up every `interval` seconds, reads every other
+# thread's current stack (sys._current_frames) and counts it. Nothing is
+# hooked into the code being profiled, so the cost is that one thread's
+# wake-ups while it runs and nothing at all when it is not started. Stacks
+# are wall-clock: a worker blocked on a socket or a queue is counted where
+# it waits, which is what shows whether a run is waiting on the network,
+# on the parser or on the sink.
+#
+# Output is the "folded" format, one line per distinct stack, outermost
+# frame first:  thread;func (file:line);func (file:line) count
+# Parse worker processes (parse_processes > 0) are not sampled.
+
+DEFAULT_INTERVAL = 0.01  # seconds between samples
+MAX_DEPTH = 64
+
+_sampler = None
+_lock = threading.Lock()
+
+
+class Sampler:
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        labels = {}
+        while not self.stopping.wait(self.interval):
+            frames = sys._current_frames()
+            if len(labels) != len(frames):
+                labels = {thread.ident: _thread_label(thread.name) for thread in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(labels.get(ident, "thread"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self):
+        return [f"{stack} {n}" for stack, n in self.stacks.most_common()]
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.folded()) + "\n")
+
+
+def _thread_label(name):
+    # "Thread-12 (_worker)" -> "_worker": a pool's threads share one root
+    if name.endswith(")") and " (" in name:
+        return name[name.index(" (") + 2:-1]
+    return name.rstrip("0123456789-_") or name
+
+
+def start(interval=DEFAULT_INTERVAL):
+    global _sampler
+    with _lock:
+        if _sampler is None:
+            _sampler = Sampler(interval).start()
+    return _sampler
+
+
+def stop(path=None):
+    # Stops sampling; writes the folded stacks to path (if given) and
+    # returns the Sampler (None if it was not running)
+    global _sampler
+    with _lock:
+        sampler, _sampler = _sampler, None
+    if sampler is None:
+        return None
+    sampler.stop()
+    if path:
+        sampler.write(path)
+    return sampler
+
+
+def running():
+    return _sampler is not None
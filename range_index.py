@@ -0,0 +1,172 @@
+import bisect
+import concurrent.futures
+import dataclasses
+import ipaddress
+import socket
+import threading
+
+# Range-level deduplication for IP sweeps.
+#
+# Every ipinfo IP page reports the Range (e.g. "1.1.1.0/24") its ASN and
+# company data belongs to. RangeResolver remembers each record under its
+# Range in a RangeIndex (sorted start/end arrays, looked up with bisect)
+# and builds records for later IPs in a known range locally.
+#
+# Only the ASN-level fields (asn, company, range, asn_type, abuse_contact)
+# are really the same across a Range; the geo fields (city, state, postal,
+# coordinates, ...) are per IP and can differ inside a wide one. So a
+# record is only trusted for its own /24 (/48 for IPv6, TRUSTED_PREFIX):
+# a "/16" Range teaches the one /24 around the fetched IP, and the other
+# /24s of it are fetched themselves. That is the granularity geolocation
+# data is kept at, but it is still an approximation - dedup trades exact
+# per-IP geo for one request per /24 and should be left off where that
+# matters. For a filled-in record
+#   hostname        - None, unless the resolver was made with hostnames=True:
+#                     then it is looked up per IP (reverse DNS, what ipinfo
+#                     shows) on a few threads of its own, giving up after
+#                     RDNS_TIMEOUT seconds (None if there is none). That is a
+#                     DNS round trip per address, so it is off by default
+#   hosted_domains  - is not available without the page: None (unknown),
+#                     not 0
+#
+# Only the first request per /24 (/48 for IPv6) is waited for: the workers
+# that reach that block at the same time wait for its answer instead of all
+# fetching the same data. If it did not teach a range (the fetch failed, or
+# the page had no usable Range) the block is not gated again and later IPs
+# in it are fetched in parallel as usual.
+
+PER_IP_FIELDS = ("ip", "hostname", "hosted_domains")
+TRUSTED_PREFIX = {4: 24, 6: 48}
+RDNS_TIMEOUT = 2.0   # seconds
+RDNS_WORKERS = 8
+
+
+class RangeIndex:
+    # Non-overlapping [start, end] integer intervals -> value
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.values = []
+
+    def __len__(self):
+        return len(self.starts)
+
+    def find(self, n):
+        i = bisect.bisect_right(self.starts, n) - 1
+        if i >= 0 and n <= self.ends[i]:
+            return self.values[i]
+        return None
+
+    def add(self, start, end, value):
+        # Returns False (and keeps the old entry) if the interval overlaps one
+        # we already have
+        i = bisect.bisect_right(self.starts, start)
+        if i > 0 and self.ends[i - 1] >= start:
+            return False
+        if i < len(self.starts) and self.starts[i] <= end:
+            return False
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.values.insert(i, value)
+        return True
+
+
+def parse_range(value):
+    # "1.1.1.0/24" -> IPv4Network('1.1.1.0/24'), or None
+    if not value:
+        return None
+    try:
+        return ipaddress.ip_network(value.split()[0], strict=False)
+    except ValueError:
+        return None
+
+
+def block(address):
+    # The TRUSTED_PREFIX network around address
+    return ipaddress.ip_network(f"{address}/{TRUSTED_PREFIX[address.version]}", strict=False)
+
+
+def reverse_dns(ip):
+    try:
+        return socket.gethostbyaddr(ip)[0]
+    except OSError:
+        return None
+
+
+class RangeResolver:
+    def __init__(self, hostnames=False):
+        self.hostnames = hostnames
+        # gethostbyaddr has no timeout of its own; a lookup that hangs keeps
+        # one of these threads, not the sweep's worker
+        self.rdns = concurrent.futures.ThreadPoolExecutor(RDNS_WORKERS, "rdns") if hostnames else None
+        self.indexes = {4: RangeIndex(), 6: RangeIndex()}
+        self.probes = {}
+        self.lock = threading.Lock()
+        self.fetched = self.resolved = 0
+
+    def _probe(self, address):
+        # (event set once the block's first probe is over, is this caller
+        # that first probe)
+        key = block(address)
+        with self.lock:
+            done = self.probes.get(key)
+            if done is not None:
+                return done, False
+            done = self.probes[key] = threading.Event()
+        return done, True
+
+    def lookup(self, ip):
+        # A record for ip built from a known range, or None
+        address = ipaddress.ip_address(ip)
+        with self.lock:
+            template = self.indexes[address.version].find(int(address))
+        if template is None:
+            return None
+        record = dataclasses.replace(template, ip=ip, hostname=self._hostname(ip) if self.hostnames else None)
+        with self.lock:
+            self.resolved += 1
+        return record
+
+    def _hostname(self, ip):
+        try:
+            return self.rdns.submit(reverse_dns, ip).result(timeout=RDNS_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            return None
+
+    def learn(self, record):
+        network = parse_range(record.range)
+        address = ipaddress.ip_address(record.ip)
+        if network is None or address not in network:
+            return
+        if network.prefixlen < TRUSTED_PREFIX[network.version]:
+            network = block(address)
+        template = dataclasses.replace(record, **{field: None for field in PER_IP_FIELDS})
+        with self.lock:
+            self.indexes[network.version].add(int(network.network_address), int(network.broadcast_address), template)
+
+    def resolve(self, ip, fetch):
+        # Record for ip: from the index when its range is known, otherwise
+        # fetch(ip) (which may raise; the block's waiters are let go either way)
+        record = self.lookup(ip)
+        if record is not None:
+            return record
+        done, first = self._probe(ipaddress.ip_address(ip))
+        if not first:
+            done.wait()
+            record = self.lookup(ip)
+            if record is not None:
+                return record
+        try:
+            record = fetch(ip)
+            with self.lock:
+                self.fetched += 1
+            if record is not None:
+                self.learn(record)
+        finally:
+            if first:
+                done.set()
+        return record
+
+    def stats_line(self):
+        known = sum(len(index) for index in self.indexes.values())
+        return f"ranges: {known} known, {self.fetched} fetched, {self.resolved} filled from the index"
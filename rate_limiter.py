@@ -0,0 +1,217 @@
+import asyncio
+import email.utils
+import math
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Per-host rate limiting shared by every scraper (used inside fetcher).
+#
+# Each host gets one HostLimiter with
+#   - a token bucket: at most `rate` requests/second on average, bursts of `burst`
+#   - an AIMD concurrency limit: +1 per window of successful requests, halved
+#     when the host answers 429/503, fails, or recent latency climbs well
+#     above the host's usual latency
+#   - Retry-After support: 429/503 with Retry-After pauses the whole host
+#
+# Because limiters are per host (not per scraper), an IP and an ASN sweep
+# running at the same time share ipinfo.io's budget.
+
+# Budgets per site. A host without an entry takes its closest parent
+# domain's (query2.finance.yahoo.com -> finance.yahoo.com), and hosts with
+# neither get DEFAULT_LIMITS. Each host still has its own limiter.
+HOST_LIMITS = {
+    "ipinfo.io": {"rate": 5.0, "burst": 10, "max_concurrency": 16},
+    "www.timeanddate.com": {"rate": 2.0, "burst": 4, "max_concurrency": 4},
+    "finance.yahoo.com": {"rate": 2.0, "burst": 4, "max_concurrency": 4},
+    # stock batch quotes (one request covers up to a few hundred symbols)
+    "query1.finance.yahoo.com": {"rate": 1.0, "burst": 2, "max_concurrency": 2},
+    "www.marketwatch.com": {"rate": 1.0, "burst": 2, "max_concurrency": 2},
+}
+DEFAULT_LIMITS = {"rate": 10.0, "burst": 20, "max_concurrency": 32}
+
+BACKOFF_STATUS = (429, 503)
+# Latency is tracked as two moving averages: a slow one (the host's usual
+# latency) and a fast one (the last few responses). Overload is the fast one
+# running LATENCY_FACTOR times above the slow one, so a single odd response
+# (a tiny error page, a warm connection) moves neither far. Until the slow
+# one has seen 1 / BASELINE_ALPHA responses it is their plain mean.
+LATENCY_FACTOR = 3.0
+BASELINE_ALPHA = 0.01  # weight of a new response in the usual latency
+RECENT_ALPHA = 0.3     # ... and in the recent latency
+MAX_RETRY_AFTER = 300  # never pause a host for more than this (seconds)
+
+
+class HostLimiter:
+    def __init__(self, rate, burst, max_concurrency, min_concurrency=1, initial_concurrency=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(initial_concurrency or min(4, max_concurrency))
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.baseline = None   # usual latency (slow moving average)
+        self.recent = None     # recent latency (fast moving average)
+        self.latencies = 0     # responses behind the two
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self.cond = threading.Condition()
+
+    # --- admission ---
+
+    def _wait_time(self, now):
+        # Seconds until a request may start (0 = go now); caller holds the lock
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.in_flight >= int(self.limit):
+            return math.inf
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def _admit(self):
+        self.tokens -= 1
+        self.in_flight += 1
+
+    def acquire(self):
+        with self.cond:
+            while True:
+                wait = self._wait_time(time.monotonic())
+                if wait <= 0:
+                    self._admit()
+                    return
+                self.cond.wait(None if wait == math.inf else wait)
+
+    async def acquire_async(self):
+        while True:
+            with self.cond:
+                wait = self._wait_time(time.monotonic())
+                if wait <= 0:
+                    self._admit()
+                    return
+            # Concurrency slots free up on release(); poll for them
+            await asyncio.sleep(0.05 if wait == math.inf else wait)
+
+    # --- feedback ---
+
+    def release(self, status, latency, headers=None):
+        # status None means the request failed (timeout, connection error)
+        now = time.monotonic()
+        with self.cond:
+            self.in_flight -= 1
+            overloaded = status is None or status in BACKOFF_STATUS
+            if status is not None and not overloaded:
+                self.latencies += 1
+                if self.baseline is None:
+                    self.baseline = self.recent = latency
+                else:
+                    self.baseline += max(BASELINE_ALPHA, 1 / self.latencies) * (latency - self.baseline)
+                    self.recent += RECENT_ALPHA * (latency - self.recent)
+                    overloaded = self.recent > LATENCY_FACTOR * self.baseline
+            if overloaded:
+                self._decrease(now)
+                retry_after = parse_retry_after(headers)
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, now + min(retry_after, MAX_RETRY_AFTER))
+            else:
+                # Additive increase: about +1 per `limit` successful requests
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self.cond.notify_all()
+
+    def cancel(self):
+        # The caller abandoned the request (e.g. it lost a race): free the
+        # slot without any feedback
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def _decrease(self, now):
+        # Halve at most once per latency window, so a burst of 429s from
+        # requests that were already in flight only counts once
+        window = self.baseline or 1.0
+        if now - self.last_decrease >= window:
+            self.limit = max(self.min_concurrency, self.limit / 2)
+            self.last_decrease = now
+            self.throttled += 1
+
+    def snapshot(self):
+        with self.cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "rate": self.rate,
+                "throttled": self.throttled,
+                "paused_for": max(0.0, round(self.blocked_until - time.monotonic(), 1)),
+            }
+
+
+def parse_retry_after(headers):
+    # Retry-After is either seconds or an HTTP date
+    if not headers:
+        return None
+    value = None
+    for key in headers:
+        if key.lower() == "retry-after":
+            value = headers[key]
+            break
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+_enabled = True
+
+
+def configure(enabled=True):
+    # Turn limiting on/off for the whole process (e.g. for local benchmarks)
+    global _enabled
+    _enabled = enabled
+
+
+def limits_for(host):
+    # HOST_LIMITS entry for host or its closest parent domain
+    labels = host.split(".")
+    for i in range(len(labels) - 1):
+        limits = HOST_LIMITS.get(".".join(labels[i:]))
+        if limits is not None:
+            return limits
+    return DEFAULT_LIMITS
+
+
+def configure_host(host, **limits):
+    # Override a host's budget; takes effect for new limiters
+    HOST_LIMITS[host] = {**limits_for(host), **limits}
+    with _limiters_lock:
+        _limiters.pop(host, None)
+
+
+def for_url(url):
+    # The shared limiter for url's host (None when limiting is off)
+    if not _enabled:
+        return None
+    host = urlsplit(url).hostname or ""
+    limiter = _limiters.get(host)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(host)
+            if limiter is None:
+                limiter = _limiters[host] = HostLimiter(**limits_for(host))
+    return limiter
+
+
+def snapshot():
+    return {host: limiter.snapshot() for host, limiter in list(_limiters.items())}
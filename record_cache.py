@@ -0,0 +1,231 @@
+import functools
+import hashlib
+import importlib
+import inspect
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Memoization of extracted records, keyed by page content.
+#
+# Even a response-cache hit would normally be parsed again. Wrapping an
+# extractor with @memoize skips parsing for any body it has already seen:
+#
+#   key = sha256(extractor version + extra arguments + response body)
+#
+# Lookups go to an in-memory LRU first, then to an on-disk SQLite tier
+# (record_cache.sqlite, shared between runs and parse processes). The
+# extractor version is a hash of the source file that defines it plus the
+# extraction engine's (ENGINE_MODULES: the specs live in parsers, but how
+# they are run lives in extraction), so editing either invalidates every
+# old entry automatically.
+#
+# The disk tier is bounded like http_cache: past max_rows the least
+# recently used rows are evicted (down to 90%). Each row also records its
+# extractor version, and rows of versions no memoized extractor has any
+# more are deleted when a process first opens the file, so edits to the
+# parsers do not leave dead entries behind.
+#
+# Only the memory LRU is behind the lock; every thread reads and writes
+# the disk tier on a connection of its own.
+# Set SCRAPER_RECORD_CACHE to another path, or to "off" to disable it.
+#
+# Memoized results are shared between callers and must not be modified.
+
+DEFAULT_PATH = "record_cache.sqlite"
+DEFAULT_MEMORY_ENTRIES = 4096
+DEFAULT_MAX_ROWS = 200_000
+ENGINE_MODULES = ("extraction",)
+
+# Versions of every @memoize'd extractor in this process (see prune)
+_versions = set()
+
+
+class RecordCache:
+    def __init__(self, path=DEFAULT_PATH, memory_entries=DEFAULT_MEMORY_ENTRIES, max_rows=DEFAULT_MAX_ROWS):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_rows = max_rows
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()         # memory LRU and counters
+        self.setup_lock = threading.Lock()   # schema, pruning and eviction
+        self._local = threading.local()
+        self._ready = None  # pid the schema was checked in
+        self.rows = 0       # rows on disk (approximately, other processes write too)
+        self.memory_hits = self.disk_hits = self.misses = 0
+
+    def _conn(self):
+        # One connection per thread and process
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            db = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            with self.setup_lock:
+                if self._ready != os.getpid():
+                    self._setup(db)
+                    self._ready = os.getpid()
+            local.db, local.pid = db, os.getpid()
+        return local.db
+
+    def _setup(self, db):
+        columns = [row[1] for row in db.execute("PRAGMA table_info(records)")]
+        if columns and "version" not in columns:
+            db.execute("DROP TABLE records")  # an older cache file: start over
+        db.execute("CREATE TABLE IF NOT EXISTS records (key BLOB PRIMARY KEY, version TEXT, value BLOB, used_at REAL)")
+        db.execute("CREATE INDEX IF NOT EXISTS records_used ON records (used_at)")
+        self.prune(db)
+        self.rows = db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def prune(self, db=None):
+        # Delete rows of extractor versions that no longer exist
+        if _versions:
+            db = db or self._conn()
+            marks = ", ".join("?" * len(_versions))
+            db.execute(f"DELETE FROM records WHERE version NOT IN ({marks})", tuple(_versions))
+
+    def get(self, key):
+        # Returns (found, value)
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return True, self.memory[key]
+        db = self._conn()
+        row = db.execute("SELECT value FROM records WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            with self.lock:
+                self.misses += 1
+            return False, None
+        db.execute("UPDATE records SET used_at = ? WHERE key = ?", (time.time(), key))
+        value = pickle.loads(row[0])
+        with self.lock:
+            self.disk_hits += 1
+            self._remember(key, value)
+        return True, value
+
+    def put(self, key, value, version=None):
+        db = self._conn()
+        with self.lock:
+            self._remember(key, value)
+            self.rows += 1
+            full = self.rows > self.max_rows
+        db.execute("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)",
+                             (key, version, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time()))
+        if full:
+            self._evict()
+
+    def _evict(self):
+        # Drop least recently used rows until we are at 90% of max_rows
+        db = self._conn()
+        with self.setup_lock:
+            rows = db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+            excess = rows - int(self.max_rows * 0.9)
+            if rows > self.max_rows:
+                db.execute("DELETE FROM records WHERE key IN"
+                           " (SELECT key FROM records ORDER BY used_at LIMIT ?)", (excess,))
+                rows -= excess
+            with self.lock:
+                self.rows = rows
+
+    def _remember(self, key, value):
+        # caller holds the lock
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def stats_line(self):
+        return f"records: {self.memory_hits} memory hits, {self.disk_hits} disk hits, {self.misses} parsed"
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.rows = 0
+        self._conn().execute("DELETE FROM records")
+
+
+def extractor_version(func):
+    # Changes whenever the source file defining func, or one of the engine
+    # modules, changes
+    digest = hashlib.sha256(func.__qualname__.encode())
+    try:
+        with open(inspect.getsourcefile(func), "rb") as f:
+            digest.update(f.read())
+    except (OSError, TypeError):
+        digest.update(func.__code__.co_code)
+    for name in ENGINE_MODULES:
+        module = sys.modules.get(name) or importlib.import_module(name)
+        with open(inspect.getsourcefile(module), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_path = os.environ.get("SCRAPER_RECORD_CACHE", DEFAULT_PATH)
+
+
+def get_cache():
+    # The shared record cache (None when disabled)
+    global _cache
+    if _cache is None and _path and _path.lower() not in ("0", "off", "none"):
+        with _cache_lock:
+            if _cache is None:
+                _cache = RecordCache(_path)
+    return _cache
+
+
+def _forget():
+    # A forked child opens its own cache (with its own lock) on first use
+    global _cache, _cache_lock
+    _cache = None
+    _cache_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget)
+
+
+def configure(path=DEFAULT_PATH, memory_entries=DEFAULT_MEMORY_ENTRIES, max_rows=DEFAULT_MAX_ROWS):
+    # path=None disables memoization
+    global _cache, _path
+    with _cache_lock:
+        _path = path
+        _cache = RecordCache(path, memory_entries, max_rows) if path else None
+    return _cache
+
+
+def memoize(func):
+    # func(content, *args, backend=None). The backend is left out of the
+    # key because every backend returns the same output.
+    version = extractor_version(func)
+    _versions.add(version)
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(content, *args, **kwargs):
+        cache = get_cache()
+        if cache is None:
+            return func(content, *args, **kwargs)
+        bound = signature.bind(content, *args, **kwargs)
+        extra = [(name, value) for name, value in bound.arguments.items()
+                 if name not in ("content", "backend")]
+        body = content.encode("utf-8") if isinstance(content, str) else bytes(content)
+        digest = hashlib.sha256(version.encode())
+        digest.update(repr(extra).encode())
+        digest.update(body)
+        key = digest.digest()
+
+        found, value = cache.get(key)
+        if found:
+            return value
+        value = func(content, *args, **kwargs)
+        cache.put(key, value, version)
+        return value
+
+    wrapper.version = version
+    return wrapper
@@ -0,0 +1,286 @@
+import dataclasses
+import ipaddress
+import re
+import typing
+from datetime import datetime
+
+# Typed records for every scraper.
+#
+# Extractors return text exactly as the page shows it ("36 °C",
+# "-27.4816,153.0175", "AS13335 (/AS13335)"). The scrapers convert that
+# once, here, into slotted dataclasses with real numbers: no per-record
+# __dict__, numeric fields that sort and compare as numbers, and typed
+# columns for the Arrow/Parquet sinks (TYPES).
+#
+# Records still read like the old dicts where the pipeline needs it
+# (record["city"], .get(), .items(), iteration over field names), and
+# as_dict() turns any record into a plain dict for JSON.
+
+_NUMBER = re.compile(r"[-+]?\d[\d,]*(?:\.\d+)?|[-+]?\.\d+")
+_DATE = re.compile(r"on ([A-Z][a-z]{2} \d{1,2}, \d{4})")
+_MISSING = ("", "N/A", "No Hostname")
+
+
+class Record:
+    __slots__ = ()
+
+    FIELDS = ()
+    TYPES = {}
+    _KEYS = {}.keys()
+
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __contains__(self, field):
+        return field in self._KEYS
+
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+    def keys(self):
+        return self._KEYS
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in self.FIELDS]
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+def record(cls):
+    # @record: slotted dataclass with FIELDS / TYPES filled in
+    cls = dataclasses.dataclass(slots=True)(cls)
+    cls.FIELDS = tuple(field.name for field in dataclasses.fields(cls))
+    cls.TYPES = {field.name: _base_type(field.type) for field in dataclasses.fields(cls)}
+    cls._KEYS = dict.fromkeys(cls.FIELDS).keys()
+    return cls
+
+
+def _base_type(annotation):
+    # float | None -> float; anything that is not a number / bool is text
+    kind = (typing.get_args(annotation) or (annotation,))[0]
+    return kind if kind in (int, float, bool) else str
+
+
+def as_dict(rec):
+    return rec.to_dict() if isinstance(rec, Record) else dict(rec)
+
+
+# --- value normalization ---
+
+def text(value):
+    # Page text, with "N/A" / "No Hostname" as None
+    if value is None:
+        return None
+    value = value.replace("\xa0", " ").strip()
+    return None if value in _MISSING else value
+
+
+def number(value):
+    # First number in the text: "5,976.97" -> 5976.97, "(+0.63%)" -> 0.63
+    value = text(value)
+    match = _NUMBER.search(value) if value else None
+    return float(match.group().replace(",", "")) if match else None
+
+
+def integer(value):
+    value = number(value)
+    return int(value) if value is not None else None
+
+
+def boolean(value):
+    value = text(value)
+    if value is None:
+        return None
+    return value.lower() in ("true", "yes")
+
+
+def asn(value):
+    # "AS13335 (/AS13335)" or "13335" -> 13335
+    match = re.search(r"(?:AS)?(\d+)", value or "")
+    return int(match.group(1)) if match else None
+
+
+def link_text(value):
+    # "1.1.1.0/24 (/AS13335/1.1.1.0/24)" -> "1.1.1.0/24" (extractors add the link target in parentheses)
+    value = text(value)
+    return re.sub(r"\s*\([^)]*\)$", "", value) if value else None
+
+
+def date(value):
+    # "19 years ago on Apr 03, 2006" -> "2006-04-03"
+    match = _DATE.search(value or "")
+    if not match:
+        return text(value)
+    return datetime.strptime(match.group(1), "%b %d, %Y").date().isoformat()
+
+
+def celsius(value):
+    degrees = number(value)
+    if degrees is not None and "F" in (value or ""):
+        degrees = round((degrees - 32) * 5 / 9, 1)
+    return degrees
+
+
+def kilometres(value):
+    distance = number(value)
+    if distance is not None and re.search(r"\bmi\b", value or ""):
+        distance = round(distance * 1.609344, 1)
+    return distance
+
+
+def millibars(value):
+    pressure = number(value)
+    if pressure is not None and "Hg" in (value or ""):
+        pressure = round(pressure * 33.8639, 1)
+    return pressure
+
+
+def coordinates(value):
+    # "-27.4816,153.0175" -> (-27.4816, 153.0175)
+    parts = (text(value) or "").split(",")
+    if len(parts) != 2:
+        return None, None
+    return number(parts[0]), number(parts[1])
+
+
+# --- records ---
+
+@record
+class IpRecord(Record):
+    ip: str
+    city: str | None = None
+    state: str | None = None
+    country: str | None = None
+    postal: str | None = None
+    local_time: str | None = None
+    timezone: str | None = None
+    latitude: float | None = None
+    longitude: float | None = None
+    asn: int | None = None
+    hostname: str | None = None
+    range: str | None = None
+    company: str | None = None
+    hosted_domains: int | None = None
+    privacy: bool | None = None
+    anycast: bool | None = None
+    asn_type: str | None = None
+    abuse_contact: str | None = None
+
+    @classmethod
+    def from_page(cls, ip, fields):
+        # fields: the geo + summary (label, text) pairs from parsers.extract_ipinfo
+        f = dict(fields)
+        latitude, longitude = coordinates(f.get("Coordinates"))
+        return cls(
+            ip=ip,
+            city=text(f.get("City")),
+            state=text(f.get("State")),
+            country=text(f.get("Country")),
+            postal=text(f.get("Postal")),
+            local_time=text(f.get("Local time")),
+            timezone=text(f.get("Timezone")),
+            latitude=latitude,
+            longitude=longitude,
+            asn=asn(f.get("ASN")),
+            hostname=text(f.get("Hostname")),
+            range=link_text(f.get("Range")),
+            company=text(f.get("Company")),
+            hosted_domains=integer(f.get("Hosted domains")),
+            privacy=boolean(f.get("Privacy")),
+            anycast=boolean(f.get("Anycast")),
+            asn_type=text(f.get("ASN type")),
+            abuse_contact=link_text(f.get("Abuse contact")),
+        )
+
+    @property
+    def number(self):
+        # The address as an int, for sorting / joining (IPv6 does not fit
+        # 64-bit columns, so the text form is what gets stored)
+        return int(ipaddress.ip_address(self.ip))
+
+
+@record
+class AsnRecord(Record):
+    asn: int
+    country: str | None = None
+    website: str | None = None
+    hosted_domains: int | None = None
+    ipv4_count: int | None = None
+    ipv6_count: int | None = None
+    asn_type: str | None = None
+    registry: str | None = None
+    allocated: str | None = None
+    updated: str | None = None
+
+    @classmethod
+    def from_page(cls, number, fields):
+        f = dict(fields)
+        return cls(
+            asn=number,
+            country=link_text(f.get("Country")),
+            website=link_text(f.get("Website")),
+            hosted_domains=integer(f.get("Hosted domains")),
+            ipv4_count=integer(f.get("Number of IPv4")),
+            ipv6_count=integer(f.get("Number of IPv6")),
+            asn_type=text(f.get("ASN type")),
+            registry=text(f.get("Registry")),
+            allocated=date(f.get("Allocated")),
+            updated=date(f.get("Updated")),
+        )
+
+
+@record
+class WeatherRecord(Record):
+    city: str
+    temperature_c: float | None = None
+    condition: str | None = None
+    visibility_km: float | None = None
+    pressure_mbar: float | None = None
+    humidity_pct: float | None = None
+    dew_point_c: float | None = None
+    forecast: str | None = None
+    timestamp: str | None = None
+    source: str | None = None
+
+    @classmethod
+    def from_page(cls, city, fields, timestamp, source):
+        # fields: the dict from parsers.extract_weather
+        return cls(
+            city=city,
+            temperature_c=celsius(fields.get("temperature")),
+            condition=text(fields.get("condition")),
+            visibility_km=kilometres(fields.get("visibility")),
+            pressure_mbar=millibars(fields.get("pressure")),
+            humidity_pct=number(fields.get("humidity")),
+            dew_point_c=celsius(fields.get("dew_point")),
+            forecast=text(fields.get("forecast")),
+            timestamp=timestamp,
+            source=source,
+        )
+
+
+@record
+class StockRecord(Record):
+    symbol: str
+    source: str | None = None
+    price: float | None = None
+    change: float | None = None
+    percent_change: float | None = None
+
+    @classmethod
+    def from_page(cls, symbol, source, fields):
+        # fields: the dict from parsers.extract_stock
+        return cls(
+            symbol=symbol,
+            source=source,
+            price=number(fields.get("price")),
+            change=number(fields.get("change")),
+            percent_change=number(fields.get("percent_change")),
+        )
@@ -0,0 +1,272 @@
+import heapq
+import itertools
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+
+import requests
+
+import metrics
+import rate_limiter
+from worker_pool import imap_unordered, DEFAULT_WORKERS, DEFAULT_QUEUE_SIZE
+
+# Retries and dead letters shared by all scrapers.
+#
+# A RetryPolicy decides which failures are worth another try (timeouts,
+# dropped connections, 429/5xx) and how long to wait: capped exponential
+# backoff with full jitter, or the server's Retry-After if that is longer.
+# Each target gets at most max_attempts tries. Targets that still fail go
+# into a persisted dead-letter list (dead_letters.sqlite, or the path in
+# SCRAPER_DEAD_LETTERS) and can be replayed later with take().
+#
+# Waiting never ties up a worker: the threaded runner (imap_retry) puts the
+# target back on a delay heap and the worker moves on, and the async runner
+# gives up its concurrency slot while it sleeps.
+
+RETRY_STATUS = (408, 425, 429, 500, 502, 503, 504)
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)
+DEFAULT_PATH = "dead_letters.sqlite"
+
+
+class RetryStatus(Exception):
+    # Raised by RetryPolicy.check() for a retryable status code
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.retry_after = rate_limiter.parse_retry_after(response.headers)
+        super().__init__(f"HTTP {self.status_code}")
+
+
+def _client_errors():
+    # aiohttp / httpx errors, without importing either just for this
+    errors = ()
+    if "aiohttp" in sys.modules:
+        errors += (sys.modules["aiohttp"].ClientError,)
+    if "httpx" in sys.modules:
+        errors += (sys.modules["httpx"].TransportError,)
+    return errors
+
+
+class RetryPolicy:
+    def __init__(self, name, max_attempts=4, base_delay=1.0, max_delay=30.0,
+                 retry_status=RETRY_STATUS, retry_exceptions=RETRY_EXCEPTIONS):
+        self.name = name  # dead-letter list the failures go to
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_status = retry_status
+        self.retry_exceptions = retry_exceptions
+
+    def check(self, response):
+        if response.status_code in self.retry_status:
+            raise RetryStatus(response)
+        return response
+
+    def is_retryable(self, exc):
+        if isinstance(exc, RetryStatus):
+            return exc.status_code in self.retry_status
+        return isinstance(exc, self.retry_exceptions + _client_errors())
+
+    def should_retry(self, exc, attempt):
+        return attempt < self.max_attempts and self.is_retryable(exc)
+
+    def delay(self, attempt, exc=None):
+        # Full jitter: uniform in [0, min(max_delay, base * 2^(attempt-1))]
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after:
+            delay = max(delay, min(retry_after, rate_limiter.MAX_RETRY_AFTER))
+        return delay
+
+    def retrying(self, target, exc, attempt, delay):
+        print(f"[RETRY] {target}: {exc} (attempt {attempt + 1}/{self.max_attempts} in {delay:.1f}s)")
+
+    def give_up(self, target, exc, attempts):
+        store = get_store()
+        if store:
+            store.add(self.name, target, exc, attempts)
+
+
+class DeadLetters:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letters ("
+            " scraper TEXT, target TEXT, error TEXT, attempts INTEGER, failed_at REAL,"
+            " PRIMARY KEY (scraper, target))"
+        )
+
+    def add(self, scraper, target, exc, attempts):
+        error = f"{type(exc).__name__}: {exc}"
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO dead_letters VALUES (?, ?, ?, ?, ?)",
+                            (scraper, json.dumps(target), error, attempts, time.time()))
+
+    def entries(self, scraper=None):
+        # [(scraper, target, error, attempts, failed_at)], oldest first
+        query = "SELECT scraper, target, error, attempts, failed_at FROM dead_letters"
+        args = ()
+        if scraper:
+            query += " WHERE scraper = ?"
+            args = (scraper,)
+        with self.lock:
+            rows = self.db.execute(query + " ORDER BY failed_at", args).fetchall()
+        return [(name, _decode(target), error, attempts, failed_at)
+                for name, target, error, attempts, failed_at in rows]
+
+    def take(self, scraper):
+        # Remove and return the scraper's dead targets for a replay. Anything
+        # that fails again is added back by the replay run.
+        with self.lock:
+            rows = self.db.execute("SELECT target FROM dead_letters WHERE scraper = ? ORDER BY failed_at",
+                                   (scraper,)).fetchall()
+            self.db.execute("DELETE FROM dead_letters WHERE scraper = ?", (scraper,))
+        return [_decode(target) for (target,) in rows]
+
+    def count(self, scraper=None):
+        return len(self.entries(scraper))
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def _decode(target):
+    # Targets are strings or tuples; JSON turns tuples into lists
+    target = json.loads(target)
+    return tuple(target) if isinstance(target, list) else target
+
+
+class _Scheduler:
+    # Target source for imap_retry: yields (target, attempt) pairs, due retries
+    # first, and finishes once the source is exhausted and nothing is left in
+    # flight or waiting on the delay heap.
+    def __init__(self, items):
+        self.source = iter(items)
+        self.exhausted = False
+        self.heap = []
+        self.order = itertools.count()
+        self.outstanding = 0
+        self.cond = threading.Condition()
+
+    def __iter__(self):
+        while True:
+            with self.cond:
+                item = self._due()
+                while item is None and self.exhausted:
+                    if not self.heap and not self.outstanding:
+                        return
+                    wait = self.heap[0][0] - time.monotonic() if self.heap else None
+                    self.cond.wait(wait)
+                    item = self._due()
+            if item is None:
+                try:
+                    item = (next(self.source), 1)
+                except StopIteration:
+                    with self.cond:
+                        self.exhausted = True
+                    continue
+            with self.cond:
+                self.outstanding += 1
+            yield item
+
+    def _due(self):
+        if self.heap and self.heap[0][0] <= time.monotonic():
+            _, _, target, attempt = heapq.heappop(self.heap)
+            return target, attempt
+        return None
+
+    def later(self, target, attempt, delay):
+        with self.cond:
+            heapq.heappush(self.heap, (time.monotonic() + delay, next(self.order), target, attempt))
+            self.cond.notify_all()
+
+    def done(self):
+        with self.cond:
+            self.outstanding -= 1
+            self.cond.notify_all()
+
+
+def imap_retry(func, items, policy, on_error=None, max_workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+    # imap_unordered with retries: func(target) raises on failure (use
+    # policy.check(response) for status codes). Retryable failures are
+    # rescheduled after their backoff; the rest, and targets that run out
+    # of attempts, go to on_error(target, exc) and the dead-letter list.
+    # Each target's outcome is reported to metrics.
+    schedule = _Scheduler(items)
+
+    def attempt(item):
+        target, n = item
+        try:
+            return metrics.finished(func(target))
+        except Exception as e:
+            if policy.should_retry(e, n):
+                delay = policy.delay(n, e)
+                policy.retrying(target, e, n, delay)
+                metrics.count("retried")
+                schedule.later(target, n + 1, delay)
+                return None
+            policy.give_up(target, e, n)
+            return metrics.finished(on_error(target, e) if on_error else print(f"{target}, Error: {e}"))
+        finally:
+            schedule.done()
+
+    return imap_unordered(attempt, schedule, max_workers=max_workers, queue_size=queue_size)
+
+
+def call(func, target, policy, on_error=None):
+    # One target, retried in the calling thread (which sleeps through the
+    # backoff): for callers that need this one result before they can go
+    # on, like enrich's lookups. Same policy, dead letters and on_error as
+    # imap_retry, but the outcome is not counted in metrics - the target is
+    # not one of the run's own.
+    n = 1
+    while True:
+        try:
+            return func(target)
+        except Exception as e:
+            if not policy.should_retry(e, n):
+                policy.give_up(target, e, n)
+                return on_error(target, e) if on_error else print(f"{target}, Error: {e}")
+            delay = policy.delay(n, e)
+            policy.retrying(target, e, n, delay)
+            metrics.count("retried")
+            time.sleep(delay)
+            n += 1
+
+
+_store = None
+_store_lock = threading.Lock()
+_path = os.environ.get("SCRAPER_DEAD_LETTERS", DEFAULT_PATH)
+
+
+def get_store():
+    # The shared dead-letter list (None when disabled)
+    global _store
+    if _store is None and _path and _path.lower() not in ("0", "off", "none"):
+        with _store_lock:
+            if _store is None:
+                _store = DeadLetters(_path)
+    return _store
+
+
+def configure(path=DEFAULT_PATH):
+    # path=None disables the dead-letter list
+    global _store, _path
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = None
+        _path = path
+    return get_store()
+
+
+def take(scraper):
+    store = get_store()
+    return store.take(scraper) if store else []
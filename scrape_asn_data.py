@@ -1,94 +1,88 @@
-import requests
-from bs4 import BeautifulSoup
-import threading
-
-
-
-
-results=[]
-
-def handle_single_asn(asn):
-    print(f"Scanning {asn}...")
-    try:
-        # Send a GET request to the URL with the IP address
-        url = f"https://ipinfo.io/AS{asn}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                          'AppleWebKit/537.36 (KHTML, like Gecko) '
-                          'Chrome/90.0.4430.212 Safari/537.36'
-        }
-        response = requests.get(url,headers=headers)
-        if response.status_code == 200:
-            
-            # Parse the HTML content using BeautifulSoup
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            result = {}
-            result['asn'] = f"AS{asn}"  # Store ASN
-
-            # === Geolocation Block ===
-            geo_block = soup.find('div', id='block-geolocation')
-            if geo_block:
-                table = geo_block.find('table')
-                if table:
-                    for row in table.find_all('tr'):
-                        cells = row.find_all('td')
-                        if len(cells) == 2:
-                            key = cells[0].get_text(strip=True)
-                            value = cells[1].get_text(strip=True)
-                            result[key] = value
-
-            # === Summary Block ===
-            summary_block = soup.find('div', id='block-summary')
-            if summary_block:
-                summary_table = summary_block.find('table')
-                if summary_table:
-                    for row in summary_table.find_all('tr'):
-                        cells = row.find_all('td')
-                        if len(cells) == 2:
-                            key = cells[0].get_text(strip=True)
-                            value_cell = cells[1]
-
-                            # Handle links in the value cell
-                            link = value_cell.find('a')
-                            if link:
-                                link_text = link.get_text(strip=True)
-                                link_href = link.get('href')
-                                value = f"{link_text} ({link_href})" if link_href else link_text
-                            else:
-                                value = value_cell.get_text(strip=True)
-
-                            result[key] = value
-
-            
-            results.append(result)       
-        else:
-            print(f"asn: {asn}, Status Code: {response.status_code}")
-
-    except requests.RequestException as e:
-        print(f"asn: {asn}, Error: {e}")
-
-
-def main(input):
-    # Create a list of IP addresses in the subnet
-    results.clear()
+import checkpoint
+import parsers
+from records import AsnRecord
+from scraper_base import Scraper
+from worker_pool import DEFAULT_WORKERS
+
+
+def parse_asn(asn, content, backend=None):
+    # Extract the geolocation and summary tables (see parsers.extract_ipinfo)
+    # into a typed record; the ASN is stored as its number
+    geo, summary = parsers.extract_ipinfo(content, backend)
+    return AsnRecord.from_page(int(asn), (geo or []) + (summary or []))
+
+def target_range(input):
     start_str, end_str = input.split('-')
-    start = int(start_str)
-    end = int(end_str)
-
-# Generate the list of strings
-    asn_list = [str(i) for i in range(start, end + 1)]
-
-    threads = []
-    for i in asn_list:
-        
-        thread = threading.Thread(target=handle_single_asn, args=(i,))
-        threads.append(thread)
-        thread.start()
-
-     # Now wait for all threads to finish
-    for thread in threads:
-        thread.join()
+    return int(start_str), int(end_str)
+
+
+class AsnScraper(Scraper):
+    name = 'asn'
+    record = AsnRecord
+    # ASN registry data changes very slowly
+    cache_ttl = 7 * 24 * 60 * 60  # seconds, see http_cache
+    # the records are printed once the whole range is in (see main)
+    echo = False
+
+    def targets(self, input):
+        start, end = target_range(input)
+        # Generate the ASNs lazily so a huge range never sits in memory
+        return (str(i) for i in range(start, end + 1))
+
+    def count(self, input):
+        start, end = target_range(input)
+        return max(0, end - start + 1)
+
+    def partition(self, input, size):
+        start, end = target_range(input)
+        for lo in range(start, end + 1, size):
+            hi = min(lo + size - 1, end)
+            yield f"{lo}-{hi}", hi - lo + 1
+
+    def build_url(self, asn):
+        return f"https://ipinfo.io/AS{asn}"
+
+    def parse(self, asn, content, backend=None):
+        return parse_asn(asn, content, backend)
+
+
+SCRAPER = AsnScraper()
+
+# Module-level API (cli, main_gui, enrich use these)
+CACHE_TTL = SCRAPER.cache_ttl
+# Timeouts, 429 and 5xx are retried; targets that keep failing are
+# dead-lettered under this name (see retry)
+RETRY = SCRAPER.retry
+HEADERS = SCRAPER.headers
+
+# Output columns, in order, and their types (see records, sinks)
+FIELDS = AsnRecord.FIELDS
+TYPES = AsnRecord.TYPES
+
+build_url = SCRAPER.build_url
+handle_response = SCRAPER.handle_response
+raw_response = SCRAPER.raw_response
+handle_error = SCRAPER.handle_error
+handle_single_asn = SCRAPER.scrape
+targets = SCRAPER.targets
+jobs = SCRAPER.jobs
+iter_targets = SCRAPER.iter_targets
+iter_results = SCRAPER.iter_results
+iter_dead_letters = SCRAPER.iter_dead_letters
+aiter_results = SCRAPER.aiter_results
+
+
+def sweep(input, job_id, filename, max_workers=DEFAULT_WORKERS, backend="threads", parse_processes=0):
+    # Checkpointed run of an ASN range into filename (.csv / .jsonl).
+    # Rerunning with the same job_id skips the ASNs that are already done.
+    journal = checkpoint.Journal(job_id, *target_range(input))
+    with checkpoint.open_output(journal, filename, FIELDS, TYPES) as sink:
+        items = (str(n) for n in journal.pending())
+        records = iter_targets(items, max_workers, backend, parse_processes,
+                               on_failed=lambda asn: journal.mark(int(asn)))
+        return checkpoint.run(journal, records, sink, lambda record: record.asn)
+
+def main(input, max_workers=DEFAULT_WORKERS, backend="threads", parse_processes=0):
+    results = SCRAPER.main(input, max_workers, backend, parse_processes)
     print(results);        
     return results
-
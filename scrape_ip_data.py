@@ -1,88 +1,113 @@
-import requests
-from bs4 import BeautifulSoup
-import threading
-
-
-
-
-results=[]
-
-def handle_single_ip(ip):
-    print(f"Scanning {ip}...")
-    try:
-        # Send a GET request to the URL with the IP address
-        url = f"https://ipinfo.io/{ip}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                          'AppleWebKit/537.36 (KHTML, like Gecko) '
-                          'Chrome/90.0.4430.212 Safari/537.36'
-        }
-        response = requests.get(url,headers=headers)
-        if response.status_code == 200:
-            
-            # Parse the HTML content using BeautifulSoup
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            result={}
-            result['ip'] = ip
-            # Extract the ip data
-            geo_block=soup.find('div',id='block-geolocation')
-            table=geo_block.find('table')
-            
-              # Iterate through all rows
-            for row in table.find_all('tr'):
-                cells = row.find_all('td')
-                if len(cells) == 2:
-                    key = cells[0].get_text(strip=True)
-                    value = cells[1].get_text(strip=True)
-                    result[key] = value
-            
-            summary_block = soup.find('div', id='block-summary')
-            if summary_block:
-                summary_table = summary_block.find('table')
-                if summary_table:
-                    for row in summary_table.find_all('tr'):
-                        cells = row.find_all('td')
-                        if len(cells) == 2:
-                            key = cells[0].get_text(strip=True)
-                            # Extract text **and** any link (if present)
-                            value_cell = cells[1]
-
-                            # If cell contains <a>, get link text + href
-                            link = value_cell.find('a')
-                            if link:
-                                link_text = link.get_text(strip=True)
-                                link_href = link.get('href')
-                                value = f"{link_text} ({link_href})" if link_href else link_text
-                            else:
-                                value = value_cell.get_text(strip=True)
-
-                            result[key] = value
-
-            print(result)
-            results.append(result);        
-        else:
-            print(f"IP: {ip}, Status Code: {response.status_code}")
-
-    except requests.RequestException as e:
-        print(f"IP: {ip}, Error: {e}")
-
-
-def main(subnet):
-    # Create a list of IP addresses in the subnet
-    results.clear()
-    ip_list = [f"{subnet}.{i}" for i in range(1, 20)]
-    
-    threads = []
-    for i in ip_list:
-        
-        thread = threading.Thread(target=handle_single_ip, args=(i,))
-        threads.append(thread)
-        thread.start()
-
-     # Now wait for all threads to finish
-    for thread in threads:
-        thread.join()    
+import checkpoint
+import enrich
+import http_cache
+import ip_targets
+import metrics
+import parsers
+import range_index
+from records import IpRecord
+from scraper_base import Scraper
+from worker_pool import DEFAULT_WORKERS
+
+
+def parse_ip(ip, content, backend=None):
+    # Extract the geolocation and summary tables (see parsers.extract_ipinfo)
+    # into a typed record
+    geo, summary = parsers.extract_ipinfo(content, backend)
+    if geo is None:
+        raise ValueError("geolocation table not found")
+    return IpRecord.from_page(ip, geo + (summary or []))
+
+
+class IpScraper(Scraper):
+    name = 'ip'
+    label = 'IP'
+    record = IpRecord
+    # ipinfo data for an IP rarely changes within a day
+    cache_ttl = 24 * 60 * 60  # seconds, see http_cache
+
+    def targets(self, spec, shard=0, shards=1):
+        # Generate the IP addresses lazily from a CIDR / range / list spec
+        # (see ip_targets); shard/shards split one spec between processes
+        return ip_targets.TargetSpace(spec).addresses(shard, shards)
+
+    def count(self, spec, shard=0, shards=1):
+        return ip_targets.TargetSpace(spec).shard_size(shard, shards)
+
+    def partition(self, spec, size):
+        # Consecutive index runs, written back as address ranges
+        space = ip_targets.TargetSpace(spec)
+        for lo in range(0, len(space), size):
+            hi = min(lo + size, len(space))
+            yield space.spec_between(lo, hi), hi - lo
+
+    def build_url(self, ip):
+        return f"https://ipinfo.io/{ip}"
+
+    def parse(self, ip, content, backend=None):
+        return parse_ip(ip, content, backend)
+
+    def iter_targets(self, items, max_workers=DEFAULT_WORKERS, backend="threads", parse_processes=0, on_failed=None, ranges=None):
+        # ranges (a range_index.RangeResolver) fetches one IP per known Range
+        # and fills in the rest from it
+        return super().iter_targets(items, max_workers, backend, parse_processes, on_failed,
+                                    resolver=ranges.resolve if ranges is not None else None)
+
+    def iter_results(self, spec, max_workers=DEFAULT_WORKERS, backend="threads", parse_processes=0, shard=0, shards=1, ranges=None):
+        space = ip_targets.TargetSpace(spec)
+        metrics.expect(space.shard_size(shard, shards))
+        return self.iter_targets(space.addresses(shard, shards), max_workers, backend, parse_processes, ranges=ranges)
+
+
+SCRAPER = IpScraper()
+
+# Module-level API (cli, main_gui, enrich use these)
+CACHE_TTL = SCRAPER.cache_ttl
+# Timeouts, 429 and 5xx are retried; targets that keep failing are
+# dead-lettered under this name (see retry)
+RETRY = SCRAPER.retry
+HEADERS = SCRAPER.headers
+
+# Output columns, in order, and their types (see records, sinks)
+FIELDS = IpRecord.FIELDS
+TYPES = IpRecord.TYPES
+
+build_url = SCRAPER.build_url
+handle_response = SCRAPER.handle_response
+raw_response = SCRAPER.raw_response
+handle_error = SCRAPER.handle_error
+handle_single_ip = SCRAPER.scrape
+targets = SCRAPER.targets
+jobs = SCRAPER.jobs
+iter_targets = SCRAPER.iter_targets
+iter_results = SCRAPER.iter_results
+iter_dead_letters = SCRAPER.iter_dead_letters
+aiter_results = SCRAPER.aiter_results
+
+
+def sweep(spec, job_id, filename, max_workers=DEFAULT_WORKERS, backend="threads", parse_processes=0, shard=0, shards=1, ranges=None):
+    # Checkpointed run into filename (.csv / .jsonl). Rerunning with the
+    # same job_id skips the IPs that are already done. The journal is kept
+    # over the spec's address indexes, so sparse lists and IPv6 work too.
+    space = ip_targets.TargetSpace(spec)
+    journal = checkpoint.Journal(job_id, 0, len(space) - 1)
+    with checkpoint.open_output(journal, filename, FIELDS, TYPES) as sink:
+        items = (space.address(i) for i in journal.pending() if space.in_shard(i, shard, shards))
+        records = iter_targets(items, max_workers, backend, parse_processes,
+                               on_failed=lambda ip: journal.mark(space.index(ip)), ranges=ranges)
+        return checkpoint.run(journal, records, sink, lambda record: space.index(record.ip))
+
+def main(spec, max_workers=DEFAULT_WORKERS, backend="threads", parse_processes=0, dedup=False, enrich_asn=False):
+    # dedup=True resolves each ipinfo Range once (see range_index);
+    # enrich_asn=True adds the AS page fields for each record's ASN (see enrich)
+    ranges = range_index.RangeResolver() if dedup else None
+    records = iter_results(spec, max_workers, backend, parse_processes, ranges=ranges)
+    if enrich_asn:
+        records = enrich.join_asn(records)
+    results = list(records)
+    print(http_cache.stats_line())
+    if ranges:
+        print(ranges.stats_line())
     return results
 
 
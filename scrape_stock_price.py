@@ -1,84 +1,285 @@
-import requests
-from bs4 import BeautifulSoup
-import threading
-import time
+import asyncio
+import json
+from functools import partial
+import fetcher
+import http_cache
+import metrics
+import parsers
+import poller
+import scraper_base
+import sinks
+from records import StockRecord
+from worker_pool import DEFAULT_WORKERS
 
 # Example usage: AAPL, MSFT, GOOGL
 example_input = "AAPL, MSFT, GOOGL"
 print("Example stock symbols input:", example_input)
 
 
-results = []
-lock = threading.Lock()
+# Race mode: ask the first source, and only if it has not answered with a
+# usable quote after HEDGE_DELAY seconds (or failed) ask the next one too.
+# The first good quote wins and the other request is cancelled.
+HEDGE_DELAY = 1.0  # seconds; 0 races all sources at once
 
-def scrape_stock_price(stock_symbol, url):
+# Batch mode: Yahoo's quote endpoint returns many symbols per request
+BATCH_SIZE = 50
+BATCH_URL = "https://query1.finance.yahoo.com/v7/finance/quote?symbols={symbols}"
+
+def build_urls(symbol):
+    return [
+        f"https://finance.yahoo.com/quote/{symbol}",
+        f"https://www.marketwatch.com/investing/stock/{symbol.lower()}"
+    ]
+
+def parse_stock(stock_symbol, url, content, backend=None):
+    # price / change / percent_change for Yahoo or MarketWatch, as numbers
+    return StockRecord.from_page(stock_symbol, url, parsers.extract_stock(content, url, backend))
+
+def parse_symbols(user_input):
+    # Take user input for stock symbols (duplicates dropped, order kept)
+    return list(dict.fromkeys(s.strip().upper() for s in user_input.split(',') if s.strip()))
+
+
+class StockScraper(scraper_base.Scraper):
+    # Targets are (symbol, url) pairs, one per quote source
+    name = "stock"
+    record = StockRecord
+    # Quotes go stale quickly
+    cache_ttl = 60  # seconds, see http_cache
+    # A quote is only worth a couple of quick retries
+    retry_options = {"max_attempts": 3, "base_delay": 0.5, "max_delay": 5.0}
     headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                      'AppleWebKit/537.36 (KHTML, like Gecko) '
-                      'Chrome/90.0.4430.212 Safari/537.36',
+        **scraper_base.HEADERS,
         'Accept-Language': 'en-US,en;q=0.9',
         'Referer': 'https://google.com'
     }
 
-    try:
-        print(f"Fetching {stock_symbol} data from {url}...")
-        response = requests.get(url, headers=headers, timeout=10)
+    def targets(self, user_input):
+        # Generate (symbol, url) pairs for each symbol
+        for symbol in parse_symbols(user_input):
+            for url in build_urls(symbol):
+                yield (symbol, url)
+
+    def count(self, user_input):
+        return sum(len(build_urls(symbol)) for symbol in parse_symbols(user_input))
+
+    def partition(self, user_input, size):
+        # By symbol (not by source), so each unit can still race the sources
+        symbols = parse_symbols(user_input)
+        for i in range(0, len(symbols), size):
+            chunk = symbols[i:i + size]
+            yield ", ".join(chunk), len(chunk)
+
+    def build_url(self, target):
+        return target[1]
+
+    def parse(self, target, content, backend=None):
+        return parse_stock(*target, content, backend)
 
+    def handle_response(self, target, response):
+        stock_symbol, url = target
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            result = {"symbol": stock_symbol, "source": url}
-
-            if "yahoo.com" in url:
-                price = soup.find("fin-streamer", {"data-field": "regularMarketPrice"})
-                change = soup.find("fin-streamer", {"data-field": "regularMarketChange"})
-                percent = soup.find("fin-streamer", {"data-field": "regularMarketChangePercent"})
-
-                result["price"] = price.text if price else "N/A"
-                result["change"] = change.text if change else "N/A"
-                result["percent_change"] = percent.text if percent else "N/A"
-
-            elif "marketwatch.com" in url:
-                price = soup.find("bg-quote", class_="value")
-                change = soup.find("bg-quote", class_="change--point--q")
-                percent = soup.find("bg-quote", class_="change--percent--q")
-
-                result["price"] = price.text.strip() if price else "N/A"
-                result["change"] = change.text.strip() if change else "N/A"
-                result["percent_change"] = percent.text.strip() if percent else "N/A"
-
-            with lock:
-                results.append(result)
-                print(f"Successfully fetched {stock_symbol} data from {url}")
+            result = parse_stock(stock_symbol, url, response.content)
+            print(f"Successfully fetched {stock_symbol} data from {url}")
+            return result
         else:
             print(f"Failed to fetch {url}. Status code: {response.status_code}")
 
-    except Exception as e:
+    def handle_error(self, target, e):
+        stock_symbol, url = target
         print(f"Error fetching {stock_symbol} data from {url}: {e}")
 
-def main(user_input):
-    print("\nStarting stock price scraping...")
-    results.clear()
-    # Take user input for stock symbols
-    symbols = [s.strip().upper() for s in user_input.split(',') if s.strip()]
-
-# Generate stock URLs for each symbol
-    stocks = [
-        {"symbol": symbol, "urls": [
-           f"https://finance.yahoo.com/quote/{symbol}",
-           f"https://www.marketwatch.com/investing/stock/{symbol.lower()}"
-     ]}
-     for symbol in symbols
-    ]
+    def scrape(self, target, on_response=None, revalidate=False):
+        # Raises on failure so the retry runner can reschedule the target
+        print(f"Fetching {target[0]} data from {target[1]}...")
+        return (on_response or self.handle_response)(target, self.fetch(target, revalidate))
+
+    def iter_results(self, user_input, max_workers=DEFAULT_WORKERS, backend="threads", parse_processes=0, *, mode="race"):
+        # mode "race": one quote per symbol, first good source wins
+        #      "batch": multi-symbol requests, page race for whatever they miss
+        #      "all": every source for every symbol (one record per source)
+        # Only "all" runs on the chosen backend. Racing needs to cancel the
+        # slower request, so race and batch always run on an asyncio loop
+        # (on a helper thread, see fetcher.sync_iter) whatever backend says.
+        if mode == "all":
+            return super().iter_results(user_input, max_workers, backend, parse_processes)
+        if mode not in ("race", "batch"):
+            raise ValueError(f"unknown mode {mode!r} (use race, batch or all)")
+        if parse_processes:
+            raise ValueError(f"mode {mode!r} parses in the event loop's threads (parse_processes needs mode 'all')")
+        batch_size = BATCH_SIZE if mode == "batch" else 0
+        symbols = parse_symbols(user_input)
+        metrics.expect(len(symbols))
+        return fetcher.sync_iter(lambda: aquotes(symbols, max_workers, batch_size=batch_size), max_workers)
+
+    def aiter_results(self, user_input, max_workers=DEFAULT_WORKERS, *, mode="race"):
+        if mode == "all":
+            return super().aiter_results(user_input, max_workers)
+        return aquotes(parse_symbols(user_input), max_workers, batch_size=BATCH_SIZE if mode == "batch" else 0)
+
+
+SCRAPER = StockScraper()
+
+# Module-level API (cli, main_gui use these)
+CACHE_TTL = SCRAPER.cache_ttl
+RETRY = SCRAPER.retry
+HEADERS = SCRAPER.headers
+
+# Watch mode re-polls every symbol this often (see poller). Its fetches
+# always revalidate, so any interval sees changes, shorter than CACHE_TTL too.
+POLL_INTERVAL = CACHE_TTL
+
+# Output columns, in order, and their types (see records, sinks)
+FIELDS = StockRecord.FIELDS
+TYPES = StockRecord.TYPES
 
-    threads = []
+handle_response = SCRAPER.handle_response
+handle_error = SCRAPER.handle_error
+scrape_target = SCRAPER.scrape
+targets = SCRAPER.targets
+jobs = SCRAPER.jobs
+# Pacing per site is done by fetcher's shared rate limiter (see rate_limiter)
+iter_targets = SCRAPER.iter_targets
+iter_results = SCRAPER.iter_results
+iter_dead_letters = SCRAPER.iter_dead_letters
+aiter_results = SCRAPER.aiter_results
 
-    for stock in stocks:
-        for url in stock["urls"]:
-            thread = threading.Thread(target=scrape_stock_price, args=(stock["symbol"], url))
-            thread.start()
-            threads.append(thread)
-            time.sleep(0.5)  # Gentle delay to avoid hitting rate limits
+def scrape_stock_price(stock_symbol, url, revalidate=False):
+    return scrape_target((stock_symbol, url), revalidate=revalidate)
 
-    for thread in threads:
-        thread.join()
+def scrape_symbol(symbol, revalidate=False):
+    # First source with a good quote, asked one after the other
+    for url in build_urls(symbol):
+        try:
+            record = scrape_stock_price(symbol, url, revalidate)
+        except Exception as e:
+            handle_error((symbol, url), e)
+            continue
+        if good_quote(record):
+            return record
+    return None
+
+def good_quote(record):
+    return record is not None and record.price is not None
+
+def parse_batch(url, content):
+    # {symbol: record} from a Yahoo quote endpoint response. Values are kept
+    # as sent and missing ones stay None, like the page path (records.number)
+    quotes = {}
+    for item in json.loads(content).get("quoteResponse", {}).get("result") or ():
+        price = item.get("regularMarketPrice")
+        if price is None:
+            continue
+        symbol = item["symbol"].upper()
+        quotes[symbol] = StockRecord(symbol, url, float(price), _number(item.get("regularMarketChange")),
+                                     _number(item.get("regularMarketChangePercent")))
+    return quotes
+
+def _number(value):
+    return None if value is None else float(value)
+
+async def fetch_quote(client, symbol, url):
+    response = await client.get(url, headers=HEADERS, ttl=CACHE_TTL)
+    # Parsed off the event loop, like fetcher.fetch_stream does
+    return await asyncio.to_thread(handle_response, (symbol, url), response)
+
+async def race_quote(client, symbol, hedge=HEDGE_DELAY):
+    # First good quote from build_urls(symbol); the slower request is cancelled
+    sources = list(build_urls(symbol))
+    pending = set()
+
+    def launch():
+        if sources:
+            url = sources.pop(0)
+            pending.add(asyncio.create_task(fetch_quote(client, symbol, url), name=url))
+
+    launch()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, timeout=hedge if sources else None,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch()  # hedge: the current source is slow, ask the next one too
+                continue
+            for task in done:
+                pending.discard(task)
+                try:
+                    record = task.result()
+                except Exception as e:
+                    handle_error((symbol, task.get_name()), e)
+                    record = None
+                if good_quote(record):
+                    return record
+            if not pending:
+                launch()  # everything asked so far failed, try the next source now
+        print(f"No source had a quote for {symbol}")
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+async def fetch_batch(client, chunk):
+    # ([records], [symbols the batch did not cover])
+    url = BATCH_URL.format(symbols=",".join(chunk))
+    try:
+        response = await client.get(url, headers=HEADERS, ttl=CACHE_TTL)
+        quotes = parse_batch(url, response.content) if response.status_code == 200 else {}
+        if response.status_code != 200:
+            print(f"Batch quote failed. Status code: {response.status_code}")
+    except Exception as e:
+        print(f"Batch quote failed: {e}")
+        quotes = {}
+    print(f"Batch of {len(chunk)} symbols: {len(quotes)} quotes")
+    return list(quotes.values()), [symbol for symbol in chunk if symbol not in quotes]
+
+async def aquotes(symbols, max_workers=DEFAULT_WORKERS, hedge=HEDGE_DELAY, batch_size=0):
+    # One quote per symbol, yielded as they arrive. batch_size > 0 asks the
+    # batch endpoint first and races the pages only for symbols it missed.
+    async with fetcher.AsyncFetcher() as client:
+        slots = asyncio.Semaphore(max_workers)
+
+        async def race(symbol):
+            async with slots:
+                return [await race_quote(client, symbol, hedge)], []
+
+        async def batch(chunk):
+            async with slots:
+                return await fetch_batch(client, chunk)
+
+        if batch_size:
+            tasks = {asyncio.create_task(batch(symbols[i:i + batch_size])) for i in range(0, len(symbols), batch_size)}
+        else:
+            tasks = {asyncio.create_task(race(symbol)) for symbol in symbols}
+        try:
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    records, missing = task.result()
+                    for record in records:
+                        if metrics.finished(record) is not None:
+                            yield record
+                    tasks |= {asyncio.create_task(race(symbol)) for symbol in missing}
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+def iter_changes(user_input, interval=POLL_INTERVAL, max_workers=DEFAULT_WORKERS, cycles=None):
+    # Re-polls the symbols forever (or for `cycles` rounds), yielding a
+    # quote only when it moved
+    return poller.poll(partial(scrape_symbol, revalidate=True), parse_symbols(user_input), interval, key=lambda record: record.symbol,
+                       ignore=("source",), max_workers=max_workers, cycles=cycles)
+
+def watch(user_input, filename="stock_changes.csv", interval=POLL_INTERVAL, max_workers=DEFAULT_WORKERS, cycles=None):
+    with sinks.open_sink(filename, fields=FIELDS, types=TYPES) as sink:
+        for record in iter_changes(user_input, interval, max_workers, cycles):
+            print(f"{record.symbol}: {record.price} {record.change} {record.percent_change}%")
+            sink.write(record)
+
+def main(user_input, max_workers=DEFAULT_WORKERS, backend="threads", mode="race"):
+    print("\nStarting stock price scraping...")
+    results = list(iter_results(user_input, max_workers, backend, mode=mode))
+    print(http_cache.stats_line())
     return results
@@ -1,82 +1,88 @@
-import requests
-from bs4 import BeautifulSoup
 import csv
 import os
 from datetime import datetime
+from functools import partial
 import threading
+import parsers
+import poller
+import sinks
+from records import WeatherRecord
+from scraper_base import Scraper
+from worker_pool import DEFAULT_WORKERS
 
 print_lock = threading.Lock()  # For thread-safe console output
-results=[]
-def scrape_weather(city):
-    city = city.lower().replace(" ", "-")
-    url = f"https://www.timeanddate.com/weather/{city}"
 
-    try:
-        response = requests.get(url, timeout=10)
+def city_slug(city):
+    return city.lower().replace(" ", "-")
+
+def parse_weather(city, url, text, backend=None):
+    # Temperature, condition, details table and 5-hour forecast, as numbers
+    # in fixed units (see records.WeatherRecord)
+    fields = parsers.extract_weather(text, backend)
+    return WeatherRecord.from_page(city, fields, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), url)
+
+
+class WeatherScraper(Scraper):
+    name = "weather"
+    record = WeatherRecord
+    # Weather is refreshed every few minutes
+    cache_ttl = 10 * 60  # seconds, see http_cache
+    headers = None
+
+    def targets(self, user_input):
+        cities = [c.strip() for c in user_input.split(",") if c.strip()]
+        print(cities)
+        return cities
+
+    def count(self, user_input):
+        return len([c for c in user_input.split(",") if c.strip()])
+
+    def build_url(self, city):
+        return f"https://www.timeanddate.com/weather/{city_slug(city)}"
+
+    def parse(self, city, content, backend=None):
+        return parse_weather(city_slug(city), self.build_url(city), content, backend)
+
+    def handle_response(self, city, response):
         if response.status_code != 200:
+            with print_lock:
+                print(f"[ERROR] Failed for {city_slug(city)}: status code {response.status_code}")
             return None
+        return parse_weather(city_slug(city), self.build_url(city), response.text)
 
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # Temperature
-        temp_div = soup.find("div", class_="h2")
-        temperature = temp_div.text.strip() if temp_div else "N/A"
-
-        # Condition
-        condition_p = soup.find("p")
-        condition = condition_p.text.strip() if condition_p else "N/A"
-
-        # Details (Humidity, Dew Point, Pressure, Visibility)
-        details = soup.find_all("table", class_="table table--left table--inner-borders-rows")
-
-        humidity = pressure = dew_point = visibility = "N/A"
-        if details:
-            rows = details[0].find_all("tr")
-            for row in rows:
-                header = row.find("th")
-                value = row.find("td")
-                if header and value:
-                    text = header.text.strip().lower()
-                    val = value.text.strip()
-                    if "humidity" in text:
-                        humidity = val
-                    elif "pressure" in text:
-                        pressure = val
-                    elif "dew point" in text:
-                        dew_point = val
-                    elif "visibility" in text:
-                        visibility = val
-
-        # Upcoming 5-hour forecast (if available)
-        forecast_data = []
-        forecast_table = soup.find("table", class_="zebra tb-wt fw va-m tb-hover")
-        if forecast_table:
-            rows = forecast_table.find_all("tr")[1:6]  # Get 5 rows
-            for row in rows:
-                cols = row.find_all("td")
-                if len(cols) >= 2:
-                    time = cols[0].text.strip()
-                    forecast_condition = cols[1].text.strip()
-                    forecast_data.append(f"{time}: {forecast_condition}")
-
-        return {
-            "city": city,
-            "temperature": temperature,
-            "condition": condition,
-            "visibility": visibility,
-            "pressure": pressure,
-            "humidity": humidity,
-            "dew_point": dew_point,
-            "forecast": " | ".join(forecast_data) if forecast_data else "N/A",
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "source": url
-        }
-
-    except Exception as e:
+    def handle_error(self, city, e):
         with print_lock:
-            print(f"[ERROR] Failed for {city}: {e}")
+            print(f"[ERROR] Failed for {city_slug(city)}: {e}")
         return None
 
+
+SCRAPER = WeatherScraper()
+
+# Module-level API (cli, main_gui use these)
+CACHE_TTL = SCRAPER.cache_ttl
+# Failed cities are retried, then dead-lettered under this name (see retry)
+RETRY = SCRAPER.retry
+
+# Watch mode re-polls every city this often (see poller). Its fetches
+# always revalidate, so any interval sees changes, shorter than CACHE_TTL too.
+POLL_INTERVAL = CACHE_TTL
+
+# Output columns, in order, and their types (see records, sinks)
+FIELDS = WeatherRecord.FIELDS
+TYPES = WeatherRecord.TYPES
+
+build_url = SCRAPER.build_url
+handle_response = SCRAPER.handle_response
+handle_error = SCRAPER.handle_error
+scrape_weather = SCRAPER.scrape
+targets = SCRAPER.targets
+jobs = SCRAPER.jobs
+iter_targets = SCRAPER.iter_targets
+iter_results = SCRAPER.iter_results
+iter_dead_letters = SCRAPER.iter_dead_letters
+aiter_results = SCRAPER.aiter_results
+main = SCRAPER.main
+
 def log_to_csv(data, filename="weather_log.csv"):
     file_exists = os.path.isfile(filename)
     with open(filename, mode='a', newline='', encoding='utf-8-sig') as file:  # Changed to utf-8-sig
@@ -86,24 +92,16 @@ def log_to_csv(data, filename="weather_log.csv"):
         writer.writerow(data)
 
 def process_city(city):
-    result = scrape_weather(city)
-    results.append(result)
-   
-
-
-def main(user_input):
-    results.clear()
-
-    cities = [c.strip() for c in user_input.split(",") if c.strip()]
-    print(cities)
-    threads = []
-    for city in cities:
-     thread = threading.Thread(target=process_city, args=(city,))
-     thread.start()
-     threads.append(thread)
-
-    for thread in threads:
-        thread.join()
-    return results     
-
-
+    return scrape_weather(city)
+
+def iter_changes(user_input, interval=POLL_INTERVAL, max_workers=DEFAULT_WORKERS, cycles=None):
+    # Re-polls the cities forever (or for `cycles` rounds), yielding a
+    # city's record only when its weather changed
+    return poller.poll(partial(scrape_weather, revalidate=True), targets(user_input), interval, key=lambda record: record.city,
+                       ignore=("timestamp",), max_workers=max_workers, cycles=cycles)
+
+def watch(user_input, filename="weather_changes.csv", interval=POLL_INTERVAL, max_workers=DEFAULT_WORKERS, cycles=None):
+    with sinks.open_sink(filename, fields=FIELDS, types=TYPES) as sink:
+        for record in iter_changes(user_input, interval, max_workers, cycles):
+            print(record)
+            sink.write(record)
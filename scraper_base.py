@@ -0,0 +1,192 @@
+from functools import partial
+
+import checkpoint
+import fetcher
+import http_cache
+import metrics
+import retry
+import tracing
+from parse_pool import iter_parsed
+from worker_pool import DEFAULT_WORKERS
+
+# Shared machinery for every scraper.
+#
+# A scraper only says what is specific to its site:
+#
+#   targets(user_input)          - the targets (lazily, for big ranges)
+#   build_url(target)            - the page for one target
+#   parse(target, content, backend=None)
+#                                - page -> record (see records); describe the
+#                                  page as an extraction.Spec and run it with
+#                                  parsers.extract(spec, content, backend) to
+#                                  get every parser backend for free. Raise
+#                                  ValueError for a page without data
+#   partition(user_input, size)  - only if the input is not a comma-separated
+#                                  list: how to cut it into work units
+#
+# plus a few class attributes (name, record, cache_ttl, ...). Everything
+# else comes from here, the same for all of them: the shared keep-alive
+# session or the asyncio fetcher (see fetcher), the response cache
+# (http_cache), per-host rate limiting (rate_limiter), retries and
+# dead-lettering (retry), the process-pool parse stage (parse_pool),
+# progress metrics, tracing spans and streaming results as they complete.
+#
+# The scrape_*.py modules each define one subclass and keep their module
+# level functions as thin wrappers. New sites can do the same, or be
+# plugged in from another package (see scrapers.register / entry points):
+#
+#   class Example(Scraper):
+#       name = "example"
+#       record = ExampleRecord
+#       def targets(self, user_input): return user_input.split(",")
+#       def build_url(self, target): return f"https://example.com/{target}"
+#       def parse(self, target, content, backend=None): return ExampleRecord(...)
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+                  'AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/90.0.4430.212 Safari/537.36'
+}
+
+
+class Scraper:
+    name = None                         # retry / dead-letter name
+    label = None                        # target name in log lines (default: name)
+    record = None                       # records.Record subclass of the output
+    cache_ttl = None                    # seconds, see http_cache (None: no caching)
+    headers = HEADERS
+    timeout = fetcher.DEFAULT_TIMEOUT
+    retry_options = {}                  # RetryPolicy arguments besides the name
+    echo = True                         # print each record as it arrives
+
+    # GUI / CLI description (see scrapers); the built-in scrapers keep
+    # theirs in scrapers.SCRAPER_MAP so listing them imports nothing
+    title = None
+    command = None
+    prompt = "Enter targets (comma-separated):"
+    example = ""
+    validation = r".+"
+    list_input = True
+    csv_filename = None
+
+    def __init__(self):
+        self.retry = retry.RetryPolicy(self.name, **self.retry_options)
+
+    # --- what a scraper provides ---
+
+    def targets(self, user_input):
+        raise NotImplementedError
+
+    def build_url(self, target):
+        raise NotImplementedError
+
+    def parse(self, target, content, backend=None):
+        raise NotImplementedError
+
+    def count(self, user_input):
+        # Expected number of targets, for progress / ETA (None if unknown)
+        return None
+
+    def partition(self, user_input, size):
+        # Split the input into smaller inputs of about `size` targets each
+        # that together cover it exactly once, as (input, targets) pairs
+        # (work units, see distributed). The default cuts a comma-separated
+        # list; scrapers with other input shapes override it.
+        items = [item.strip() for item in user_input.split(",") if item.strip()]
+        for i in range(0, len(items), size):
+            chunk = items[i:i + size]
+            yield ", ".join(chunk), len(chunk)
+
+    # --- shared machinery ---
+
+    @property
+    def FIELDS(self):
+        return self.record.FIELDS
+
+    @property
+    def TYPES(self):
+        return self.record.TYPES
+
+    def handle_response(self, target, response):
+        if response.status_code == 200:
+            result = self.parse(target, response.content)
+            if self.echo:
+                print(result)
+            return result
+        print(f"{self.label or self.name}: {target}, Status Code: {response.status_code}")
+
+    def raw_response(self, target, response):
+        # Fetch-only handler for the process-pool pipeline: hand over the raw page
+        if response.status_code == 200:
+            return (target, response.content)
+        print(f"{self.label or self.name}: {target}, Status Code: {response.status_code}")
+
+    def handle_error(self, target, e):
+        print(f"{self.label or self.name}: {target}, Error: {e}")
+
+    def fetch(self, target, revalidate=False):
+        # Failures (and statuses worth retrying) raise, so the runner can
+        # reschedule the target. revalidate=True never takes a cached copy
+        # without asking the site (watch mode polls faster than cache_ttl).
+        ttl = 0 if revalidate and self.cache_ttl is not None else self.cache_ttl
+        response = fetcher.get(self.build_url(target), headers=self.headers, timeout=self.timeout, ttl=ttl)
+        self.retry.check(response)
+        return response
+
+    def scrape(self, target, on_response=None, revalidate=False):
+        # One target, on the calling thread
+        print(f"Scanning {target}...")
+        with tracing.span("scrape", scraper=self.name, target=target):
+            return (on_response or self.handle_response)(target, self.fetch(target, revalidate))
+
+    def jobs(self, items):
+        return ((target, self.build_url(target), self.headers) for target in items)
+
+    def iter_targets(self, items, max_workers=DEFAULT_WORKERS, backend="threads", parse_processes=0,
+                     on_failed=None, resolver=None):
+        # Yields each record as soon as its request completes.
+        # parse_processes > 0 moves parsing into that many worker processes
+        # and leaves only the downloads on the threads / event loop.
+        # on_failed(target) is called for every target that ends without a record.
+        # resolver(target, fetch=...) can stand in for the fetch, calling
+        # fetch(target) only when it has to (see range_index).
+        on_response = self.raw_response if parse_processes else self.handle_response
+        on_error = self.handle_error
+        if on_failed:
+            on_response, on_error = checkpoint.report_failures(on_response, on_error, on_failed)
+        fetch = partial(self.scrape, on_response=on_response)
+        if resolver is not None:
+            if backend == "async" or parse_processes:
+                raise ValueError(f"{self.name}: a resolver needs the threads backend and in-thread parsing")
+            return retry.imap_retry(partial(resolver, fetch=fetch), items, self.retry, on_error, max_workers=max_workers)
+        if backend == "async":
+            # Single event loop, max_workers = requests in flight
+            records = fetcher.iter_async(self.jobs(items), on_response, on_error, concurrency=max_workers,
+                                         ttl=self.cache_ttl, retry=self.retry)
+        else:
+            # Fixed-size worker pool; retries wait on a delay heap, not in a worker
+            records = retry.imap_retry(fetch, items, self.retry, on_error, max_workers=max_workers)
+        if parse_processes:
+            return iter_parsed(records, self.parse, processes=parse_processes, on_error=on_error, policy=self.retry)
+        return records
+
+    def iter_results(self, user_input, max_workers=DEFAULT_WORKERS, backend="threads", parse_processes=0):
+        metrics.expect(self.count(user_input))
+        return self.iter_targets(self.targets(user_input), max_workers, backend, parse_processes)
+
+    def iter_dead_letters(self, max_workers=DEFAULT_WORKERS, backend="threads", parse_processes=0):
+        # Replay the targets that failed in earlier runs
+        items = retry.take(self.retry.name)
+        metrics.expect(len(items))
+        return self.iter_targets(items, max_workers, backend, parse_processes)
+
+    def aiter_results(self, user_input, max_workers=DEFAULT_WORKERS, **options):
+        # Async-iterator version for callers already running an event loop;
+        # options go to targets()
+        return fetcher.fetch_stream(self.jobs(self.targets(user_input, **options)), self.handle_response, self.handle_error,
+                                    concurrency=max_workers, timeout=self.timeout, ttl=self.cache_ttl, retry=self.retry)
+
+    def main(self, user_input, max_workers=DEFAULT_WORKERS, backend="threads", parse_processes=0):
+        results = list(self.iter_results(user_input, max_workers, backend, parse_processes))
+        print(http_cache.stats_line())
+        return results
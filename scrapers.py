@@ -0,0 +1,129 @@
+import importlib
+import sys
+
+# The scrapers and how to drive them, shared by the GUI (main_gui) and the
+# headless front end (cli). Nothing here imports a scraper module until it
+# is asked for, so looking entries up stays cheap.
+#
+#   command     - short name used on the command line
+#   module      - the scraper module (iter_results, FIELDS, TYPES, ...)
+#   validation  - input shape check
+#   list_input  - input is a comma-separated list, so several inputs can
+#                 be joined into one run (ASN input is a single range)
+#
+# More scrapers plug in as scraper_base.Scraper subclasses (or instances),
+# either by calling register() or, from another installed package, through
+# an entry point in the ENTRY_POINT_GROUP group:
+#
+#   [project.entry-points."parallel_web_crawler.scrapers"]
+#   example = "example_pkg.scraper:Example"
+#
+# Entry points are only looked at when a name is not one of the built-in
+# scrapers, or when the full list is needed (the GUI dropdown, cli --help).
+
+SCRAPER_MAP = {
+    "IP Data": {
+        "command": "ip",
+        "module": "scrape_ip_data",
+        "prompt": "Enter IPs, ranges or CIDR blocks (comma-separated):",
+        "example": "e.g., 192.168.172, 1.1.1.0/24, 10.0.0.1-10.0.0.50, 2606:4700::/120",
+        # Rough shape check only; ip_targets reports the exact problem
+        "validation": r"^[0-9A-Fa-f:.]+(?:/[0-9]{1,3}|\s*-\s*[0-9A-Fa-f:.]+)?(?:\s*,\s*[0-9A-Fa-f:.]+(?:/[0-9]{1,3}|\s*-\s*[0-9A-Fa-f:.]+)?)*$",
+        "list_input": True,
+        "csv_filename": "results_ip_data.csv"
+    },
+    "Weather Data": {
+        "command": "weather",
+        "module": "scrape_weatherdata",
+        "prompt": "Enter cities (comma-separated):",
+        "example": "e.g., pakistan/lahore, usa/new-york",
+        "validation": r"^([a-zA-Z\-]+\/[a-zA-Z\-]+)(\s*,\s*[a-zA-Z\-]+\/[a-zA-Z\-]+)*$",
+        "list_input": True,
+        "csv_filename": "results_weather_data.csv"
+    },
+    "Stock Price": {
+        "command": "stock",
+        "module": "scrape_stock_price",
+        "prompt": "Enter stock symbols (comma-separated):",
+        "example": "e.g., AAPL, MSFT, GOOGL",
+        "validation": r"^[A-Z]+(?:,\s*[A-Z]+)*$",
+        "list_input": True,
+        "csv_filename": "results_stock_price.csv"
+    },
+    "ASN Data": {
+        "command": "asn",
+        "module": "scrape_asn_data",
+        "prompt": "Enter ASN Numbers range",
+        "example": "e.g., 1570-1579",
+        "validation": r"^[0-9]+-[0-9]+$",
+        "list_input": False,
+        "csv_filename": "results_asn_data.csv"
+    }
+}
+
+COMMANDS = {entry["command"]: name for name, entry in SCRAPER_MAP.items()}
+
+ENTRY_POINT_GROUP = "parallel_web_crawler.scrapers"
+
+_plugins = {}          # command -> registered Scraper instance
+_discovered = False
+
+
+def register(scraper):
+    # Add a scraper_base.Scraper subclass or instance; returns the instance
+    if isinstance(scraper, type):
+        scraper = scraper()
+    command = scraper.command or scraper.name
+    title = scraper.title or command
+    if title in SCRAPER_MAP or command in COMMANDS:
+        raise ValueError(f"Scraper '{title}' ({command}) is already registered")
+    SCRAPER_MAP[title] = {
+        "command": command,
+        "prompt": scraper.prompt,
+        "example": scraper.example,
+        "validation": scraper.validation,
+        "list_input": scraper.list_input,
+        "csv_filename": scraper.csv_filename or f"results_{command}.csv"
+    }
+    COMMANDS[command] = title
+    _plugins[command] = scraper
+    return scraper
+
+
+def discover():
+    # Register the scrapers other packages expose as entry points (once)
+    global _discovered
+    if _discovered:
+        return
+    _discovered = True
+    from importlib.metadata import entry_points
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            register(entry_point.load())
+        except Exception as e:
+            print(f"Skipping scraper plugin '{entry_point.name}': {e}", file=sys.stderr)
+
+
+def names():
+    # Display names of every scraper, plugins included
+    discover()
+    return list(SCRAPER_MAP)
+
+
+def get(name):
+    # Entry by display name ("IP Data") or command ("ip")
+    if COMMANDS.get(name, name) not in SCRAPER_MAP:
+        discover()
+    name = COMMANDS.get(name, name)
+    if name not in SCRAPER_MAP:
+        raise ValueError(f"Unknown scraper '{name}' (use one of {', '.join(COMMANDS)})")
+    return SCRAPER_MAP[name]
+
+
+def load(name):
+    # The scraper's module, or the registered Scraper for plugins; either
+    # way it has iter_results, iter_dead_letters, FIELDS and TYPES
+    entry = get(name)
+    if "module" not in entry:
+        return _plugins[entry["command"]]
+    return importlib.import_module(entry["module"])
@@ -0,0 +1,314 @@
+import csv
+import json
+import os
+import time
+
+import metrics
+
+# Output sinks. Each one takes records one at a time (write) and keeps
+# only the open file handle and a small buffer, so a sweep can be written
+# out while it runs instead of after the whole result list has been
+# collected. Records are buffered and written batch_size at a time.
+#
+# Every sink writes a fixed list of fields (the scraper's FIELDS): every
+# row has the same columns in the same order, missing values are left
+# empty and fields outside the schema are dropped with a warning. Without
+# fields the first record's keys become the schema. `types` maps field ->
+# python type (str, int, float, bool, see records); only the typed formats
+# (Parquet / Arrow) use it, the text formats write values as they are.
+#
+# The appending sinks (CSV, JSON Lines) can also be resumed: checkpoint()
+# flushes and returns the file size, and open_sink(filename, offset) cuts
+# the file back to a size saved earlier (see checkpoint).
+#
+# Each batch written is timed into metrics ("write"). The appending sinks
+# hand every batch to the OS as it is written, so the rows can be read back
+# while the sink is still open: CsvPages does that for the GUI, which keeps
+# only the newest records in memory.
+#
+# .parquet and .arrow need pyarrow (optional; only imported when used).
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class _Sink:
+    def __init__(self, filename, fields=None, batch_size=DEFAULT_BATCH_SIZE, types=None):
+        self.filename = filename
+        self.fields = list(fields) if fields else None
+        self.types = types or {}
+        self.batch_size = batch_size
+        self.buffer = []
+        self.count = 0
+        self.warned = False
+
+    def _row(self, record):
+        # record values in schema order
+        if self.fields is None:
+            self._start(list(record.keys()))
+        if not self.warned:
+            extra = [key for key in record if key not in self.fields]
+            if extra:
+                print(f"[WARN] {self.filename}: dropping fields not in the schema: {', '.join(extra)}")
+                self.warned = True
+        return [record.get(field) for field in self.fields]
+
+    def _start(self, fields):
+        self.fields = fields
+
+    def write(self, record):
+        self.buffer.append(self._row(record))
+        self.count += 1
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            with metrics.timer("write", rows=len(self.buffer)):
+                self._write_rows(self.buffer)
+            self.buffer = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _AppendingSink(_Sink):
+    def flush(self):
+        super().flush()
+        if self.file is not None:
+            self.file.flush()
+
+    def checkpoint(self):
+        self.flush()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return os.fstat(self.file.fileno()).st_size
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+
+class CsvSink(_AppendingSink):
+    # Appends rows; the header is written once per file. An existing file
+    # with other columns is moved aside instead of getting misaligned rows.
+    def __init__(self, filename, fields=None, batch_size=DEFAULT_BATCH_SIZE, types=None):
+        super().__init__(filename, fields, batch_size, types)
+        self.header = None
+        if os.path.exists(filename) and os.path.getsize(filename) > 0:
+            with open(filename, newline="", encoding="utf-8") as f:
+                self.header = next(csv.reader(f), None)
+        self.file = None
+        if self.fields:
+            self._start(self.fields)
+
+    def _start(self, fields):
+        self.fields = fields
+        if self.header is not None and self.header != fields:
+            moved = f"{os.path.splitext(self.filename)[0]}.{time.strftime('%Y%m%d-%H%M%S')}.csv"
+            os.replace(self.filename, moved)
+            print(f"[WARN] {self.filename} has different columns, moved it to {moved}")
+            self.header = None
+        self.file = open(self.filename, "a", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        if self.header is None:
+            self.writer.writerow(fields)
+
+    def _write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def checkpoint(self):
+        if self.file is None:
+            return os.path.getsize(self.filename) if os.path.exists(self.filename) else 0
+        return super().checkpoint()
+
+    def close(self):
+        if self.file is not None:
+            super().close()
+
+
+class JsonLinesSink(_AppendingSink):
+    # One JSON object per line, appended
+    def __init__(self, filename, fields=None, batch_size=DEFAULT_BATCH_SIZE, types=None):
+        super().__init__(filename, fields, batch_size, types)
+        self.file = open(filename, "a", encoding="utf-8")
+
+    def _write_rows(self, rows):
+        self.file.write("".join(json.dumps(dict(zip(self.fields, row)), ensure_ascii=False) + "\n" for row in rows))
+
+
+class JsonSink(_Sink):
+    # A single JSON array, written element by element (overwrites the file,
+    # so it cannot be resumed)
+    def __init__(self, filename, fields=None, batch_size=DEFAULT_BATCH_SIZE, types=None, indent=4):
+        super().__init__(filename, fields, batch_size, types)
+        self.indent = indent
+        self.written = 0
+        self.file = open(filename, "w", encoding="utf-8")
+
+    def _write_rows(self, rows):
+        for row in rows:
+            self.file.write(json_chunk(dict(zip(self.fields, row)), self.written == 0, self.indent))
+            self.written += 1
+
+    def close(self):
+        super().close()
+        self.file.write(json_end(self.written == 0))
+        self.file.close()
+
+
+class _ArrowSink(_Sink):
+    # Column batches for pyarrow, typed from `types`; anything not listed
+    # is a string column. These files are rewritten per run, not appended to.
+    def __init__(self, filename, fields=None, batch_size=10000, types=None):
+        try:
+            import pyarrow
+        except ImportError:
+            raise ValueError(f"writing {os.path.splitext(filename)[1]} files needs pyarrow (pip install pyarrow)")
+        super().__init__(filename, fields, batch_size, types)
+        self.pa = pyarrow
+        self.writer = None
+
+    def _schema(self):
+        pa = self.pa
+        kinds = {str: pa.string(), int: pa.int64(), float: pa.float64(), bool: pa.bool_()}
+        return pa.schema([(field, kinds.get(self.types.get(field, str), pa.string())) for field in self.fields])
+
+    def _column(self, values, kind, arrow_type):
+        if kind is str:
+            values = [None if value is None else str(value) for value in values]
+        else:
+            values = [None if value is None or value == "" else value for value in values]
+        return self.pa.array(values, type=arrow_type)
+
+    def _write_rows(self, rows):
+        schema = self._schema()
+        arrays = [self._column(column, self.types.get(field, str), schema.field(field).type)
+                  for field, column in zip(self.fields, zip(*rows))]
+        batch = self.pa.RecordBatch.from_arrays(arrays, schema=schema)
+        if self.writer is None:
+            self.writer = self._open(schema)
+        self.writer.write_batch(batch)
+
+    def close(self):
+        super().close()
+        if self.writer is None and self.fields:
+            self.writer = self._open(self._schema())  # empty file with the schema
+        if self.writer is not None:
+            self.writer.close()
+
+
+class ParquetSink(_ArrowSink):
+    def _open(self, schema):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(self.filename, schema, compression="zstd")
+
+
+class ArrowSink(_ArrowSink):
+    # Arrow IPC file (a.k.a. Feather v2)
+    def _open(self, schema):
+        return self.pa.ipc.new_file(self.filename, schema)
+
+
+class CsvPages:
+    # Read-back of the rows a CsvSink appended after `offset` (a checkpoint()
+    # taken when it started), page_size rows at a time. The byte offset of
+    # every page reached so far is remembered, so turning to a page reads
+    # only that page (and, the first time, the pages before it). Values come
+    # back typed through `types`, like the records that were written.
+    def __init__(self, filename, offset, fields, types=None, page_size=50):
+        self.filename = filename
+        self.fields = list(fields)
+        self.types = types or {}
+        self.page_size = page_size
+        self.starts = [offset]
+
+    def page(self, n):
+        # Rows of page n as dicts; fewer (or none) past the end of the file
+        with open(self.filename, "rb") as f:
+            while len(self.starts) <= n:
+                f.seek(self.starts[-1])
+                if len(_read_rows(f, self.page_size)) < self.page_size:
+                    return []
+                self.starts.append(f.tell())
+            f.seek(self.starts[n])
+            return self._decode(_read_rows(f, self.page_size))
+
+    def __iter__(self):
+        n = 0
+        while True:
+            rows = self.page(n)
+            yield from rows
+            if len(rows) < self.page_size:
+                return
+            n += 1
+
+    def _decode(self, lines):
+        rows = csv.reader(line.decode("utf-8") for line in lines)
+        return [{field: _parse(value, self.types.get(field)) for field, value in zip(self.fields, row)} for row in rows]
+
+
+def _read_rows(f, count):
+    # Up to count whole CSV rows (bytes) from f. A row ends at a newline
+    # outside quotes; a row still being written (no newline yet) is left out.
+    rows = []
+    while len(rows) < count:
+        start = f.tell()
+        line = f.readline()
+        while line.count(b'"') % 2 and line.endswith(b"\n"):
+            line += f.readline()
+        if not line.endswith(b"\n"):
+            f.seek(start)
+            break
+        rows.append(line)
+    return rows
+
+
+def _parse(value, kind):
+    # CSV text -> the value a record had (empty is None)
+    if value == "":
+        return None
+    if kind is None or kind is str:
+        return value
+    if kind is bool:
+        return value == "True"
+    try:
+        return kind(value)
+    except ValueError:
+        return value
+
+
+def json_chunk(record, first, indent=4):
+    # Text for one element of a JSON array. Concatenating the chunks and
+    # json_end() gives exactly json.dumps(records, indent=indent).
+    body = json.dumps(record, indent=indent)
+    pad = " " * indent
+    body = "\n".join(pad + line for line in body.split("\n"))
+    return ("[\n" if first else ",\n") + body
+
+
+def json_end(empty):
+    return "[]" if empty else "\n]"
+
+
+SINKS = {".csv": CsvSink, ".jsonl": JsonLinesSink, ".json": JsonSink,
+         ".parquet": ParquetSink, ".arrow": ArrowSink, ".feather": ArrowSink}
+
+
+def open_sink(filename, offset=None, fields=None, **kwargs):
+    # Pick the sink from the file extension. With an offset, resume an
+    # appending sink: anything after offset bytes is dropped first.
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in SINKS:
+        raise ValueError(f"Unsupported output format '{ext}' (use {', '.join(SINKS)})")
+    if offset is not None:
+        if not hasattr(SINKS[ext], "checkpoint"):
+            raise ValueError(f"'{ext}' output cannot be resumed (use .csv or .jsonl)")
+        with open(filename, "ab") as f:
+            f.truncate(offset)
+    return SINKS[ext](filename, fields, **kwargs)
@@ -0,0 +1,68 @@
+import http.server
+import os
+import sys
+import threading
+
+import pytest
+
+# The modules live at the top of the repo; the tests import them directly.
+# Every on-disk cache is off unless a test turns it on (in its tmp_path), so
+# a test run never reads or writes the caches next to the scrapers.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+for variable in ("SCRAPER_CACHE", "SCRAPER_RECORD_CACHE", "SCRAPER_DEAD_LETTERS"):
+    os.environ[variable] = "off"
+
+
+class Site:
+    # A local web site for the fetch tests: pages[path] = (status, body,
+    # headers); every request is logged as (path, request headers). A 304 is
+    # sent when If-None-Match matches the page's ETag.
+    def __init__(self):
+        self.pages = {}
+        self.requests = []
+        site = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.requests.append((self.path, dict(self.headers)))
+                status, body, headers = site.pages.get(self.path, (404, b"not found", {}))
+                if status == 200 and headers.get("ETag") and self.headers.get("If-None-Match") == headers["ETag"]:
+                    status, body = 304, b""
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def page(self, path, body, status=200, **headers):
+        self.pages[path] = (status, body.encode() if isinstance(body, str) else body, headers)
+
+    def hits(self, path):
+        return sum(1 for requested, _ in self.requests if requested == path)
+
+
+@pytest.fixture
+def site():
+    site = Site()
+    yield site
+    site.server.shutdown()
+    site.server.server_close()
+
+
+@pytest.fixture
+def response_cache(tmp_path):
+    import http_cache
+    cache = http_cache.configure(str(tmp_path / "http_cache.sqlite"))
+    yield cache
+    http_cache.configure(None)
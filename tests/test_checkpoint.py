@@ -0,0 +1,86 @@
+import csv
+import os
+from urllib.parse import urlsplit
+
+import pytest
+
+import checkpoint
+import fetcher
+import parsers
+import rate_limiter
+import scrape_asn_data
+import sinks
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "fixtures")
+
+
+def test_journal_round_trip(tmp_path):
+    journal = checkpoint.Journal("job", 100, 120, directory=str(tmp_path))
+    assert not journal.resumed
+    for n in (100, 101, 105, 120):
+        journal.mark(n)
+    journal.mark(105)
+    journal.save(1234)
+
+    again = checkpoint.Journal("job", 100, 120, directory=str(tmp_path))
+    assert again.resumed
+    assert (again.offset, again.done) == (1234, 4)
+    assert list(again.pending()) == [n for n in range(100, 121) if n not in (100, 101, 105, 120)]
+
+
+def test_journal_refuses_another_range_or_a_broken_file(tmp_path):
+    checkpoint.Journal("job", 0, 99, directory=str(tmp_path)).save(0)
+    with pytest.raises(ValueError):
+        checkpoint.Journal("job", 0, 100, directory=str(tmp_path))
+    with open(tmp_path / "job.ckpt", "r+b") as f:
+        f.write(b"garbage!")
+    with pytest.raises(ValueError):
+        checkpoint.Journal("job", 0, 99, directory=str(tmp_path))
+    with pytest.raises(ValueError):
+        checkpoint.Journal("empty", 5, 4, directory=str(tmp_path))
+
+
+def test_pending_skips_whole_finished_bytes(tmp_path):
+    journal = checkpoint.Journal("job", 0, 20_000, directory=str(tmp_path))
+    for n in range(20_000):
+        journal.mark(n)
+    assert list(journal.pending()) == [20_000]
+
+
+def test_an_interrupted_sweep_resumes_where_it_stopped(tmp_path, site, monkeypatch):
+    with open(os.path.join(FIXTURES, "ipinfo_asn.html"), "rb") as f:
+        page = f.read()
+    for n in range(1, 41):
+        site.page(f"/AS{n}", page)
+    site.page("/AS13", "", status=404)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(parsers, "_backend", "stream")  # bs4 would make this slow
+    fetcher.route(lambda url: site.url + urlsplit(url).path)
+    rate_limiter.configure(enabled=False)
+    write = sinks.CsvSink.write
+    try:
+        # Ctrl-C after 15 records: what was written so far is checkpointed
+        writes = []
+
+        def interrupted(self, record):
+            if len(writes) == 15:
+                raise KeyboardInterrupt
+            writes.append(record)
+            write(self, record)
+
+        monkeypatch.setattr(sinks.CsvSink, "write", interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            scrape_asn_data.sweep("1-40", "asn-job", "out.csv", max_workers=4)
+        monkeypatch.setattr(sinks.CsvSink, "write", write)
+        # a row that made it to the file after the last checkpoint is dropped
+        with open("out.csv", "a", encoding="utf-8") as f:
+            f.write("999,half a row\n")
+        written = scrape_asn_data.sweep("1-40", "asn-job", "out.csv", max_workers=4)
+    finally:
+        fetcher.route(None)
+        rate_limiter.configure(enabled=True)
+    with open("out.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(int(row["asn"]) for row in rows) == [n for n in range(1, 41) if n != 13]
+    # the resumed run only wrote what the first one had not finished
+    assert written == 40 - 15 - 1
@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+from urllib.parse import urlsplit
+
+import pytest
+
+import cli
+import fetcher
+import rate_limiter
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "fixtures")
+
+
+@pytest.fixture
+def weather_site(site):
+    with open(os.path.join(FIXTURES, "weather.html"), encoding="utf-8") as f:
+        site.page("/weather/uk/london", f.read())
+    fetcher.route(lambda url: site.url + urlsplit(url).path)
+    yield site
+    fetcher.route(None)
+    rate_limiter.configure(enabled=True)
+
+
+def test_the_cli_never_imports_the_gui():
+    # Nor a scraper module, until one is run
+    code = ("import sys, cli; cli.build_parser().parse_args(['ip', '1.1.1.1']); "
+            "print(sorted({'tkinter', 'customtkinter', 'PIL', 'scrape_ip_data', 'bs4'} & set(sys.modules)))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(cli.__file__)),
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_read_inputs_from_arguments_files_and_stdin(tmp_path, monkeypatch):
+    listing = tmp_path / "symbols.txt"
+    listing.write_text("AAPL\n\n# a comment\nMSFT  # trailing\n", encoding="utf-8")
+    monkeypatch.setattr(sys, "stdin", io.StringIO("GOOGL\n"))
+    assert cli.read_inputs([" TSLA ", ""], [str(listing), "-"]) == ["TSLA", "AAPL", "MSFT", "GOOGL"]
+
+
+def test_inputs_are_validated_and_lists_joined():
+    assert cli.prepare_inputs("stock", ["AAPL", "MSFT"]) == ["AAPL, MSFT"]
+    assert cli.prepare_inputs("Stock Price", "AAPL") == ["AAPL"]
+    assert cli.prepare_inputs("asn", ["1-2", "5-9"]) == ["1-2", "5-9"]
+    with pytest.raises(ValueError, match="Invalid asn input"):
+        cli.prepare_inputs("asn", ["AS1-AS2"])
+    with pytest.raises(ValueError, match="Unknown scraper"):
+        cli.prepare_inputs("nope", ["x"])
+    with pytest.raises(ValueError):
+        cli._shard("4/4")
+
+
+def test_records_go_to_stdout_and_chatter_to_stderr(weather_site, capsys):
+    assert cli.main(["weather", "uk/london", "--no-rate-limit", "--format", "csv"]) == 0
+    out, err = capsys.readouterr()
+    rows = list(csv.DictReader(io.StringIO(out)))
+    assert [(row["city"], row["temperature_c"]) for row in rows] == [("uk/london", "36.0")]
+    assert "uk/london" in err
+
+
+def test_quiet_output_to_a_file(weather_site, tmp_path, capsys):
+    output = str(tmp_path / "weather.jsonl")
+    assert cli.main(["weather", "uk/london", "-o", output, "-q", "--no-rate-limit"]) == 0
+    assert capsys.readouterr() == ("", "")
+    with open(output, encoding="utf-8") as f:
+        assert [json.loads(line)["temperature_c"] for line in f] == [36.0]
+
+
+def test_bad_usage_is_reported_not_raised(capsys):
+    assert cli.main(["asn", "not-a-range"]) == 1
+    assert cli.main(["weather"]) == 1
+    assert cli.main(["asn", "1-2", "--job", "sweep"]) == 1
+    err = capsys.readouterr().err
+    assert "Invalid asn input" in err and "no input" in err and "--job needs -o FILE" in err
+    with pytest.raises(SystemExit):
+        cli.main(["weather", "--mode", "batch"])
@@ -0,0 +1,125 @@
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+import pytest
+
+import distributed
+import fetcher
+import parsers
+import rate_limiter
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "fixtures")
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = distributed.WorkQueue(str(tmp_path / "sweep.sqlite"), lease_seconds=30)
+    yield queue
+    queue.close()
+
+
+def published(queue, job_id):
+    return [record["n"] for record in queue.results(job_id)]
+
+
+def test_submit_cuts_units_and_resubmitting_resumes(queue):
+    assert queue.submit("job", "asn", "1-10", unit_size=4) == 3
+    assert [queue.lease("w", "job")["input"] for _ in range(3)] == ["1-4", "5-8", "9-10"]
+    assert queue.lease("w", "job") is None
+    assert queue.submit("job", "asn", "1-10", unit_size=4) == 3
+    with pytest.raises(ValueError, match="was submitted as"):
+        queue.submit("job", "asn", "1-11", unit_size=4)
+    with pytest.raises(ValueError, match="no targets"):
+        queue.submit("empty", "asn", "5-1")
+    assert queue.status("job")[0]["targets"] == 10
+
+
+def test_an_expired_lease_is_fenced_off(queue):
+    queue.lease_seconds = 0.05
+    queue.submit("job", "asn", "1-4", unit_size=4)
+    first = queue.lease("crashed", "job")
+    assert queue.push("job", 0, first["token"], [{"n": 1}])
+    assert queue.lease("other", "job") is None  # still held
+    time.sleep(0.1)
+    second = queue.lease("other", "job")
+    assert (second["unit"], second["token"]) == (0, first["token"] + 1)
+    # the first holder wakes up: nothing it sends is taken
+    assert not queue.renew("job", 0, first["token"])
+    assert not queue.push("job", 0, first["token"], [{"n": 2}], 1)
+    assert not queue.complete("job", 0, first["token"], [{"n": 3}], 2)
+    assert queue.complete("job", 0, second["token"], [{"n": 10}, {"n": 11}])
+    assert published(queue, "job") == [10, 11]
+    assert queue.finished("job")
+
+
+def test_records_are_published_exactly_once(queue):
+    queue.submit("job", "asn", "1-4", unit_size=4)
+    unit = queue.lease("w", "job")
+    key = ("job", 0, unit["token"])
+    assert queue.push(*key, [{"n": 0}, {"n": 1}])
+    assert queue.push(*key, [{"n": 0}, {"n": 1}])  # a retried upload
+    assert queue.push(*key, [{"n": 2}], 2)
+    assert published(queue, "job") == []  # staged, not published
+    assert queue.complete(*key, [{"n": 3}], 3)
+    assert queue.complete(*key, [{"n": 3}], 3)  # a retried completion
+    assert published(queue, "job") == [0, 1, 2, 3]
+    assert queue.status("job")[0]["records"] == 4
+    assert not queue.release(*key, "too late")
+
+
+def test_failing_units_are_retried_then_given_up(queue):
+    queue.max_attempts = 2
+    queue.submit("job", "asn", "1-4", unit_size=4)
+    for attempt in (1, 2):
+        unit = queue.lease("w", "job")
+        assert unit["token"] == attempt
+        queue.push("job", 0, unit["token"], [{"n": attempt}])
+        assert queue.release("job", 0, unit["token"], f"boom {attempt}")
+    assert queue.lease("w", "job") is None
+    status = queue.status("job")[0]
+    assert status["units"] == {"failed": 1}
+    assert status["failed"] == [{"unit": 0, "input": "1-4", "error": "boom 2"}]
+    assert queue.finished("job") and published(queue, "job") == []
+
+
+def test_remote_workers_need_the_token(queue):
+    queue.submit("job", "asn", "1-4", unit_size=4)
+    server = distributed.serve(queue, port=0, token="secret")
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        with pytest.raises(ValueError, match="403"):
+            distributed.RemoteQueue(url, "wrong").lease("w")
+        remote = distributed.connect(url, "secret")
+        unit = remote.lease("w", "job")
+        assert remote.complete("job", unit["unit"], unit["token"], [{"n": 1}])
+        assert remote.finished("job") and remote.status("job")[0]["records"] == 1
+        remote.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert published(queue, "job") == [1]
+
+
+def test_workers_finish_a_sweep_a_crashed_worker_left(queue, site, tmp_path, monkeypatch):
+    with open(os.path.join(FIXTURES, "ipinfo_asn.html"), "rb") as f:
+        page = f.read()
+    for asn in range(1, 7):
+        site.page(f"/AS{asn}", page)
+    monkeypatch.setattr(parsers, "_backend", "stream")
+    rate_limiter.configure(enabled=False)
+    fetcher.route(lambda url: site.url + urlsplit(url).path)
+    queue.lease_seconds = 0.3
+    try:
+        queue.submit("asn", "asn", "1-6", unit_size=2)
+        queue.lease("crashed", "asn")  # never heard from again
+        assert distributed.work(queue, "asn", "a", max_workers=2, poll=0.05) == 3
+    finally:
+        fetcher.route(None)
+        rate_limiter.configure(enabled=True)
+    output = str(tmp_path / "asn.jsonl")
+    assert queue.export("asn", output) == 6
+    with open(output, encoding="utf-8") as f:
+        assert sorted(json.loads(line)["asn"] for line in f) == [1, 2, 3, 4, 5, 6]
+    assert queue.status("asn")[0]["units"] == {"done": 3}
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+import requests
+
+import enrich
+import retry
+import scrape_asn_data
+from records import AsnRecord
+
+
+@pytest.fixture
+def dead_letters(tmp_path, monkeypatch):
+    monkeypatch.setattr(scrape_asn_data.RETRY, "base_delay", 0.0)
+    store = retry.configure(str(tmp_path / "dead_letters.sqlite"))
+    yield store
+    retry.configure(None)
+
+
+def lookups(monkeypatch, answers):
+    # handle_single_asn replaced by answers[asn]: a list of results / exceptions
+    asked = []
+
+    def fetch(asn):
+        asked.append(asn)
+        answer = answers[asn].pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    monkeypatch.setattr(scrape_asn_data, "handle_single_asn", fetch)
+    return asked
+
+
+def test_transient_failures_are_retried(monkeypatch, dead_letters):
+    asked = lookups(monkeypatch, {"64500": [requests.ConnectionError("reset"), AsnRecord(64500, country="NL")]})
+    records = list(enrich.join_asn([{"ip": "10.0.0.1", "asn": 64500}, {"ip": "10.0.0.2", "asn": 64500}]))
+    assert [record["asn_country"] for record in records] == ["NL", "NL"]
+    assert asked == ["64500", "64500"]
+    assert dead_letters.count() == 0
+
+
+def test_failed_lookups_are_dead_lettered_and_not_cached(monkeypatch, dead_letters):
+    attempts = scrape_asn_data.RETRY.max_attempts
+    asked = lookups(monkeypatch, {"64500": [requests.Timeout("slow")] * attempts + [AsnRecord(64500, country="NL")]})
+    index = enrich.AsnIndex()
+    first = list(enrich.join_asn([{"ip": "10.0.0.1", "asn": 64500}], index))
+    assert first == [{"ip": "10.0.0.1", "asn": 64500}]
+    assert 64500 not in index
+    assert [target for _, target, *_ in dead_letters.entries("asn")] == ["64500"]
+    # the failure is not remembered: the next sweep asks again
+    again = list(enrich.join_asn([{"ip": "10.0.0.2", "asn": 64500}], index))
+    assert again[0]["asn_country"] == "NL"
+    assert len(asked) == attempts + 1
+
+
+def test_a_dead_asn_is_looked_up_once_per_join(monkeypatch, dead_letters):
+    attempts = scrape_asn_data.RETRY.max_attempts
+    asked = lookups(monkeypatch, {"64500": [requests.Timeout("slow")] * attempts,
+                                  "64501": [AsnRecord(64501, country="DE")]})
+
+    def sweep():
+        # the lookup has long given up by the time most of these arrive
+        for n in range(200):
+            if n == 100:
+                while len(asked) < attempts:
+                    time.sleep(0.001)
+                time.sleep(0.05)
+            yield {"ip": f"10.0.0.{n}", "asn": 64500 if n % 2 else 64501}
+
+    records = list(enrich.join_asn(sweep(), max_workers=2))
+    assert len(records) == 200
+    assert sum("asn_country" in record for record in records) == 100
+    assert asked.count("64500") == attempts
+    assert asked.count("64501") == 1
+    assert dead_letters.count() == 1
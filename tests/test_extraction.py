@@ -0,0 +1,88 @@
+import pytest
+
+import extraction
+from extraction import First, Link, Rows, Selector, Spec, Text
+
+BACKENDS = {"bs4": "bs4", "strainer": "bs4", "lxml": "lxml", "selectolax": "selectolax", "stream": None}
+
+PAGE = b"""<html><head><meta charset="utf-8"></head><body>
+<p class="note">outside</p>
+<div id="quote" class="card main"><span data-field="price"> 12.5 </span>
+  <span data-field="change">+<b>0.5</b></span><br><img src="x.png">
+  <span class="muted">ignored</span></div>
+<table class="facts">
+  <tr><td>City</td><td> Caf\xc3\xa9 </td></tr>
+  <tr><td>ASN</td><td><a href="/AS13335">AS13335</a></td></tr>
+  <tr><td>only one cell</td></tr>
+  <tr><td>Note</td><td>plain</td></tr>
+</table>
+<ul id="links"><li><a href="/a">A</a></li><li>no link</li><li><a>bare</a></li></ul>
+</body></html>"""
+
+SPEC = Spec({
+    "price": Text(("div#quote", 'span[data-field="price"]')),
+    "raw": Text('span[data-field="price"]', "raw"),
+    "change": Text('span[data-field=change]', "strings", transform=float),
+    "two_classes": Text("div.main.card", "strings"),
+    "class_value": Text('div[class="card main"]', "strings"),
+    "missing": Text("div#nope", default=None),
+    "facts": Rows("table.facts", cells="td", count=2,
+                  columns=(Text((), "strings"), First(Link(), Text((), "strings")))),
+    "cities": Rows("table.facts", cells="td", count=2, columns=(Text(()), Text(())), stop=1,
+                   transform=lambda label, value: value),
+    "links": Rows("ul#links", row="li", columns=(Link(),)),
+    "no_table": Rows("table#nope", default="none"),
+}, finish=lambda result: {**result, "finished": True})
+
+EXPECTED = {
+    "price": "12.5",
+    "raw": " 12.5 ",
+    "change": 0.5,
+    "two_classes": "12.5+0.5ignored",
+    "class_value": "12.5+0.5ignored",
+    "missing": None,
+    "facts": [("City", "Café"), ("ASN", "AS13335 (/AS13335)"), ("Note", "plain")],
+    "cities": ["Café"],
+    "links": [("A (/a)",), ("bare",)],
+    "no_table": "none",
+    "finished": True,
+}
+
+
+@pytest.mark.parametrize("backend", list(extraction.BACKENDS))
+def test_every_backend_runs_a_spec_the_same_way(backend):
+    if BACKENDS[backend]:
+        pytest.importorskip(BACKENDS[backend])
+    assert extraction.compile(SPEC, backend)(PAGE) == EXPECTED
+
+
+def test_specs_are_compiled_once_per_backend():
+    assert extraction.compile(SPEC, "stream") is extraction.compile(SPEC, "stream")
+    assert extraction.compile(SPEC, "stream") is not extraction.compile(SPEC, "bs4")
+
+
+def test_the_stream_backend_stops_after_the_last_root():
+    collector = extraction._Collector([Selector("div#quote")])
+    with pytest.raises(extraction._StopParsing):
+        collector.feed(extraction.decode(PAGE))
+    # nothing after the div was built
+    assert [node.tag for node in collector.tree.children] == ["div"]
+
+
+def test_selectors_are_a_compound_subset():
+    selector = Selector('span.a.b[data-x="1"][hidden]#id')
+    assert (selector.tag, selector.classes) == ("span", ["a", "b"])
+    assert selector.attrs == {"data-x": "1", "hidden": None, "id": "id"}
+    assert selector.matches("span", {"class": "b a c", "data-x": "1", "hidden": None, "id": "id"})
+    assert not selector.matches("span", {"class": "a", "data-x": "1", "hidden": None, "id": "id"})
+    for unsupported in ("div > p", "div p", "a:hover"):
+        with pytest.raises(ValueError):
+            Selector(unsupported)
+    with pytest.raises(ValueError):
+        extraction.compile(Spec({"x": Text("p", mode="html")}), "stream")
+
+
+def test_decode_honours_the_meta_charset():
+    assert extraction.decode('<meta charset="latin-1">é'.encode("latin-1")).endswith("é")
+    assert extraction.decode(b'<meta charset="bogus">ok') == '<meta charset="bogus">ok'
+    assert extraction.decode("already text") == "already text"
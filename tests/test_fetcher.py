@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+
+import fetcher
+
+
+def test_fetch_stream_parses_off_the_event_loop(site):
+    # A slow on_response must not stall the loop: a ticker running next to
+    # the stream keeps ticking while the pages are "parsed"
+    for n in range(4):
+        site.page(f"/{n}", f"page {n}")
+    loop_threads = set()
+
+    def on_response(target, response):
+        loop_threads.add(threading.get_ident())
+        time.sleep(0.2)
+        return (target, response.text)
+
+    async def main():
+        gaps = []
+        stop = asyncio.Event()
+
+        async def ticker():
+            last = time.perf_counter()
+            while not stop.is_set():
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticking = asyncio.create_task(ticker())
+        jobs = ((n, f"{site.url}/{n}", None) for n in range(4))
+        results = [result async for result in fetcher.fetch_stream(jobs, on_response, concurrency=4, parse_threads=2)]
+        stop.set()
+        await ticking
+        return results, max(gaps), threading.get_ident()
+
+    results, worst_gap, loop_thread = asyncio.run(main())
+    assert sorted(results) == [(n, f"page {n}") for n in range(4)]
+    assert loop_thread not in loop_threads
+    assert worst_gap < 0.1
+
+
+def test_fetch_stream_retries_and_reports_errors(site):
+    import retry
+    site.page("/ok", "fine")
+    site.page("/broken", "", status=503)
+    policy = retry.RetryPolicy("test", max_attempts=2, base_delay=0.0)
+    errors = []
+    jobs = [("ok", f"{site.url}/ok", None), ("broken", f"{site.url}/broken", None)]
+    results = list(fetcher.iter_async(jobs, lambda target, response: response.text, lambda target, e: errors.append(target),
+                                      concurrency=2, retry=policy))
+    assert results == ["fine"]
+    assert errors == ["broken"]
+    assert site.hits("/broken") == 2
+
+
+def test_iter_async_keeps_a_bounded_number_in_flight(site):
+    site.page("/page", "x")
+    jobs_read = []
+
+    def jobs():
+        for n in range(1000):
+            jobs_read.append(n)
+            yield n, f"{site.url}/page", None
+
+    results = fetcher.iter_async(jobs(), lambda target, response: target, concurrency=4)
+    first = next(results)
+    results.close()
+    time.sleep(0.3)
+    assert first in jobs_read
+    assert len(jobs_read) < 100
+    assert site.hits("/page") < 100
+
+
+def test_sync_get_reuses_one_session(site):
+    site.page("/a", "a")
+    assert fetcher.get(f"{site.url}/a").text == "a"
+    session = fetcher.get_session()
+    assert fetcher.get(f"{site.url}/a").status_code == 200
+    assert fetcher.get_session() is session
@@ -0,0 +1,58 @@
+import time
+
+import fetcher
+import http_cache
+
+
+def test_fresh_copies_are_served_without_a_request(site, response_cache):
+    site.page("/p", "v1", ETag='"1"')
+    first = fetcher.get(f"{site.url}/p", ttl=60)
+    second = fetcher.get(f"{site.url}/p", ttl=60)
+    assert (first.text, second.text) == ("v1", "v1")
+    assert second.from_cache
+    assert site.hits("/p") == 1
+    assert response_cache.stats()["hits"] == 1
+
+
+def test_stale_copies_are_revalidated(site, response_cache):
+    site.page("/p", "v1", ETag='"1"')
+    fetcher.get(f"{site.url}/p", ttl=0.2)
+    time.sleep(0.3)
+    revalidated = fetcher.get(f"{site.url}/p", ttl=0.2)
+    assert revalidated.from_cache and revalidated.text == "v1"
+    assert site.requests[-1][1].get("If-None-Match") == '"1"'
+    # the 304 refreshed the entry: fresh again without asking
+    fetcher.get(f"{site.url}/p", ttl=0.2)
+    assert site.hits("/p") == 2
+    assert response_cache.stats()["revalidated"] == 1
+
+    site.page("/p", "v2", ETag='"2"')
+    time.sleep(0.3)
+    changed = fetcher.get(f"{site.url}/p", ttl=0.2)
+    assert changed.text == "v2" and not getattr(changed, "from_cache", False)
+    assert response_cache.get(f"{site.url}/p").etag == '"2"'
+
+
+def test_only_200s_are_stored_and_no_ttl_skips_the_cache(site, response_cache):
+    site.page("/gone", "", status=404)
+    site.page("/p", "v1")
+    fetcher.get(f"{site.url}/gone", ttl=60)
+    fetcher.get(f"{site.url}/gone", ttl=60)
+    fetcher.get(f"{site.url}/p")
+    assert site.hits("/gone") == 2
+    assert response_cache.get(f"{site.url}/gone") is None
+    assert response_cache.get(f"{site.url}/p") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = http_cache.HttpCache(str(tmp_path / "cache.sqlite"), max_bytes=3200)
+    try:
+        for name in ("a", "b", "c"):
+            cache.put(name, 200, {}, b"x" * 900)
+            time.sleep(0.01)
+        cache.get("a")  # a is now more recent than b
+        cache.put("d", 200, {}, b"x" * 900)
+        assert [url for url in "abcd" if cache.get(url)] == ["a", "c", "d"]
+        assert cache.total_bytes <= 3200
+    finally:
+        cache.close()
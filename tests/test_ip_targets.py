@@ -0,0 +1,86 @@
+import itertools
+import time
+
+import pytest
+
+import ip_targets
+from ip_targets import TargetSpace
+
+SPEC = "10.0.0.0/22, 10.0.8.5-10.0.8.9, 192.168.1, 2001:db8::/120, 10.0.0.7"
+
+
+def test_spec_forms():
+    space = TargetSpace("1.1.1.0/30, 8.8.8.8, 9.9.9.1-9.9.9.2, 192.168.172, ::1")
+    addresses = list(space.addresses())
+    assert addresses[:5] == ["1.1.1.1", "1.1.1.2", "8.8.8.8", "9.9.9.1", "9.9.9.2"]
+    assert addresses[5:] == [f"192.168.172.{n}" for n in range(1, 255)] + ["::1"]
+    assert len(space) == len(addresses)
+
+
+def test_overlaps_count_once_and_bad_specs_fail():
+    assert len(TargetSpace("10.0.0.1-10.0.0.10, 10.0.0.5-10.0.0.20, 10.0.0.21")) == 21
+    for bad in ("", "10.0.0.9-10.0.0.1", "10.0.0.1-::2", "not an ip"):
+        with pytest.raises(ValueError):
+            TargetSpace(bad)
+
+
+def test_index_is_the_inverse_of_address():
+    space = TargetSpace(SPEC)
+    for i in itertools.chain(range(0, len(space), 97), [len(space) - 1]):
+        assert space.index(space.address(i)) == i
+    with pytest.raises(ValueError):
+        space.index("10.0.8.10")
+
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 7])
+def test_shards_cover_the_space_exactly_once(shards):
+    space = TargetSpace(SPEC)
+    seen = []
+    for shard in range(shards):
+        mine = list(space.addresses(shard, shards))
+        assert len(mine) == space.shard_size(shard, shards)
+        assert all(space.in_shard(space.index(ip), shard, shards) for ip in mine)
+        seen += mine
+    assert sorted(seen, key=space.index) == list(space.addresses())
+    assert len(seen) == len(set(seen)) == len(space)
+
+
+def test_shards_hand_out_whole_blocks():
+    space = TargetSpace("10.0.0.0/16")
+    first = list(itertools.islice(space.addresses(1, 4), ip_targets.SHARD_BLOCK + 1))
+    indexes = [space.index(ip) for ip in first]
+    assert indexes[:ip_targets.SHARD_BLOCK] == list(range(ip_targets.SHARD_BLOCK, 2 * ip_targets.SHARD_BLOCK))
+    assert indexes[-1] == 5 * ip_targets.SHARD_BLOCK
+    with pytest.raises(ValueError):
+        next(space.addresses(4, 4))
+
+
+def test_spec_between_describes_a_slice():
+    space = TargetSpace(SPEC)
+    lo, hi = 1000, 1030
+    part = TargetSpace(space.spec_between(lo, hi))
+    assert list(part.addresses()) == [space.address(i) for i in range(lo, hi)]
+
+
+def test_a_slash_8_stays_lazy():
+    space = TargetSpace("10.0.0.0/8")
+    assert len(space) == 2 ** 24 - 2
+    assert space.address(len(space) - 1) == "10.255.255.254"
+    assert next(space.addresses(5, 8)) == space.address(5 * ip_targets.SHARD_BLOCK)
+
+
+def test_index_finds_addresses_between_and_around_segments():
+    space = TargetSpace("10.0.0.5, 10.0.0.7-10.0.0.9, ::5-::6, 0.0.0.1")
+    assert [space.index(ip) for ip in ("0.0.0.1", "10.0.0.5", "10.0.0.9", "::5", "::6")] == [0, 1, 4, 5, 6]
+    for outside in ("0.0.0.0", "10.0.0.6", "10.0.0.10", "::4", "::7", "::1.0.0.1"):
+        with pytest.raises(ValueError):
+            space.index(outside)
+
+
+def test_index_on_a_long_sparse_list_is_fast():
+    ips = [f"10.{n >> 8 & 255}.{n & 255}.{1 + n % 3}" for n in range(0, 40000, 2)]
+    space = TargetSpace(", ".join(ips))
+    assert len(space) == 20000
+    started = time.perf_counter()
+    assert sorted(space.index(ip) for ip in ips) == list(range(20000))
+    assert time.perf_counter() - started < 2
@@ -0,0 +1,52 @@
+import metrics
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_readers_do_not_skew_the_rate(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(metrics.time, "monotonic", clock)
+    m = metrics.Metrics()
+    m.expect(100)
+    for _ in range(40):  # 10 req/s for 4s, one target per request
+        clock.now += 0.1
+        m.request_started()
+        m.request_finished(0.05)
+        m.count("done")
+    marks = list(m.marks)
+    first = m.snapshot()
+    for _ in range(50):
+        assert m.snapshot()["req_per_sec"] == first["req_per_sec"]
+    assert list(m.marks) == marks
+    assert round(first["req_per_sec"], 6) == 10.0
+    assert round(first["eta"], 6) == 6.0
+
+
+def test_rate_covers_the_last_window(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(metrics.time, "monotonic", clock)
+    m = metrics.Metrics()
+    for step in range(200):  # 20s: 2 req/s, then 10 req/s for the last 10s
+        clock.now += 0.1
+        if step >= 100 or step % 5 == 0:
+            m.request_started()
+            m.request_finished(0.01)
+    assert 9.5 <= m.snapshot()["req_per_sec"] <= 10.5
+    clock.now += 60  # idle: the rate decays instead of freezing
+    assert m.snapshot()["req_per_sec"] < 2
+
+
+def test_stage_percentiles_and_totals():
+    m = metrics.Metrics()
+    for ms in range(1, 101):
+        m.observe("parse", ms / 1000)
+    s = m.snapshot()
+    assert (s["parse_p50"], s["parse_p95"], s["parse_count"]) == (0.051, 0.096, 100)
+    assert abs(s["parse_sum"] - 5.05) < 1e-9
+    assert 'crawler_stage_seconds{stage="parse",quantile="0.5"} 0.051' in m.prometheus(s)
@@ -0,0 +1,54 @@
+import os
+import threading
+
+import metrics
+import parse_pool
+import scrape_ip_data
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "fixtures")
+
+
+def ip_page():
+    with open(os.path.join(FIXTURES, "ipinfo_ip.html"), "rb") as f:
+        return f.read()
+
+
+def test_processes_parse_like_the_calling_thread():
+    content = ip_page()
+    raw = [(f"10.0.0.{n}", content) for n in range(6)] + [("10.0.0.99", b"<html>no tables</html>")]
+    metrics.reset()
+    for _ in raw:
+        metrics.finished(True)  # what the fetch stage reports for a page it got
+    failures = []
+    records = list(parse_pool.iter_parsed(iter(raw), scrape_ip_data.SCRAPER.parse, processes=2, batch_size=3,
+                                          on_error=lambda target, e: failures.append((target, e))))
+    expected = [scrape_ip_data.parse_ip(ip, content) for ip, content in raw[:6]]
+    assert sorted(records, key=lambda record: record.ip) == sorted(expected, key=lambda record: record.ip)
+    # the page without tables comes back as a failure, not a silent drop
+    assert [target for target, _ in failures] == ["10.0.0.99"]
+    assert isinstance(failures[0][1], parse_pool.ParseError)
+    snap = metrics.snapshot()
+    assert (snap["done"], snap["failed"]) == (6, 1)
+
+
+def test_workers_do_not_inherit_a_held_lock():
+    # A fetch thread holding the metrics lock when the pool starts must not
+    # leave the workers waiting on a copy of it
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with metrics._metrics.lock:
+            held.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait()
+    try:
+        records = parse_pool.iter_parsed(iter([("10.0.0.1", ip_page())]), scrape_ip_data.SCRAPER.parse, processes=1)
+        first = next(records)
+    finally:
+        release.set()
+        holder.join()
+    assert first.ip == "10.0.0.1"
+    assert list(records) == []
@@ -0,0 +1,54 @@
+import importlib.util
+import os
+
+import pytest
+
+import parsers
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "fixtures")
+LIBRARIES = {"lxml": "lxml", "selectolax": "selectolax"}
+
+PAGES = [
+    ("ipinfo_ip.html", lambda content, backend: parsers.extract_ipinfo(content, backend)),
+    ("ipinfo_asn.html", lambda content, backend: parsers.extract_ipinfo(content, backend)),
+    ("weather.html", lambda content, backend: parsers.extract_weather(content, backend)),
+    ("yahoo.html", lambda content, backend: parsers.extract_stock(content, "https://finance.yahoo.com/quote/AAPL", backend)),
+    ("marketwatch.html", lambda content, backend: parsers.extract_stock(content, "https://www.marketwatch.com/investing/stock/aapl", backend)),
+]
+
+
+def page(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture(params=[backend for backend in parsers.BACKENDS if backend != "bs4"])
+def backend(request):
+    if request.param in LIBRARIES:
+        pytest.importorskip(LIBRARIES[request.param])
+    return request.param
+
+
+@pytest.mark.parametrize("name, extract", PAGES, ids=[name for name, _ in PAGES])
+def test_every_backend_matches_bs4(name, extract, backend):
+    content = page(name)
+    expected = extract(content, "bs4")
+    assert expected  # the fixture really has the blocks
+    assert extract(content, backend) == expected
+    assert extract(content.decode("utf-8"), backend) == expected
+
+
+@pytest.mark.parametrize("backend_name", parsers.BACKENDS)
+def test_missing_blocks(backend_name):
+    if backend_name in LIBRARIES and importlib.util.find_spec(LIBRARIES[backend_name]) is None:
+        pytest.skip(f"{backend_name} is not installed")
+    empty = b"<html><body><p>nothing here</p></body></html>"
+    assert parsers.extract_ipinfo(empty, backend_name) == parsers.extract_ipinfo(empty, "bs4")
+    assert parsers.extract_ipinfo(empty, backend_name)[0] is None
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        parsers.set_backend("regex")
+    with pytest.raises(ValueError):
+        parsers.extract(parsers.IPINFO, b"", "regex")
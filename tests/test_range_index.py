@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+import range_index
+from records import IpRecord
+
+
+def record(ip, network="10.0.0.0/24", **fields):
+    return IpRecord(ip=ip, city="Springfield", asn=64500, range=network, company="Example", **fields)
+
+
+def test_index_lookup_and_overlap():
+    index = range_index.RangeIndex()
+    assert index.add(10, 19, "a")
+    assert index.add(30, 39, "b")
+    assert not index.add(15, 25, "c")
+    assert (index.find(10), index.find(19), index.find(20), index.find(35)) == ("a", "a", None, "b")
+
+
+def test_ips_in_a_learned_range_are_not_fetched():
+    resolver = range_index.RangeResolver(hostnames=False)
+    fetched = []
+
+    def fetch(ip):
+        fetched.append(ip)
+        return record(ip, hostname="host")
+
+    first = resolver.resolve("10.0.0.1", fetch)
+    second = resolver.resolve("10.0.0.2", fetch)
+    assert fetched == ["10.0.0.1"]
+    assert (second.ip, second.company, second.hostname) == ("10.0.0.2", "Example", None)
+    assert first.hostname == "host"
+
+
+def test_a_failed_probe_does_not_serialize_its_block():
+    # The first probe teaches nothing; every later IP of the /24 must then
+    # be fetched in parallel, not one at a time behind the probe
+    resolver = range_index.RangeResolver(hostnames=False)
+    probing = threading.Event()
+    release = threading.Event()
+    together = threading.Barrier(4, timeout=5)
+
+    def fetch(ip):
+        if ip == "10.0.0.1":
+            probing.set()
+            release.wait(5)
+            raise OSError("probe failed")
+        together.wait()
+        return None
+
+    def probe():
+        with pytest.raises(OSError):
+            resolver.resolve("10.0.0.1", fetch)
+
+    threads = [threading.Thread(target=probe)]
+    threads[0].start()
+    probing.wait(5)
+    results = []
+    for n in range(2, 6):
+        thread = threading.Thread(target=lambda ip=f"10.0.0.{n}": results.append(resolver.resolve(ip, fetch)))
+        thread.start()
+        threads.append(thread)
+    release.set()
+    for thread in threads:
+        thread.join(10)
+    assert not together.broken
+    assert results == [None] * 4
+
+
+def test_a_wide_range_is_only_trusted_for_its_own_block():
+    resolver = range_index.RangeResolver(hostnames=False)
+    fetched = []
+
+    def fetch(ip):
+        fetched.append(ip)
+        return record(ip, network="10.0.0.0/16", hosted_domains=3)
+
+    resolver.resolve("10.0.1.1", fetch)
+    filled = resolver.resolve("10.0.1.200", fetch)
+    resolver.resolve("10.0.2.1", fetch)
+    assert fetched == ["10.0.1.1", "10.0.2.1"]
+    assert (filled.asn, filled.range, filled.city) == (64500, "10.0.0.0/16", "Springfield")
+    assert filled.hosted_domains is None
+
+
+def test_hostnames_are_opt_in_and_time_out(monkeypatch):
+    looked_up = []
+
+    def slow_rdns(ip):
+        looked_up.append(ip)
+        time.sleep(1)
+        return "slow.example"
+
+    monkeypatch.setattr(range_index, "reverse_dns", slow_rdns)
+    monkeypatch.setattr(range_index, "RDNS_TIMEOUT", 0.05)
+    default = range_index.RangeResolver()
+    default.resolve("10.0.0.1", lambda ip: record(ip))
+    assert default.resolve("10.0.0.2", None).hostname is None
+    assert looked_up == []
+
+    resolver = range_index.RangeResolver(hostnames=True)
+    resolver.resolve("10.0.0.1", lambda ip: record(ip))
+    started = time.monotonic()
+    assert resolver.resolve("10.0.0.2", None).hostname is None
+    assert time.monotonic() - started < 0.5
+    assert looked_up == ["10.0.0.2"]
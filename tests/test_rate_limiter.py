@@ -0,0 +1,100 @@
+import threading
+import time
+
+import rate_limiter
+import scrape_stock_price
+
+
+def test_every_stock_host_has_a_budget():
+    batch_host = "query1.finance.yahoo.com"
+    assert batch_host in scrape_stock_price.BATCH_URL
+    assert rate_limiter.limits_for(batch_host) is rate_limiter.HOST_LIMITS[batch_host]
+    limiter = rate_limiter.for_url(scrape_stock_price.BATCH_URL.format(symbols="AAPL"))
+    assert (limiter.rate, limiter.max_concurrency) == (1.0, 2)
+
+
+def test_unlisted_hosts_take_their_parent_domains_budget():
+    assert rate_limiter.limits_for("query2.finance.yahoo.com") is rate_limiter.HOST_LIMITS["finance.yahoo.com"]
+    assert rate_limiter.limits_for("example.org") is rate_limiter.DEFAULT_LIMITS
+    assert rate_limiter.limits_for("127.0.0.1") is rate_limiter.DEFAULT_LIMITS
+
+
+def test_429_halves_the_limit_and_honours_retry_after():
+    limiter = rate_limiter.HostLimiter(rate=100.0, burst=10, max_concurrency=8, initial_concurrency=8)
+    limiter.acquire()
+    limiter.release(429, 0.1, {"Retry-After": "30"})
+    state = limiter.snapshot()
+    assert state["limit"] == 4
+    assert 29 <= state["paused_for"] <= 30
+    assert limiter._wait_time(rate_limiter.time.monotonic()) > 29
+
+
+def test_successes_raise_the_limit_up_to_the_cap():
+    limiter = rate_limiter.HostLimiter(rate=1000.0, burst=1000, max_concurrency=3, initial_concurrency=1)
+    for _ in range(50):
+        limiter.acquire()
+        limiter.release(200, 0.01, {})
+    assert limiter.snapshot()["limit"] == 3
+
+
+def test_retry_after_dates():
+    assert rate_limiter.parse_retry_after({"retry-after": "5"}) == 5.0
+    assert rate_limiter.parse_retry_after({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+    assert rate_limiter.parse_retry_after({"Retry-After": "soon"}) is None
+    assert rate_limiter.parse_retry_after({}) is None
+
+
+def test_acquire_waits_for_a_free_slot():
+    limiter = rate_limiter.HostLimiter(rate=1000.0, burst=100, max_concurrency=2, initial_concurrency=2)
+    limiter.acquire()
+    limiter.acquire()
+    waiter = threading.Thread(target=limiter.acquire)
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive()
+    limiter.release(200, 0.01, {})
+    waiter.join(1)
+    assert not waiter.is_alive()
+
+
+def test_token_bucket_paces_requests():
+    limiter = rate_limiter.HostLimiter(rate=20.0, burst=1, max_concurrency=10, initial_concurrency=10)
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+        limiter.cancel()
+    assert time.monotonic() - started >= 0.18
+
+
+def test_latency_climbing_far_above_the_usual_counts_as_overload():
+    limiter = rate_limiter.HostLimiter(rate=1000.0, burst=100, max_concurrency=8, initial_concurrency=8)
+    for _ in range(200):
+        limiter.acquire()
+        limiter.release(200, 0.01, {})
+    assert limiter.snapshot()["throttled"] == 0
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(200, 0.01 * (rate_limiter.LATENCY_FACTOR + 3), {})
+    assert limiter.snapshot()["throttled"] == 1
+
+
+def test_one_fast_response_does_not_pin_the_limit():
+    # A 60 ms outlier (say a small error page) followed by normal 200-400 ms
+    # responses: none of those is overload, so the limit still grows
+    limiter = rate_limiter.HostLimiter(rate=1e6, burst=1e6, max_concurrency=16, initial_concurrency=1)
+    latencies = [0.06] + [0.2 + 0.2 * (i % 11) / 10 for i in range(2000)]
+    for latency in latencies:
+        limiter.acquire()
+        limiter.release(200, latency, {})
+    state = limiter.snapshot()
+    assert state["throttled"] == 0
+    assert state["limit"] == 16
+
+
+def test_limiting_can_be_switched_off():
+    rate_limiter.configure(enabled=False)
+    try:
+        assert rate_limiter.for_url("https://ipinfo.io/1.1.1.1") is None
+    finally:
+        rate_limiter.configure(enabled=True)
+    assert rate_limiter.for_url("https://ipinfo.io/1.1.1.1") is rate_limiter.for_url("https://ipinfo.io/8.8.8.8")
@@ -0,0 +1,134 @@
+import shutil
+import sys
+import types
+
+import extraction
+import parsers
+import record_cache
+
+
+def test_memoize_skips_a_parse_it_has_seen(tmp_path):
+    record_cache.configure(str(tmp_path / "records.sqlite"))
+    try:
+        calls = []
+
+        @record_cache.memoize
+        def extract(content, backend=None):
+            calls.append(content)
+            return len(content)
+
+        assert extract("<p>a</p>") == extract("<p>a</p>", backend="lxml") == 8
+        assert extract("<p>b</p>") == 8
+        assert len(calls) == 2
+    finally:
+        record_cache.configure(None)
+
+
+def test_version_follows_the_extraction_engine(tmp_path, monkeypatch):
+    # The specs are in parsers.py but the engine running them is in
+    # extraction.py; an engine edit has to change every extractor's key
+    copy = tmp_path / "extraction.py"
+    shutil.copy(extraction.__file__, copy)
+    engine = types.ModuleType("extraction")
+    engine.__file__ = str(copy)
+    monkeypatch.setitem(sys.modules, "extraction", engine)
+
+    before = record_cache.extractor_version(parsers.extract_weather.__wrapped__)
+    assert record_cache.extractor_version(parsers.extract_weather.__wrapped__) == before
+    with open(copy, "a") as f:
+        f.write("\n# engine change\n")
+    assert record_cache.extractor_version(parsers.extract_weather.__wrapped__) != before
+
+
+def test_version_differs_per_extractor():
+    assert parsers.extract_weather.version != parsers.extract_ipinfo.version
+
+
+def test_memory_tier_is_an_lru_over_the_disk_tier(tmp_path):
+    path = str(tmp_path / "records.sqlite")
+    cache = record_cache.RecordCache(path, memory_entries=2)
+    for key in (b"a", b"b", b"c"):
+        cache.put(key, {"key": key})
+    assert list(cache.memory) == [b"b", b"c"]
+    assert cache.get(b"a") == (True, {"key": b"a"})  # from disk, back in memory
+    assert cache.get(b"c") == (True, {"key": b"c"})
+    assert cache.get(b"missing") == (False, None)
+    assert (cache.memory_hits, cache.disk_hits, cache.misses) == (1, 1, 1)
+
+    # a new process (or run) finds the records on disk
+    again = record_cache.RecordCache(path)
+    assert again.get(b"b") == (True, {"key": b"b"})
+
+
+def test_extra_arguments_are_part_of_the_key(tmp_path):
+    record_cache.configure(str(tmp_path / "records.sqlite"))
+    try:
+        @record_cache.memoize
+        def extract(content, url, backend=None):
+            return url
+
+        assert extract("<p/>", "https://a") == "https://a"
+        assert extract("<p/>", "https://b") == "https://b"
+    finally:
+        record_cache.configure(None)
+
+
+def test_the_disk_tier_evicts_the_least_recently_used(tmp_path):
+    cache = record_cache.RecordCache(str(tmp_path / "records.sqlite"), memory_entries=1, max_rows=10)
+    for n in range(10):
+        cache.put(b"%d" % n, n)
+    assert cache.get(b"0") == (True, 0)  # used again: survives
+    cache.put(b"10", 10)
+    db = cache._conn()
+    keys = {row[0] for row in db.execute("SELECT key FROM records")}
+    assert len(keys) == 9
+    assert b"0" in keys and b"10" in keys
+    assert not {b"1", b"2"} & keys
+
+
+def test_rows_of_old_extractor_versions_are_pruned(tmp_path, monkeypatch):
+    path = str(tmp_path / "records.sqlite")
+    old = record_cache.RecordCache(path)
+    old.put(b"old", "stale", "v1")
+    old.put(b"new", "fresh", "v2")
+    old.put(b"any", "unversioned")
+    monkeypatch.setattr(record_cache, "_versions", {"v2"})
+    again = record_cache.RecordCache(path)
+    assert again.get(b"old") == (False, None)
+    assert again.get(b"new") == (True, "fresh")
+    assert again.get(b"any") == (True, "unversioned")
+
+
+def test_memoize_stores_its_version(tmp_path):
+    cache = record_cache.configure(str(tmp_path / "records.sqlite"))
+    try:
+        @record_cache.memoize
+        def extract(content, backend=None):
+            return content.upper()
+
+        extract("<p>a</p>")
+        assert extract.version in record_cache._versions
+        versions = [row[0] for row in cache._conn().execute("SELECT version FROM records")]
+        assert versions == [extract.version]
+    finally:
+        record_cache.configure(None)
+
+
+def test_threads_use_their_own_connections(tmp_path):
+    import threading
+
+    cache = record_cache.RecordCache(str(tmp_path / "records.sqlite"))
+    connections = []
+
+    def work(n):
+        cache.put(b"t%d" % n, n)
+        assert cache.get(b"t%d" % n) == (True, n)
+        connections.append(cache._conn())
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(map(id, connections))) == 4
+    assert cache._conn().execute("SELECT COUNT(*) FROM records").fetchone()[0] == 4
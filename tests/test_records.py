@@ -0,0 +1,74 @@
+import pickle
+
+import pytest
+
+import records
+from records import AsnRecord, IpRecord, StockRecord, WeatherRecord
+
+
+@pytest.mark.parametrize("convert, value, expected", [
+    (records.text, " Brisbane\xa0", "Brisbane"),
+    (records.text, "N/A", None),
+    (records.text, "No Hostname", None),
+    (records.number, "5,976.97", 5976.97),
+    (records.number, "(+0.63%)", 0.63),
+    (records.number, "-.5", -0.5),
+    (records.number, "none here", None),
+    (records.integer, "1,234 domains", 1234),
+    (records.boolean, "True", True),
+    (records.boolean, "false", False),
+    (records.boolean, "", None),
+    (records.asn, "AS13335 (/AS13335)", 13335),
+    (records.asn, None, None),
+    (records.link_text, "1.1.1.0/24 (/AS13335/1.1.1.0/24)", "1.1.1.0/24"),
+    (records.date, "19 years ago on Apr 03, 2006", "2006-04-03"),
+    (records.date, "unknown", "unknown"),
+    (records.celsius, "36 °C", 36.0),
+    (records.celsius, "97 °F", 36.1),
+    (records.kilometres, "10 mi", 16.1),
+    (records.kilometres, "16 km", 16.0),
+    (records.millibars, "29.92 \"Hg", 1013.2),
+    (records.millibars, "1013 mbar", 1013.0),
+    (records.coordinates, "-27.4816,153.0175", (-27.4816, 153.0175)),
+    (records.coordinates, "N/A", (None, None)),
+])
+def test_values_are_normalized(convert, value, expected):
+    assert convert(value) == expected
+
+
+def test_from_page_types_the_text():
+    ip = IpRecord.from_page("1.1.1.1", [
+        ("City", "Brisbane"), ("Coordinates", "-27.4816,153.0175"), ("ASN", "AS13335 (/AS13335)"),
+        ("Hostname", "No Hostname"), ("Hosted domains", "2,146"), ("Anycast", "True"),
+        ("Range", "1.1.1.0/24 (/AS13335/1.1.1.0/24)"),
+    ])
+    assert (ip.city, ip.latitude, ip.longitude, ip.asn) == ("Brisbane", -27.4816, 153.0175, 13335)
+    assert (ip.hostname, ip.hosted_domains, ip.anycast, ip.privacy) == (None, 2146, True, None)
+    assert ip.range == "1.1.1.0/24" and ip.number == 16843009
+    asn = AsnRecord.from_page(13335, [("Number of IPv4", "1,000"), ("Allocated", "on Jul 14, 2010")])
+    assert (asn.ipv4_count, asn.allocated, asn.country) == (1000, "2010-07-14", None)
+    weather = WeatherRecord.from_page("london", {"temperature": "68 °F", "humidity": "40%"}, "t", "s")
+    assert (weather.temperature_c, weather.humidity_pct) == (20.0, 40.0)
+
+
+def test_records_read_like_the_old_dicts():
+    stock = StockRecord("AAPL", "yahoo", 196.45)
+    assert stock["price"] == 196.45 and stock.get("nope", 1) == 1
+    assert "symbol" in stock and "nope" not in stock
+    assert list(stock) == list(StockRecord.FIELDS) == list(stock.keys())
+    assert records.as_dict(stock) == {"symbol": "AAPL", "source": "yahoo", "price": 196.45,
+                                      "change": None, "percent_change": None}
+    assert records.as_dict({"a": 1}) == {"a": 1}
+    with pytest.raises(KeyError):
+        stock["nope"]
+
+
+def test_records_are_compact_and_typed():
+    stock = StockRecord("AAPL")
+    assert not hasattr(stock, "__dict__")
+    with pytest.raises(AttributeError):
+        stock.extra = 1
+    assert pickle.loads(pickle.dumps(stock)) == stock
+    assert StockRecord.TYPES == {"symbol": str, "source": str, "price": float, "change": float,
+                                 "percent_change": float}
+    assert IpRecord.TYPES["asn"] is int and IpRecord.TYPES["anycast"] is bool
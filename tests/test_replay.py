@@ -0,0 +1,55 @@
+import pytest
+
+import fetcher
+import rate_limiter
+import replay
+import scrapers
+
+STORE = replay.Store()
+
+
+@pytest.fixture(scope="module")
+def server():
+    replay.offline()
+    process, port = replay.start_server(STORE.path)
+    replay.install(port)
+    yield port
+    fetcher.route(None)
+    process.terminate()
+    rate_limiter.configure(enabled=True)
+
+
+@pytest.mark.parametrize("command", list(scrapers.COMMANDS))
+def test_fixture_replays_to_its_expected_output(server, command):
+    manifest = STORE.load(command)
+    records, dead_letters = replay.replay(command, manifest)
+    assert records == manifest["expected"]
+    assert dead_letters == manifest["dead_letters"]
+
+
+@pytest.mark.parametrize("command", list(scrapers.COMMANDS))
+def test_fixture_covers_several_targets_and_failures(command):
+    # every manifest has to exercise more than the happy path
+    manifest = STORE.load(command)
+    statuses = {response["status"] for response in manifest["responses"]}
+    assert len(manifest["expected"]) > 1
+    assert 404 in statuses
+    assert statuses & {500, 502, 503, 504}
+
+
+def test_a_target_that_keeps_failing_is_dead_lettered(server):
+    manifest = STORE.load("ip")
+    records, dead_letters = replay.replay("ip", {**manifest, "inputs": ["1.1.1.4"]})
+    assert (records, dead_letters) == ([], ["1.1.1.4"])
+
+
+def test_the_replay_server_leaves_the_stdlib_server_alone():
+    import queue
+    import threading
+    from http.server import ThreadingHTTPServer
+
+    ports = queue.Queue()
+    threading.Thread(target=replay.serve, args=(STORE.path, ports), daemon=True).start()
+    ports.get(timeout=5)
+    assert ThreadingHTTPServer.request_queue_size == 5
+    assert replay.BenchServer.request_queue_size == 1024
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+import requests
+
+import retry
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def dead_letters(tmp_path):
+    store = retry.configure(str(tmp_path / "dead_letters.sqlite"))
+    yield store
+    retry.configure(None)
+
+
+def test_transient_failures_are_retried(dead_letters):
+    failures = {"a": 2}
+    policy = retry.RetryPolicy("test", max_attempts=3, base_delay=0.0)
+
+    def fetch(target):
+        if failures.get(target):
+            failures[target] -= 1
+            raise requests.ConnectionError("reset")
+        return target.upper()
+
+    assert sorted(retry.imap_retry(fetch, ["a", "b"], policy, max_workers=2)) == ["A", "B"]
+    assert dead_letters.count() == 0
+
+
+def test_exhausted_and_permanent_failures_are_dead_lettered(dead_letters):
+    policy = retry.RetryPolicy("test", max_attempts=2, base_delay=0.0)
+    errors = []
+
+    def fetch(target):
+        if target == "busy":
+            policy.check(Response(503))
+        raise ValueError("unparseable")
+
+    results = list(retry.imap_retry(fetch, ["busy", "broken"], policy, lambda target, e: errors.append(target)))
+    assert results == []
+    assert sorted(errors) == ["broken", "busy"]
+    attempts = {target: n for _, target, _, n, _ in dead_letters.entries("test")}
+    assert attempts == {"busy": 2, "broken": 1}
+    assert sorted(retry.take("test")) == ["broken", "busy"]
+    assert dead_letters.count("test") == 0
+
+
+def test_a_waiting_retry_does_not_hold_a_worker():
+    # One worker: "slow" waits 0.5s for its retry, the others go first
+    policy = retry.RetryPolicy("test", max_attempts=2, base_delay=0.5, max_delay=0.5)
+    policy.delay = lambda attempt, exc=None: 0.5
+    tried = set()
+    order = []
+
+    def fetch(target):
+        if target == "slow" and target not in tried:
+            tried.add(target)
+            raise requests.Timeout("slow")
+        order.append((target, time.monotonic()))
+        return target
+
+    started = time.monotonic()
+    results = list(retry.imap_retry(fetch, ["slow", "a", "b", "c"], policy, max_workers=1))
+    assert sorted(results) == ["a", "b", "c", "slow"]
+    assert [target for target, _ in order] == ["a", "b", "c", "slow"]
+    assert order[0][1] - started < 0.3
+
+
+def test_backoff_is_capped_and_honours_retry_after():
+    policy = retry.RetryPolicy("test", base_delay=1.0, max_delay=4.0)
+    assert all(0 <= policy.delay(attempt) <= 4.0 for attempt in range(1, 20))
+    with pytest.raises(retry.RetryStatus) as raised:
+        policy.check(Response(429, {"Retry-After": "7"}))
+    assert policy.delay(1, raised.value) >= 7
+    assert policy.should_retry(raised.value, 1)
+    assert not policy.should_retry(raised.value, policy.max_attempts)
+    assert not policy.should_retry(ValueError("bad page"), 1)
+    assert policy.check(Response(404)).status_code == 404
+
+
+def test_tuple_targets_survive_the_dead_letter_list(dead_letters):
+    dead_letters.add("stock", ("AAPL", "https://example.com"), ValueError("x"), 1)
+    assert retry.take("stock") == [("AAPL", "https://example.com")]
@@ -0,0 +1,102 @@
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+import pytest
+
+import cli
+import fetcher
+import rate_limiter
+import scraper_base
+import scrapers
+from records import Record, record
+
+
+@record
+class EchoRecord(Record):
+    word: str
+    length: int | None = None
+
+
+class Echo(scraper_base.Scraper):
+    name = "echo"
+    title = "Echo"
+    validation = r"[a-z, ]+"
+    record = EchoRecord
+    echo = False
+
+    def targets(self, user_input):
+        return [word.strip() for word in user_input.split(",") if word.strip()]
+
+    def build_url(self, word):
+        return f"https://echo.example/{word}"
+
+    def parse(self, word, content, backend=None):
+        return EchoRecord(word, len(content))
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # register() into copies, so no test leaves a plugin behind
+    monkeypatch.setattr(scrapers, "SCRAPER_MAP", dict(scrapers.SCRAPER_MAP))
+    monkeypatch.setattr(scrapers, "COMMANDS", dict(scrapers.COMMANDS))
+    monkeypatch.setattr(scrapers, "_plugins", {})
+    monkeypatch.setattr(scrapers, "_discovered", True)
+    return scrapers
+
+
+def test_looking_scrapers_up_imports_none_of_them():
+    code = ("import sys, scrapers; scrapers.get('ip'); scrapers.get('Stock Price'); "
+            "print(sorted(name for name in sys.modules if name.startswith('scrape')))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(scrapers.__file__)),
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "['scrapers']"
+
+
+@pytest.mark.parametrize("command", ["ip", "asn", "weather", "stock"])
+def test_built_in_scrapers_share_the_base(command):
+    module = scrapers.load(command)
+    assert isinstance(module.SCRAPER, scraper_base.Scraper)
+    assert module.FIELDS == module.SCRAPER.record.FIELDS
+    assert module.RETRY is module.SCRAPER.retry
+
+
+def test_a_registered_scraper_runs_like_a_built_in_one(registry, site):
+    scraper = registry.register(Echo)
+    assert registry.load("echo") is scraper and registry.get("Echo")["command"] == "echo"
+    assert registry.names()[-1] == "Echo"
+    site.page("/hello", "12345")
+    site.page("/world", "123")
+    rate_limiter.configure(enabled=False)
+    fetcher.route(lambda url: site.url + urlsplit(url).path)
+    try:
+        records = sorted(cli.run("echo", ["hello, world"], max_workers=2), key=lambda r: r.word)
+    finally:
+        fetcher.route(None)
+        rate_limiter.configure(enabled=True)
+    assert records == [EchoRecord("hello", 5), EchoRecord("world", 3)]
+    assert cli.output_fields("echo") == (("word", "length"), {"word": str, "length": int})
+    with pytest.raises(ValueError, match="already registered"):
+        registry.register(Echo())
+
+
+def test_entry_points_are_loaded_once_and_broken_ones_skipped(registry, monkeypatch, capsys):
+    import importlib.metadata
+
+    def load_broken():
+        raise ImportError("missing dependency")
+
+    points = [SimpleNamespace(name="echo", load=lambda: Echo), SimpleNamespace(name="broken", load=load_broken)]
+    calls = []
+    monkeypatch.setattr(importlib.metadata, "entry_points", lambda group: calls.append(group) or points)
+    monkeypatch.setattr(registry, "_discovered", False)
+    assert registry.get("ip")["module"] == "scrape_ip_data"
+    assert calls == []  # built-ins never look
+    assert registry.get("echo")["prompt"] == Echo.prompt
+    registry.names()
+    assert calls == [scrapers.ENTRY_POINT_GROUP]
+    assert "Skipping scraper plugin 'broken'" in capsys.readouterr().err
+    with pytest.raises(ValueError, match="Unknown scraper"):
+        registry.get("nope")
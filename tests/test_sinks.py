@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+import sinks
+from records import StockRecord
+
+
+def test_csv_pages_read_back_an_open_sink(tmp_path):
+    filename = str(tmp_path / "stock.csv")
+    with sinks.CsvSink(filename, ["old"]) as old:
+        old.write({"old": "from an earlier run"})
+    with sinks.CsvSink(filename, StockRecord.FIELDS) as sink:
+        pages = sinks.CsvPages(filename, sink.checkpoint(), StockRecord.FIELDS, StockRecord.TYPES, page_size=10)
+        written = [StockRecord(f"S{i}", 'a "quoted",\nsource' if i == 3 else "x", float(i), -0.5, None)
+                   for i in range(25)]
+        for record in written[:15]:
+            sink.write(record)
+        sink.flush()
+        # Only what was flushed is there; the half-full page is not a page yet
+        assert [row["symbol"] for row in pages.page(1)] == [f"S{i}" for i in range(10, 15)]
+        for record in written[15:]:
+            sink.write(record)
+    assert pages.page(0)[3] == written[3].to_dict()
+    assert pages.page(2) == [record.to_dict() for record in written[20:]]
+    assert pages.page(3) == []
+    assert list(pages) == [record.to_dict() for record in written]
+
+
+def test_csv_header_is_written_once_per_file(tmp_path):
+    filename = str(tmp_path / "out.csv")
+    for run in range(2):
+        with sinks.open_sink(filename, fields=["a", "b"]) as sink:
+            sink.write({"a": run, "b": "x"})
+    with open(filename, encoding="utf-8") as f:
+        assert f.read().splitlines() == ["a,b", "0,x", "1,x"]
+
+
+def test_fields_outside_the_schema_are_dropped(tmp_path, capsys):
+    filename = str(tmp_path / "out.jsonl")
+    with sinks.open_sink(filename, fields=["a"]) as sink:
+        sink.write({"a": 1, "extra": 2})
+        sink.write({})
+    with open(filename, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == [{"a": 1}, {"a": None}]
+    assert "extra" in capsys.readouterr().out
+
+
+def test_json_sink_matches_json_dumps(tmp_path):
+    records = [{"a": 1, "b": [1, 2]}, {"a": "ü", "b": None}]
+    for rows in (records, []):
+        filename = str(tmp_path / "out.json")
+        with sinks.open_sink(filename, fields=["a", "b"], batch_size=1) as sink:
+            for record in rows:
+                sink.write(record)
+        with open(filename, encoding="utf-8") as f:
+            assert f.read() == json.dumps(rows, indent=4)
+
+
+def test_resuming_cuts_back_to_the_checkpoint(tmp_path):
+    filename = str(tmp_path / "out.jsonl")
+    with sinks.open_sink(filename, fields=["n"]) as sink:
+        sink.write({"n": 1})
+        offset = sink.checkpoint()
+        sink.write({"n": 2})  # written after the last checkpoint: lost on resume
+    with sinks.open_sink(filename, offset, fields=["n"]) as sink:
+        sink.write({"n": 3})
+    with open(filename, encoding="utf-8") as f:
+        assert [json.loads(line)["n"] for line in f] == [1, 3]
+    with pytest.raises(ValueError):
+        sinks.open_sink(str(tmp_path / "out.json"), 0)
+    with pytest.raises(ValueError):
+        sinks.open_sink(str(tmp_path / "out.txt"))
+
+
+@pytest.mark.parametrize("ext", [".parquet", ".arrow", ".feather"])
+def test_columnar_sinks_write_typed_batches(tmp_path, ext):
+    pa = pytest.importorskip("pyarrow")
+    filename = str(tmp_path / f"stock{ext}")
+    written = [StockRecord(f"S{i}", "x", float(i), None if i % 2 else -0.5, 1.25) for i in range(25)]
+    with sinks.open_sink(filename, fields=StockRecord.FIELDS, types=StockRecord.TYPES, batch_size=10) as sink:
+        for record in written:
+            sink.write(record)
+        sink.write({"symbol": 7, "price": ""})  # text in a string column, "" as a missing number
+    if ext == ".parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(filename)
+        assert pq.ParquetFile(filename).metadata.num_row_groups == 3
+    else:
+        table = pa.ipc.open_file(filename).read_all()
+    assert table.schema.names == list(StockRecord.FIELDS)
+    assert table.schema.field("symbol").type == pa.string()
+    assert table.schema.field("price").type == pa.float64()
+    assert table.to_pylist() == [record.to_dict() for record in written] + \
+        [{"symbol": "7", "source": None, "price": None, "change": None, "percent_change": None}]
+
+
+def test_an_empty_columnar_file_still_has_the_schema(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    filename = str(tmp_path / "empty.parquet")
+    with sinks.open_sink(filename, fields=StockRecord.FIELDS, types=StockRecord.TYPES):
+        pass
+    table = pq.read_table(filename)
+    assert table.num_rows == 0
+    assert table.schema.names == list(StockRecord.FIELDS)
+    with pytest.raises(ValueError):
+        sinks.open_sink(filename, 0)
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+import pytest
+
+import fetcher
+import rate_limiter
+import scrape_stock_price
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "fixtures")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+class SlowClient:
+    # Stands in for fetcher.AsyncFetcher: pages[host] = (delay, status, body)
+    def __init__(self, pages):
+        self.pages = pages
+        self.asked = []
+        self.cancelled = []
+
+    async def get(self, url, headers=None, ttl=None):
+        host = urlsplit(url).hostname
+        self.asked.append(host)
+        delay, status, body = self.pages[host]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(host)
+            raise
+        return SimpleNamespace(status_code=status, content=body)
+
+
+@pytest.fixture
+def local_site(site):
+    # Every stock host (query string and all) is served by the local site
+    rate_limiter.configure(enabled=False)
+    fetcher.route(lambda url: site.url + url.split(urlsplit(url).netloc, 1)[1])
+    yield site
+    fetcher.route(None)
+    rate_limiter.configure(enabled=True)
+
+
+def test_parse_batch_keeps_priced_symbols():
+    content = json.dumps({"quoteResponse": {"result": [
+        {"symbol": "aapl", "regularMarketPrice": 196.454, "regularMarketChange": 1.231,
+         "regularMarketChangePercent": 0.629},
+        {"symbol": "MSFT", "regularMarketPrice": 410},
+        {"symbol": "GONE"},
+        {"symbol": "PENNY", "regularMarketPrice": 0.0042, "regularMarketChange": -0.0003},
+    ]}})
+    quotes = scrape_stock_price.parse_batch("batch-url", content)
+    assert list(quotes) == ["AAPL", "MSFT", "PENNY"]
+    # full precision (sub-cent prices), and no made-up zero changes
+    assert (quotes["AAPL"].price, quotes["AAPL"].change, quotes["AAPL"].percent_change) == (196.454, 1.231, 0.629)
+    assert (quotes["MSFT"].price, quotes["MSFT"].change, quotes["MSFT"].percent_change) == (410.0, None, None)
+    assert (quotes["PENNY"].price, quotes["PENNY"].change) == (0.0042, -0.0003)
+    assert quotes["MSFT"].source == "batch-url"
+    assert scrape_stock_price.parse_batch("batch-url", "{}") == {}
+
+
+def test_a_fast_first_source_is_the_only_one_asked():
+    client = SlowClient({"finance.yahoo.com": (0.0, 200, fixture("yahoo.html")),
+                         "www.marketwatch.com": (0.0, 200, fixture("marketwatch.html"))})
+    record = asyncio.run(scrape_stock_price.race_quote(client, "AAPL", hedge=1.0))
+    assert record.source == "https://finance.yahoo.com/quote/AAPL"
+    assert client.asked == ["finance.yahoo.com"]
+
+
+def test_a_slow_source_is_hedged_and_cancelled():
+    client = SlowClient({"finance.yahoo.com": (5.0, 200, fixture("yahoo.html")),
+                         "www.marketwatch.com": (0.0, 200, fixture("marketwatch.html"))})
+    record = asyncio.run(scrape_stock_price.race_quote(client, "AAPL", hedge=0.05))
+    assert record.source == "https://www.marketwatch.com/investing/stock/aapl"
+    assert client.cancelled == ["finance.yahoo.com"]
+
+
+def test_a_failed_source_falls_back_without_waiting_for_the_hedge():
+    client = SlowClient({"finance.yahoo.com": (0.0, 503, b""),
+                         "www.marketwatch.com": (0.0, 200, fixture("marketwatch.html"))})
+    record = asyncio.run(asyncio.wait_for(scrape_stock_price.race_quote(client, "AAPL", hedge=30), 5))
+    assert record.price == 196.45
+    assert client.asked == ["finance.yahoo.com", "www.marketwatch.com"]
+
+
+def test_no_source_means_no_quote():
+    client = SlowClient({"finance.yahoo.com": (0.0, 404, b""), "www.marketwatch.com": (0.0, 404, b"")})
+    assert asyncio.run(scrape_stock_price.race_quote(client, "ZZZZ", hedge=0)) is None
+
+
+def test_batch_mode_races_only_the_symbols_the_batch_missed(local_site):
+    local_site.page("/v7/finance/quote?symbols=AAPL,MSFT,GOOGL", json.dumps({"quoteResponse": {"result": [
+        {"symbol": "AAPL", "regularMarketPrice": 1.0}, {"symbol": "GOOGL", "regularMarketPrice": 3.0}]}}))
+    local_site.page("/quote/MSFT", fixture("yahoo.html"))
+    records = list(scrape_stock_price.iter_results("aapl, msft, googl, msft", max_workers=2, mode="batch"))
+    assert {record.symbol: record.price for record in records} == {"AAPL": 1.0, "GOOGL": 3.0, "MSFT": 196.45}
+    requested = [path for path, _ in local_site.requests]
+    assert requested.count("/v7/finance/quote?symbols=AAPL,MSFT,GOOGL") == 1
+    assert "/quote/AAPL" not in requested and "/quote/GOOGL" not in requested
+
+
+def test_a_failed_batch_falls_back_to_the_pages(local_site):
+    local_site.page("/v7/finance/quote?symbols=AAPL", "down", status=503)
+    local_site.page("/investing/stock/aapl", fixture("marketwatch.html"))
+    records = list(scrape_stock_price.iter_results("AAPL", max_workers=1, mode="batch"))
+    assert [(record.symbol, record.source) for record in records] == \
+        [("AAPL", "https://www.marketwatch.com/investing/stock/aapl")]
+
+
+def test_iter_results_keeps_the_base_signature():
+    with pytest.raises(TypeError):
+        scrape_stock_price.iter_results("AAPL", 1, "threads", 0, "batch")
+    with pytest.raises(ValueError, match="parse_processes"):
+        scrape_stock_price.iter_results("AAPL", 1, "threads", 2)
+    with pytest.raises(ValueError, match="unknown mode"):
+        scrape_stock_price.iter_results("AAPL", mode="fastest")
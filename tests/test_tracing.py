@@ -0,0 +1,152 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import pytest
+
+import fetcher
+import profiler
+import rate_limiter
+import scrape_weatherdata
+import tracing
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "fixtures")
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    tracing.configure(path)
+    yield path
+    tracing.configure(None)
+
+
+def read_spans(path):
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            for resource in json.loads(line)["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    spans += scope["spans"]
+    return {span["name"]: span for span in spans}, spans
+
+
+def attributes(span):
+    return {item["key"]: next(iter(item["value"].values())) for item in span["attributes"]}
+
+
+def test_tracing_off_costs_a_shared_no_op():
+    assert not tracing.enabled()
+    assert tracing.span("scrape") is tracing.NOOP
+    with tracing.span("scrape") as span:
+        span.set("ignored", 1)
+    tracing.add("wait", 0.0, 1.0)
+
+
+def test_spans_nest_and_are_written_as_otlp(trace_file):
+    with tracing.span("scrape", target="1.1.1.1", attempt=2):
+        with tracing.span("fetch", tracing.CLIENT, cached=False, ratio=0.5):
+            tracing.add("wait", time.perf_counter() - 0.01, time.perf_counter())
+    with pytest.raises(OSError):
+        with tracing.span("failing"):
+            raise OSError("down")
+    tracing.flush()
+    by_name, spans = read_spans(trace_file)
+    scrape, fetch, wait = by_name["scrape"], by_name["fetch"], by_name["wait"]
+    assert fetch["parentSpanId"] == scrape["spanId"] and wait["parentSpanId"] == fetch["spanId"]
+    assert {scrape["traceId"], fetch["traceId"], wait["traceId"]} == {scrape["traceId"]}
+    failing = by_name["failing"]
+    assert "parentSpanId" not in failing and failing["traceId"] != scrape["traceId"]
+    assert failing["status"] == {"code": 2, "message": "OSError: down"} and scrape["status"] == {}
+    assert attributes(scrape) == {"target": "1.1.1.1", "attempt": "2"}
+    assert attributes(fetch) == {"cached": False, "ratio": 0.5}
+    assert fetch["kind"] == tracing.CLIENT and len(scrape["traceId"]) == 32
+    assert int(scrape["startTimeUnixNano"]) <= int(fetch["startTimeUnixNano"]) <= int(fetch["endTimeUnixNano"])
+    assert abs(int(scrape["startTimeUnixNano"]) / 1e9 - time.time()) < 60
+
+
+def test_sampling_keeps_or_drops_whole_traces(tmp_path, monkeypatch):
+    path = str(tmp_path / "trace.jsonl")
+    tracing.configure(path, sample=0.5)
+    rolls = iter([0.9, 0.1])
+    monkeypatch.setattr(tracing.random, "random", lambda: next(rolls))
+    try:
+        for target in ("dropped", "kept"):
+            with tracing.span("scrape", target=target):
+                with tracing.span("fetch"):
+                    tracing.add("wait", 0.0, 0.0)
+    finally:
+        tracing.configure(None)
+    _, spans = read_spans(path)
+    assert sorted(span["name"] for span in spans) == ["fetch", "scrape", "wait"]
+    assert [attributes(span) for span in spans if span["name"] == "scrape"] == [{"target": "kept"}]
+    with pytest.raises(ValueError):
+        tracing.configure(path, sample=0)
+
+
+def test_the_current_span_follows_asyncio_tasks(trace_file):
+    async def target(name):
+        with tracing.span("scrape", target=name):
+            await asyncio.sleep(0.01)
+            with tracing.span("fetch", target=name):
+                await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(target("a"), target("b"))
+
+    asyncio.run(main())
+    tracing.flush()
+    _, spans = read_spans(trace_file)
+    parents = {attributes(span)["target"]: span["spanId"] for span in spans if span["name"] == "scrape"}
+    for span in spans:
+        if span["name"] == "fetch":
+            assert span["parentSpanId"] == parents[attributes(span)["target"]]
+
+
+def test_a_scrape_traces_every_stage(site, trace_file):
+    with open(os.path.join(FIXTURES, "weather.html"), encoding="utf-8") as f:
+        site.page("/weather/uk/london", f.read())
+    rate_limiter.configure(enabled=True)
+    fetcher.route(lambda url: site.url + urlsplit(url).path)
+    try:
+        scrape_weatherdata.SCRAPER.scrape("uk/london")
+    finally:
+        fetcher.route(None)
+    tracing.flush()
+    by_name, _ = read_spans(trace_file)
+    assert {"scrape", "fetch", "rate_limit", "wait", "download", "parse"} <= set(by_name)
+    assert by_name["fetch"]["parentSpanId"] == by_name["scrape"]["spanId"]
+    assert by_name["parse"]["parentSpanId"] == by_name["scrape"]["spanId"]
+    for stage in ("rate_limit", "wait", "download"):
+        assert by_name[stage]["parentSpanId"] == by_name["fetch"]["spanId"]
+    assert attributes(by_name["fetch"])["http.response.status_code"] == "200"
+
+
+def test_the_profiler_samples_other_threads(tmp_path):
+    stop = threading.Event()
+
+    def busy_wait():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_wait, name="Thread-7 (busy_wait)")
+    worker.start()
+    profiler.start(interval=0.005)
+    assert profiler.running() and profiler.start() is profiler._sampler
+    time.sleep(0.2)
+    path = str(tmp_path / "run.folded")
+    sampler = profiler.stop(path)
+    stop.set()
+    worker.join()
+    assert not profiler.running() and profiler.stop() is None
+    assert sampler.samples > 5
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    ours = [line for line in lines if line.startswith("busy_wait;")]
+    assert ours and all("busy_wait (test_tracing.py:" in line for line in ours)
+    assert not any(line.startswith("profiler;") for line in lines)
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in ours) <= sampler.samples
+    assert profiler._thread_label("ThreadPoolExecutor-0_3") == "ThreadPoolExecutor"
@@ -0,0 +1,63 @@
+import os
+from urllib.parse import urlsplit
+
+import fetcher
+import poller
+import scrape_weatherdata
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "fixtures")
+
+
+def weather_page(temperature):
+    with open(os.path.join(FIXTURES, "weather.html"), encoding="utf-8") as f:
+        return f.read().replace("36&nbsp;°C", f"{temperature}&nbsp;°C")
+
+
+def test_poll_yields_only_changes():
+    readings = iter([1, 1, 2, 2, 2, 3])
+    records = poller.poll(lambda target: {"key": target, "value": next(readings), "at": object()},
+                          ["a"], 0.01, key=lambda record: record["key"], ignore=("at",), cycles=6)
+    assert [record["value"] for record in records] == [1, 2, 3]
+
+
+def test_poll_survives_failing_fetches():
+    def fetch(target):
+        if target == "bad":
+            raise OSError("down")
+        return {"key": target}
+
+    records = poller.poll(fetch, ["bad", "good"], 0.01, key=lambda record: record["key"], cycles=2)
+    assert [record["key"] for record in records] == ["good"]
+
+
+def test_watch_sees_changes_inside_the_cache_ttl(site, response_cache):
+    # The interval is far below the weather TTL: every poll still has to
+    # reach the site (a conditional request), or nothing would ever change
+    site.page("/weather/london", weather_page(20), ETag='"v1"')
+    fetcher.route(lambda url: site.url + urlsplit(url).path)
+    try:
+        changes = scrape_weatherdata.iter_changes("london", interval=0.05, max_workers=1, cycles=4)
+        temperatures = []
+        for record in changes:
+            temperatures.append(record.temperature_c)
+            site.page("/weather/london", weather_page(25), ETag='"v2"')
+    finally:
+        fetcher.route(None)
+    assert temperatures == [20.0, 25.0]
+    assert site.hits("/weather/london") == 4
+    assert any(headers.get("If-None-Match") == '"v2"' for _, headers in site.requests)
+
+
+def test_a_plain_scrape_still_uses_the_cache(site, response_cache):
+    site.page("/weather/london", weather_page(20), ETag='"v1"')
+    fetcher.route(lambda url: site.url + urlsplit(url).path)
+    try:
+        first = scrape_weatherdata.SCRAPER.fetch("london")
+        second = scrape_weatherdata.SCRAPER.fetch("london")
+        revalidated = scrape_weatherdata.SCRAPER.fetch("london", revalidate=True)
+    finally:
+        fetcher.route(None)
+    assert site.hits("/weather/london") == 2
+    assert not getattr(first, "from_cache", False)
+    assert second.from_cache and revalidated.from_cache
+    assert revalidated.content == first.content
@@ -0,0 +1,68 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from worker_pool import WorkerPool, imap_unordered, run_all
+
+
+def test_submit_blocks_while_the_queue_is_full():
+    release = threading.Event()
+    pool = WorkerPool(max_workers=1, queue_size=2)
+    try:
+        pool.submit(release.wait)  # taken by the worker
+        time.sleep(0.05)
+        pool.submit(release.wait)
+        pool.submit(release.wait)  # queue now full
+        blocked = threading.Thread(target=pool.submit, args=(release.wait,))
+        blocked.start()
+        blocked.join(0.2)
+        assert blocked.is_alive()
+        release.set()
+        blocked.join(1)
+        assert not blocked.is_alive()
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_a_failing_job_does_not_kill_its_worker():
+    done = []
+
+    def job(n):
+        if n == 0:
+            raise ValueError("bad target")
+        done.append(n)
+
+    run_all(job, range(5), max_workers=1)
+    assert sorted(done) == [1, 2, 3, 4]
+
+
+def test_imap_unordered_yields_every_result_and_skips_none():
+    results = imap_unordered(lambda n: n * 2 if n % 3 else None, range(30), max_workers=4)
+    assert sorted(results) == [n * 2 for n in range(30) if n % 3]
+
+
+def test_imap_unordered_only_pulls_what_the_queues_hold():
+    # A lazy, endless target source: the pool reads ahead by about the
+    # queue sizes, never the whole thing
+    pulled = itertools.count()
+
+    def source():
+        for n in itertools.count():
+            next(pulled)
+            yield n
+
+    results = imap_unordered(lambda n: n, source(), max_workers=2, queue_size=4)
+    first = [next(results) for _ in range(3)]
+    time.sleep(0.3)
+    ahead = next(pulled)
+    results.close()
+    assert len(first) == 3
+    assert ahead < 20
+
+
+def test_zero_workers_is_an_error():
+    with pytest.raises(ValueError):
+        WorkerPool(max_workers=0)
@@ -0,0 +1,232 @@
+import atexit
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+
+# Optional per-target tracing, exported as OpenTelemetry spans to a file.
+#
+#   tracing.configure("trace.jsonl")            # every target
+#   tracing.configure("trace.jsonl", sample=0.01)
+#   tracing.configure(None)                     # off again (flushes the file)
+#
+# With tracing on, each target attempt is one trace:
+#
+#   scrape            - Scraper.scrape / one fetch_stream attempt
+#     fetch           - fetcher.get (attributes: url, status, cache hit)
+#       rate_limit    - waiting for the host's limiter
+#       connect / tls - a new connection (dns too on the async path)
+#       wait          - request sent until the response headers
+#       download      - the response body
+#     parse           - parsers.extract (attribute: backend)
+#   write             - one sink batch (its own trace, on the writing thread)
+#
+# The file is OTLP/JSON Lines, one ExportTraceServiceRequest per line, the
+# format the OpenTelemetry Collector's otlpjsonfile receiver reads, so the
+# spans can be forwarded to Jaeger / Tempo / ... without a collector in the
+# crawler itself. Spans are written in batches of BATCH_SIZE and when
+# tracing is turned off or the process exits.
+#
+# sample keeps that share of the traces (decided at the root span, so a
+# trace is kept whole or not at all). Tracing off costs one global check
+# per span site: span() hands back a shared do-nothing object.
+#
+# The current span is a contextvar, so nesting follows both threads and
+# asyncio tasks. Parse worker processes (parse_processes > 0) do not trace.
+
+BATCH_SIZE = 512
+SERVICE_NAME = "parallel-web-crawler"
+
+# OTLP span kinds
+INTERNAL = 1
+CLIENT = 3
+
+_exporter = None
+_current = contextvars.ContextVar("span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start", "end", "attributes", "error", "token")
+
+    def __init__(self, name, kind, attributes, parent):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else random.getrandbits(128)
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.error = None
+        self.start = self.end = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.token = _current.set(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter_ns()
+        _current.reset(self.token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        exporter = _exporter
+        if exporter is not None:
+            exporter.add(self)
+        return False
+
+
+class _Noop:
+    # Stands in for a span when tracing is off or the trace is not sampled
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _Unsampled(_Noop):
+    # Root of a dropped trace: its children are dropped too
+    def __enter__(self):
+        self.token = _current.set(_DROPPED)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self.token)
+        return False
+
+
+NOOP = _Noop()
+_DROPPED = _Noop()
+
+
+def enabled():
+    return _exporter is not None
+
+
+def span(name, kind=INTERNAL, **attributes):
+    # Context manager timing one step of the current trace (a new trace if
+    # there is none on this thread / task)
+    exporter = _exporter
+    if exporter is None:
+        return NOOP
+    parent = _current.get()
+    if parent is _DROPPED:
+        return NOOP
+    if parent is None and exporter.sample < 1.0 and random.random() >= exporter.sample:
+        return _Unsampled()
+    return Span(name, kind, attributes, parent)
+
+
+def add(name, started, ended, **attributes):
+    # A span that has already ended; started / ended are time.perf_counter()
+    # readings (for steps only seen from callbacks, like aiohttp's tracing)
+    exporter = _exporter
+    if exporter is None:
+        return
+    parent = _current.get()
+    if parent is _DROPPED or (parent is None and exporter.sample < 1.0 and random.random() >= exporter.sample):
+        return
+    finished = Span(name, INTERNAL, attributes, parent)
+    finished.start, finished.end = int(started * 1e9), int(ended * 1e9)
+    exporter.add(finished)
+
+
+class FileExporter:
+    def __init__(self, path, sample=1.0, service=SERVICE_NAME, batch_size=BATCH_SIZE):
+        if not 0.0 < sample <= 1.0:
+            raise ValueError("sample must be in (0, 1]")
+        self.path = path
+        self.sample = sample
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.pending = []
+        self.resource = {"attributes": _attributes({"service.name": service, "process.pid": os.getpid()})}
+        # perf_counter_ns() -> Unix time in ns
+        self.offset = time.time_ns() - time.perf_counter_ns()
+
+    def add(self, finished):
+        with self.lock:
+            self.pending.append(finished)
+            if len(self.pending) < self.batch_size:
+                return
+            batch, self.pending = self.pending, []
+        self._write(batch)
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch):
+        request = {"resourceSpans": [{
+            "resource": self.resource,
+            "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": [self._encode(s) for s in batch]}],
+        }]}
+        line = json.dumps(request, separators=(",", ":")) + "\n"
+        with self.write_lock:  # whole lines only, even with several writers
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def _encode(self, s):
+        encoded = {
+            "traceId": f"{s.trace_id:032x}",
+            "spanId": f"{s.span_id:016x}",
+            "name": s.name,
+            "kind": s.kind,
+            "startTimeUnixNano": str(s.start + self.offset),
+            "endTimeUnixNano": str(s.end + self.offset),
+            "attributes": _attributes(s.attributes),
+            "status": {"code": 2, "message": s.error} if s.error else {},
+        }
+        if s.parent_id is not None:
+            encoded["parentSpanId"] = f"{s.parent_id:016x}"
+        return encoded
+
+
+def _attributes(values):
+    out = []
+    for key, value in values.items():
+        if isinstance(value, bool):
+            encoded = {"boolValue": value}
+        elif isinstance(value, int):
+            encoded = {"intValue": str(value)}
+        elif isinstance(value, float):
+            encoded = {"doubleValue": value}
+        else:
+            encoded = {"stringValue": str(value)}
+        out.append({"key": key, "value": encoded})
+    return out
+
+
+def configure(path=None, sample=1.0, service=SERVICE_NAME):
+    # Start writing spans to path; None stops (and flushes what is pending)
+    global _exporter
+    previous, _exporter = _exporter, None
+    if previous is not None:
+        previous.flush()
+    if path is not None:
+        _exporter = FileExporter(path, sample, service)
+
+
+def flush():
+    if _exporter is not None:
+        _exporter.flush()
+
+
+def _forget():
+    # A forked child (parse worker) starts without the parent's pending spans
+    global _exporter
+    _exporter = None
+
+
+os.register_at_fork(after_in_child=_forget)
+atexit.register(flush)
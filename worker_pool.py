@@ -0,0 +1,112 @@
+import queue
+import threading
+
+# Shared execution engine for all scrapers.
+# A fixed number of worker threads pull jobs from a bounded queue, so the
+# thread count stays the same no matter how many targets are submitted.
+# When the queue is full submit() blocks, which slows the producer down
+# (backpressure) instead of buffering the whole target range in memory.
+
+DEFAULT_WORKERS = 16
+DEFAULT_QUEUE_SIZE = 64
+
+_STOP = object()
+
+
+class WorkerPool:
+    def __init__(self, max_workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.tasks = queue.Queue(maxsize=max(1, queue_size))
+        self.threads = []
+        for _ in range(max_workers):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _worker(self):
+        while True:
+            item = self.tasks.get()
+            try:
+                if item is _STOP:
+                    return
+                func, args = item
+                try:
+                    func(*args)
+                except Exception as e:
+                    # One bad target must never take a worker down with it
+                    print(f"[ERROR] {getattr(func, '__name__', func)}{args}: {e}")
+            finally:
+                self.tasks.task_done()
+
+    def submit(self, func, *args):
+        # Blocks while the queue is full -> backpressure on the caller
+        self.tasks.put((func, args))
+
+    def shutdown(self, wait=True):
+        for _ in self.threads:
+            self.tasks.put(_STOP)
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+
+def run_all(func, items, max_workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+    # Run func(item) for every item, at most max_workers at a time.
+    # items can be any iterable (including a lazy generator).
+    with WorkerPool(max_workers, queue_size) as pool:
+        for item in items:
+            pool.submit(func, item)
+
+
+def imap_unordered(func, items, max_workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+    # Like run_all, but yields every non-None func(item) as soon as it
+    # completes. The result queue is bounded too, so a slow consumer
+    # pauses the workers instead of piling finished records up in memory.
+    out = queue.Queue(maxsize=max(1, queue_size))
+    cancelled = threading.Event()
+
+    def put(value):
+        while not cancelled.is_set():
+            try:
+                out.put(value, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def work(item):
+        try:
+            result = func(item)
+        except Exception as e:
+            print(f"[ERROR] {getattr(func, '__name__', func)}({item!r}): {e}")
+            return
+        if result is not None:
+            put(result)
+
+    def feed():
+        try:
+            with WorkerPool(max_workers, queue_size) as pool:
+                for item in items:
+                    if cancelled.is_set():
+                        break
+                    pool.submit(work, item)
+        finally:
+            put(_STOP)
+
+    threading.Thread(target=feed, daemon=True).start()
+    try:
+        while True:
+            result = out.get()
+            if result is _STOP:
+                return
+            yield result
+    finally:
+        # Consumer stopped early (break / close): stop feeding new targets
+        cancelled.set()